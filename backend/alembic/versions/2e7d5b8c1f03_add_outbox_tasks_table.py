@@ -0,0 +1,44 @@
+"""Add outbox_tasks table
+
+Revision ID: 2e7d5b8c1f03
+Revises: d41c07e9b6a2
+Create Date: 2026-10-19 12:41:09.273554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e7d5b8c1f03'
+down_revision: Union[str, Sequence[str], None] = 'd41c07e9b6a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_name', sa.String(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_tasks_id'), 'outbox_tasks', ['id'], unique=False)
+    op.create_index('ix_outbox_tasks_status_available_at', 'outbox_tasks', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_tasks_status_available_at', table_name='outbox_tasks')
+    op.drop_index(op.f('ix_outbox_tasks_id'), table_name='outbox_tasks')
+    op.drop_table('outbox_tasks')
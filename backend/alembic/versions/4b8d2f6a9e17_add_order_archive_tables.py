@@ -0,0 +1,72 @@
+"""Add order archive tables
+
+Revision ID: 4b8d2f6a9e17
+Revises: 9c6e3a1f7d25
+Create Date: 2026-10-19 16:20:51.907342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8d2f6a9e17'
+down_revision: Union[str, Sequence[str], None] = '9c6e3a1f7d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # On PostgreSQL both tables are partitioned by month; the archival job
+    # creates each month's partition before moving orders into it
+    op.create_table('orders_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('order_number', sa.String(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('subtotal', sa.BigInteger(), nullable=False),
+    sa.Column('tax_amount', sa.BigInteger(), nullable=True),
+    sa.Column('discount_amount', sa.BigInteger(), nullable=True),
+    sa.Column('total_amount', sa.BigInteger(), nullable=False),
+    sa.Column('payment_method', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index(op.f('ix_orders_archive_id'), 'orders_archive', ['id'], unique=False)
+    op.create_index('ix_orders_archive_order_number', 'orders_archive', ['order_number'], unique=False)
+    op.create_index('ix_orders_archive_store_created_at', 'orders_archive', ['store_id', 'created_at'], unique=False)
+    op.create_table('order_items_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('unit_price', sa.BigInteger(), nullable=False),
+    sa.Column('total_price', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id', 'order_created_at'),
+    postgresql_partition_by='RANGE (order_created_at)'
+    )
+    op.create_index(op.f('ix_order_items_archive_order_id'), 'order_items_archive', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_items_archive_order_id'), table_name='order_items_archive')
+    op.drop_table('order_items_archive')
+    op.drop_index('ix_orders_archive_store_created_at', table_name='orders_archive')
+    op.drop_index('ix_orders_archive_order_number', table_name='orders_archive')
+    op.drop_index(op.f('ix_orders_archive_id'), table_name='orders_archive')
+    op.drop_table('orders_archive')
@@ -0,0 +1,47 @@
+"""Declare unique index on orders.order_number
+
+Revision ID: 5f2a9c7d3e41
+Revises: c24b1e346c10
+Create Date: 2026-10-19 09:12:04.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c7d3e41'
+down_revision: Union[str, Sequence[str], None] = 'c24b1e346c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Lets batch mode address the unnamed UNIQUE constraint SQLite reflects
+naming_convention = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _drop_unique_constraint() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("orders", naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint("uq_orders_order_number", type_="unique")
+    else:
+        op.drop_constraint("orders_order_number_key", "orders", type_="unique")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Replace the anonymous UNIQUE constraint with a named unique index so
+    # lookups by order number are declared point lookups in the model
+    _drop_unique_constraint()
+    op.create_index(op.f('ix_orders_order_number'), 'orders', ['order_number'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orders_order_number'), table_name='orders')
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("orders", naming_convention=naming_convention) as batch_op:
+            batch_op.create_unique_constraint("uq_orders_order_number", ["order_number"])
+    else:
+        op.create_unique_constraint("orders_order_number_key", "orders", ["order_number"])
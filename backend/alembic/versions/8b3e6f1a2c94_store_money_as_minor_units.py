@@ -0,0 +1,54 @@
+"""Store money columns as integer minor units
+
+Revision ID: 8b3e6f1a2c94
+Revises: 5f2a9c7d3e41
+Create Date: 2026-10-19 10:03:51.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3e6f1a2c94'
+down_revision: Union[str, Sequence[str], None] = '5f2a9c7d3e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = {
+    'products': ['price', 'cost'],
+    'orders': ['subtotal', 'tax_amount', 'discount_amount', 'total_amount'],
+    'order_items': ['unit_price', 'total_price'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in MONEY_COLUMNS.items():
+        assignments = ", ".join(f"{column} = ROUND({column} * 100)" for column in columns)
+        op.execute(f"UPDATE {table} SET {assignments}")
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Float(),
+                    type_=sa.BigInteger(),
+                    postgresql_using=f"{column}::bigint"
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in MONEY_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.BigInteger(),
+                    type_=sa.Float(),
+                    postgresql_using=f"{column}::double precision"
+                )
+        assignments = ", ".join(f"{column} = {column} / 100.0" for column in columns)
+        op.execute(f"UPDATE {table} SET {assignments}")
@@ -0,0 +1,97 @@
+"""Add stores and per-store stock
+
+Revision ID: 9c6e3a1f7d25
+Revises: 2e7d5b8c1f03
+Create Date: 2026-10-19 15:02:37.640912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c6e3a1f7d25'
+down_revision: Union[str, Sequence[str], None] = '2e7d5b8c1f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_STORE_ID = 1
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stores_id'), 'stores', ['id'], unique=False)
+    op.create_index(op.f('ix_stores_code'), 'stores', ['code'], unique=True)
+
+    # Everything that exists today belongs to the default store
+    op.execute(sa.text(
+        f"INSERT INTO stores (id, code, name, is_active) VALUES ({DEFAULT_STORE_ID}, 'MAIN', 'Main store', true)"
+    ))
+
+    op.create_table('store_stock',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.PrimaryKeyConstraint('store_id', 'product_id')
+    )
+    op.create_index(op.f('ix_store_stock_product_id'), 'store_stock', ['product_id'], unique=False)
+    op.execute(sa.text(
+        f"INSERT INTO store_stock (store_id, product_id, quantity) "
+        f"SELECT {DEFAULT_STORE_ID}, id, COALESCE(stock_quantity, 0) FROM products"
+    ))
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('stock_quantity')
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('store_id', sa.Integer(), nullable=True))
+    op.execute(sa.text(f"UPDATE orders SET store_id = {DEFAULT_STORE_ID}"))
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.alter_column('store_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_orders_store_id_stores', 'stores', ['store_id'], ['id'])
+    op.create_index('ix_orders_store_created_at', 'orders', ['store_id', 'created_at'], unique=False)
+    op.create_index('ix_orders_store_status_created_at', 'orders', ['store_id', 'status', 'created_at'], unique=False)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('store_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_users_store_id_stores', 'stores', ['store_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('fk_users_store_id_stores', type_='foreignkey')
+        batch_op.drop_column('store_id')
+
+    op.drop_index('ix_orders_store_status_created_at', table_name='orders')
+    op.drop_index('ix_orders_store_created_at', table_name='orders')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_constraint('fk_orders_store_id_stores', type_='foreignkey')
+        batch_op.drop_column('store_id')
+
+    # Fold per-store stock back into one global quantity
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('stock_quantity', sa.Integer(), nullable=True))
+    op.execute(sa.text(
+        "UPDATE products SET stock_quantity = COALESCE("
+        "(SELECT SUM(quantity) FROM store_stock WHERE store_stock.product_id = products.id), 0)"
+    ))
+
+    op.drop_index(op.f('ix_store_stock_product_id'), table_name='store_stock')
+    op.drop_table('store_stock')
+    op.drop_index(op.f('ix_stores_code'), table_name='stores')
+    op.drop_index(op.f('ix_stores_id'), table_name='stores')
+    op.drop_table('stores')
@@ -0,0 +1,34 @@
+"""Add promotion_discount to orders and orders_archive
+
+Revision ID: a9d3c5e7f214
+Revises: f7a2d4b8c613
+Create Date: 2026-10-19 23:18:40.552903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3c5e7f214'
+down_revision: Union[str, Sequence[str], None] = 'f7a2d4b8c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing orders did not record how much of discount_amount came from
+    # promotions, so all of it counts as the manual discount
+    for table in ('orders', 'orders_archive'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('promotion_discount', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('orders_archive', 'orders'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('promotion_discount')
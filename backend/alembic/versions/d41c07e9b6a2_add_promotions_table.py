@@ -0,0 +1,53 @@
+"""Add promotions table
+
+Revision ID: d41c07e9b6a2
+Revises: 8b3e6f1a2c94
+Create Date: 2026-10-19 11:20:37.558120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c07e9b6a2'
+down_revision: Union[str, Sequence[str], None] = '8b3e6f1a2c94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('promotions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('promotion_type', sa.String(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('buy_quantity', sa.Integer(), nullable=True),
+    sa.Column('get_quantity', sa.Integer(), nullable=True),
+    sa.Column('percent_off', sa.Float(), nullable=True),
+    sa.Column('starts_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('ends_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_promotions_id'), 'promotions', ['id'], unique=False)
+    op.create_index(op.f('ix_promotions_product_id'), 'promotions', ['product_id'], unique=False)
+    op.create_index(op.f('ix_promotions_category_id'), 'promotions', ['category_id'], unique=False)
+    op.create_index('ix_promotions_active_window', 'promotions', ['is_active', 'ends_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_promotions_active_window', table_name='promotions')
+    op.drop_index(op.f('ix_promotions_category_id'), table_name='promotions')
+    op.drop_index(op.f('ix_promotions_product_id'), table_name='promotions')
+    op.drop_index(op.f('ix_promotions_id'), table_name='promotions')
+    op.drop_table('promotions')
@@ -0,0 +1,56 @@
+"""Add stock_reservations table and store_stock.reserved
+
+Revision ID: f7a2d4b8c613
+Revises: e3f8a1c6b590
+Create Date: 2026-10-19 21:03:51.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a2d4b8c613'
+down_revision: Union[str, Sequence[str], None] = 'e3f8a1c6b590'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_reservations_id'), 'stock_reservations', ['id'], unique=False)
+    op.create_index(op.f('ix_stock_reservations_order_id'), 'stock_reservations', ['order_id'], unique=False)
+    op.create_index(op.f('ix_stock_reservations_expires_at'), 'stock_reservations', ['expires_at'], unique=False)
+    # Pending orders placed before this revision already took their stock
+    # off store_stock.quantity, so they start with nothing reserved
+    with op.batch_alter_table('store_stock') as batch_op:
+        batch_op.add_column(sa.Column('reserved', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Take held stock off the shelf count, the way pending orders used to
+    op.execute(
+        "UPDATE store_stock SET quantity = quantity - reserved WHERE reserved <> 0"
+    )
+    with op.batch_alter_table('store_stock') as batch_op:
+        batch_op.drop_column('reserved')
+    op.drop_index(op.f('ix_stock_reservations_expires_at'), table_name='stock_reservations')
+    op.drop_index(op.f('ix_stock_reservations_order_id'), table_name='stock_reservations')
+    op.drop_index(op.f('ix_stock_reservations_id'), table_name='stock_reservations')
+    op.drop_table('stock_reservations')
@@ -0,0 +1,251 @@
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional
+from urllib.parse import parse_qs
+import asyncio
+import logging
+import re
+import time
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = "critical"
+NORMAL = "normal"
+BACKGROUND = "background"
+# Highest priority first: freed slots go to the first class with waiters
+PRIORITIES = (CRITICAL, NORMAL, BACKGROUND)
+
+# Till traffic: checkout, scanning and keeping a till signed in
+CRITICAL_ROUTES = (
+    ("POST", "/api/orders/"),
+    ("POST", "/api/orders/{order_id}/complete"),
+    ("POST", "/api/orders/{order_id}/cancel"),
+    ("POST", "/api/carts/"),
+    ("POST", "/api/carts/{cart_id}/items"),
+    ("PUT", "/api/carts/{cart_id}/items/{product_id}"),
+    ("DELETE", "/api/carts/{cart_id}/items/{product_id}"),
+    ("POST", "/api/carts/{cart_id}/checkout"),
+    ("POST", "/api/pricing/quote"),
+    ("GET", "/api/products/barcode/{barcode}"),
+    ("POST", "/api/auth/refresh"),
+    ("POST", "/api/auth/till-session"),
+)
+# Reports and history: slow, and nobody is waiting at a till for them. Their
+# handlers are plain functions so FastAPI runs them in its threadpool rather
+# than blocking the event loop the tills share. Any GET asking for more than
+# ADMISSION_BACKGROUND_LIST_LIMIT rows is treated the same way, and order
+# lookups move themselves here when they fall back to the archive.
+BACKGROUND_ROUTES = (
+    ("GET", "/api/stores/{store_id}/low-stock"),
+    ("GET", "/api/orders/"),
+)
+# Long-lived or trivial; never queued
+EXEMPT_PATHS = ("/api/events/stream",)
+# Request state keys: the class whose slot the request holds, and its controller
+ADMISSION_CLASS = "admission_class"
+ADMISSION_CONTROLLER = "admission_controller"
+
+
+def _compile(routes):
+    # Matched on the raw path: admission runs before the router has picked a route
+    return [
+        (method, re.compile(re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(template)) + "$"))
+        for method, template in routes
+    ]
+
+
+_critical = _compile(CRITICAL_ROUTES)
+_background = _compile(BACKGROUND_ROUTES)
+
+
+class ClassLimits(NamedTuple):
+    limit: int  # requests of this class running at once
+    queue_seconds: Optional[float]  # longest wait for a slot; None waits as long as it takes
+    queue_size: int  # requests of this class allowed to wait
+
+
+def _large_page(scope: Scope) -> bool:
+    limit = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("limit")
+    try:
+        return limit is not None and int(limit[-1]) > settings.admission_background_list_limit
+    except ValueError:
+        return False
+
+
+def classify(scope: Scope) -> Optional[str]:
+    """Admission class of a request, or None when it bypasses admission control"""
+    path = scope["path"]
+    if not path.startswith("/api/") or path.startswith(EXEMPT_PATHS):
+        return None
+    method = scope["method"]
+    if any(method == route_method and pattern.match(path) for route_method, pattern in _critical):
+        return CRITICAL
+    if any(method == route_method and pattern.match(path) for route_method, pattern in _background):
+        return BACKGROUND
+    if method == "GET" and _large_page(scope):
+        return BACKGROUND
+    return NORMAL
+
+
+class AdmissionController:
+    """Per-worker request slots handed out by priority.
+
+    At most ``max_concurrency`` admitted requests run at once, and each
+    class is further capped by its own limit. When a slot frees up it goes
+    to the oldest waiter of the highest class that may run, so checkout and
+    scans overtake queued list and report requests. A request that waits
+    longer than its class budget, or finds its class queue full, is
+    rejected. Background requests are also rejected outright while
+    critical ones are waiting.
+    """
+
+    def __init__(self, max_concurrency: int, limits: Dict[str, ClassLimits]):
+        self.max_concurrency = max_concurrency
+        self.limits = limits
+        self.in_flight = 0
+        self.running: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self.rejected: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self.queue_seconds_total: Dict[str, float] = {name: 0.0 for name in PRIORITIES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITIES}
+
+    def waiting(self, name: str) -> int:
+        return len(self._waiters[name])
+
+    def _can_run(self, name: str) -> bool:
+        return self.in_flight < self.max_concurrency and self.running[name] < self.limits[name].limit
+
+    def _take(self, name: str) -> None:
+        self.in_flight += 1
+        self.running[name] += 1
+
+    async def acquire(self, name: str) -> bool:
+        """Wait for a slot; False when the request should be shed"""
+        if self._can_run(name) and not self._waiters[name]:
+            self._take(name)
+            return True
+        limits = self.limits[name]
+        if (name == BACKGROUND and self._waiters[CRITICAL]) or len(self._waiters[name]) >= limits.queue_size:
+            self.rejected[name] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(future)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, limits.queue_seconds)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected[name] += 1
+            return False
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release(name)
+            raise
+        finally:
+            self.queue_seconds_total[name] += time.perf_counter() - started
+            try:
+                self._waiters[name].remove(future)
+            except ValueError:
+                pass
+
+    def release(self, name: str) -> None:
+        self.in_flight -= 1
+        self.running[name] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for name in PRIORITIES:
+            waiters = self._waiters[name]
+            while waiters and self._can_run(name):
+                future = waiters.popleft()
+                if not future.done():
+                    self._take(name)
+                    future.set_result(True)
+            if waiters and self.in_flight >= self.max_concurrency:
+                # Lower classes must not take the slot this class is waiting for
+                return
+
+
+admission_controller = AdmissionController(
+    settings.admission_max_concurrency,
+    {
+        CRITICAL: ClassLimits(
+            settings.admission_critical_limit, settings.admission_critical_queue_seconds,
+            settings.admission_critical_queue_size,
+        ),
+        NORMAL: ClassLimits(
+            settings.admission_normal_limit, settings.admission_normal_queue_seconds,
+            settings.admission_normal_queue_size,
+        ),
+        BACKGROUND: ClassLimits(
+            settings.admission_background_limit, settings.admission_background_queue_seconds,
+            settings.admission_background_queue_size,
+        ),
+    },
+)
+
+
+def _shed_headers() -> Dict[str, str]:
+    return {"Retry-After": str(settings.admission_retry_after_seconds)}
+
+
+async def move_to_background(request: Request) -> None:
+    """Give up the request's slot for a background one before slow work.
+
+    For handlers that only find out once running that a request is heavy,
+    such as an order lookup falling back to the archive. Raises 503 when
+    the background class sheds it.
+    """
+    state = request.scope.get("state", {})
+    name = state.get(ADMISSION_CLASS)
+    if name is None or name == BACKGROUND:
+        return
+    controller: AdmissionController = state[ADMISSION_CONTROLLER]
+    state[ADMISSION_CLASS] = None
+    controller.release(name)
+    if not await controller.acquire(BACKGROUND):
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers=_shed_headers())
+    state[ADMISSION_CLASS] = BACKGROUND
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware putting API requests through the admission controller.
+
+    Shed requests get 503 with Retry-After before any handler runs, so they
+    cost the worker almost nothing.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(name):
+            logger.debug("Shed %s request %s %s", name, scope["method"], scope["path"])
+            response = JSONResponse(
+                {"detail": "Server busy, try again shortly"}, status_code=503, headers=_shed_headers()
+            )
+            await response(scope, receive, send)
+            return
+        # The handler may move the request to another class; release what it holds
+        state = scope.setdefault("state", {})
+        state[ADMISSION_CLASS] = name
+        state[ADMISSION_CONTROLLER] = self.controller
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            name = state.pop(ADMISSION_CLASS, None)
+            if name is not None:
+                self.controller.release(name)
@@ -1,34 +1,51 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import User
 from app.schemas import TokenData
 from app.config import settings
+from app.passwords import get_pwd_context, password_hasher
+from app.services.token_revocation import revocation_list
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Token types, carried in the "typ" claim. Tokens issued before refresh
+# tokens existed have no type and count as access tokens.
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+TILL_SESSION_TOKEN = "till"
+STREAM_TOKEN = "stream"
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     user = db.query(User).filter(User.username == username).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    # Give the connection back to the pool while the hash runs; the detached
+    # user keeps its loaded attributes
+    db.expunge(user)
+    db.rollback()
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        # Stored with older argon2 parameters; upgrade while we have the password
+        user.hashed_password = new_hash
+        db.add(user)
+        db.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -37,28 +54,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
+    to_encode.setdefault("typ", ACCESS_TOKEN)
+    # Imported on first use: jose pulls in the cryptography backends
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_refresh_token(username: str) -> str:
+    return create_access_token(
+        {"sub": username, "typ": REFRESH_TOKEN}, timedelta(days=settings.refresh_token_expire_days)
+    )
+
+def create_till_session_token(username: str, device_id: str) -> str:
+    """Long-lived token that only refreshes access tokens for ``device_id``"""
+    return create_access_token(
+        {"sub": username, "typ": TILL_SESSION_TOKEN, "dev": device_id},
+        timedelta(days=settings.till_session_expire_days)
+    )
+
+def create_stream_token(username: str, store_id: Optional[int]) -> str:
+    """Short-lived token for opening an event stream, limited to ``store_id`` (None for all)"""
+    return create_access_token(
+        {"sub": username, "typ": STREAM_TOKEN, "store": store_id},
+        timedelta(seconds=settings.stream_token_expire_seconds)
+    )
+
+def decode_token(token: str, token_type: str) -> Dict[str, Any]:
+    """Claims of a valid, unrevoked token of ``token_type``; 401 otherwise.
+
+    The revocation check is an in-memory lookup, so this never queries.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None or payload.get("typ", ACCESS_TOKEN) != token_type:
+        raise credentials_exception
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    return payload
+
+def revoke_token(db: Session, payload: Dict[str, Any], user_id: Optional[int] = None) -> bool:
+    """Revoke a decoded token until it expires; False when it already was"""
+    if payload.get("jti") is None:
+        return False
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    return revocation_list.revoke(db, payload["jti"], expires_at, user_id=user_id)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    payload = decode_token(token, ACCESS_TOKEN)
+    token_data = TokenData(username=payload["sub"])
     
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -66,6 +128,31 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_stream_grant(
+    token: str = Query(..., description="Stream token from POST /api/events/token")
+) -> Tuple[User, Optional[int]]:
+    """Active user of a stream token and the store whose events it may see.
+
+    Browsers' EventSource cannot send headers, so the token comes in the
+    query string; it is a short-lived stream token rather than an access
+    token. The lookup uses its own session, closed before the stream
+    starts, so a dashboard left open does not hold a pooled connection.
+    """
+    payload = decode_token(token, STREAM_TOKEN)
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == payload["sub"]).first()
+        if user is not None:
+            db.expunge(user)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user, payload.get("store")
+
 async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(
@@ -0,0 +1,608 @@
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+import json
+import logging
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import bulk_write_listeners
+from app.models import Category, Customer, Order, OrderItem, Product, Promotion, StoreStock
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+# Larger invalidations are sent as "drop everything" instead
+MAX_MESSAGE_BYTES = 32768
+SEND_TIMEOUT = 0.2
+CONNECT_TIMEOUT = 1.0
+RECONNECT_SECONDS = 2.0
+# Invalidations waiting for the publisher thread; past this, other workers
+# are told to drop everything instead
+PUBLISH_QUEUE_SIZE = 1024
+
+Key = Tuple[str, Hashable]
+
+
+class InvalidationBus:
+    """In-process only: invalidations never leave this worker"""
+
+    name = "local"
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        pass
+
+    def publish(self, message: bytes) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class UnixSocketBus(InvalidationBus):
+    """Broadcasts to the other workers on this machine over Unix datagram sockets.
+
+    Each worker binds a socket named after its pid in ``directory``, and
+    publishing sends the message to every other socket found there. Sockets
+    left behind by workers that died are removed on the first failed send.
+    """
+
+    name = "unix"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._path: Optional[str] = None
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            # Left by an earlier process with the same pid
+            os.unlink(self._path)
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(self._path)
+        self._receiver.settimeout(0.5)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.settimeout(SEND_TIMEOUT)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(deliver,), name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def publish(self, message: bytes) -> None:
+        if self._sender is None:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path == self._path or not name.endswith(".sock"):
+                continue
+            try:
+                self._sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Its worker is gone
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                logger.warning("Cache invalidation to %s was dropped", path)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        for sock in (self._receiver, self._sender):
+            if sock is not None:
+                sock.close()
+        self._receiver = self._sender = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+    def _run(self, deliver: Callable[[bytes], None]) -> None:
+        while not self._stopping.is_set():
+            try:
+                message = self._receiver.recv(MAX_MESSAGE_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                if not self._stopping.is_set():
+                    logger.exception("Cache bus socket failed")
+                return
+            deliver(message)
+
+
+class RedisError(Exception):
+    pass
+
+
+def _command(*parts: str) -> bytes:
+    encoded = [part.encode() if isinstance(part, str) else part for part in parts]
+    chunks = [b"*%d\r\n" % len(encoded)]
+    for part in encoded:
+        chunks += [b"$%d\r\n" % len(part), part, b"\r\n"]
+    return b"".join(chunks)
+
+
+def _reply(stream) -> Any:
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        return None if length < 0 else stream.read(length + 2)[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [_reply(stream) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply {line!r}")
+
+
+class RedisBus(InvalidationBus):
+    """Broadcasts over a pub/sub channel of any server speaking the Redis protocol.
+
+    Only PUBLISH and SUBSCRIBE are needed, so it talks the protocol itself
+    rather than pulling in a client library. Messages sent while the
+    subscription is down are missed, so every worker drops its whole cache
+    when it reconnects. While the server is unreachable, publishing is
+    skipped for ``RECONNECT_SECONDS`` at a time instead of stalling writes.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.channel = channel
+        self._publisher: Optional[socket.socket] = None
+        self._publisher_stream = None
+        self._publish_lock = threading.Lock()
+        self._down_until = 0.0
+        self._subscriber: Optional[socket.socket] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        stream = sock.makefile("rb")
+        if self.password is not None:
+            credentials = (self.username, self.password) if self.username else (self.password,)
+            sock.sendall(_command("AUTH", *credentials))
+            _reply(stream)
+        return sock, stream
+
+    def start(self, deliver: Callable[[bytes], None]) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(deliver,), name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def publish(self, message: bytes) -> None:
+        with self._publish_lock:
+            if time.monotonic() < self._down_until:
+                return
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher, self._publisher_stream = self._connect()
+                    self._publisher.sendall(_command("PUBLISH", self.channel, message))
+                    _reply(self._publisher_stream)
+                    return
+                except (OSError, RedisError):
+                    self._close_publisher()
+            self._down_until = time.monotonic() + RECONNECT_SECONDS
+            logger.warning("Cache invalidation could not be published to %s:%s", self.host, self.port)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        subscriber = self._subscriber
+        if subscriber is not None:
+            # Unblocks the reader thread
+            try:
+                subscriber.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        with self._publish_lock:
+            self._close_publisher()
+
+    def _close_publisher(self) -> None:
+        if self._publisher is not None:
+            self._publisher.close()
+        self._publisher = self._publisher_stream = None
+
+    def _run(self, deliver: Callable[[bytes], None]) -> None:
+        missed = False
+        while not self._stopping.is_set():
+            try:
+                sock, stream = self._connect()
+            except (OSError, RedisError):
+                missed = True
+                logger.warning("Cache bus cannot reach %s:%s", self.host, self.port)
+                self._stopping.wait(RECONNECT_SECONDS)
+                continue
+            self._subscriber = sock
+            try:
+                sock.settimeout(None)
+                sock.sendall(_command("SUBSCRIBE", self.channel))
+                _reply(stream)
+                if missed:
+                    # Whatever was published while disconnected is lost
+                    deliver(Cache.flush_message())
+                    missed = False
+                while not self._stopping.is_set():
+                    reply = _reply(stream)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        deliver(reply[2])
+            except (OSError, RedisError):
+                missed = True
+                if not self._stopping.is_set():
+                    logger.warning("Cache bus lost its subscription, reconnecting")
+                    self._stopping.wait(RECONNECT_SECONDS)
+            finally:
+                self._subscriber = None
+                sock.close()
+
+
+class Cache:
+    """Per-worker cache with namespaced keys and tags, kept coherent by an invalidation bus.
+
+    Entries live in this worker's memory. Invalidating a key, a namespace
+    or a tag drops the matching entries here and publishes the same
+    invalidation on ``bus`` so every other worker drops its own. Entries
+    also expire after ``default_ttl`` unless given another ``ttl``, which
+    bounds how stale a worker gets if a message is lost. Past
+    ``max_entries`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, bus: InvalidationBus, max_entries: int, default_ttl: float):
+        self.bus = bus
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.origin = ""
+        self._entries: "OrderedDict[Key, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Key]] = {}
+        self._namespaces: Dict[str, Set[Key]] = {}
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self._event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        # Bumped by every invalidation so a load that raced one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Publishing can block on the network, so commits hand messages to a
+        # thread instead of sending them from the request
+        self._outbox: "queue.Queue[Optional[bytes]]" = queue.Queue(PUBLISH_QUEUE_SIZE)
+        self._overflowed = False
+        self._publisher: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def flush_message() -> bytes:
+        return json.dumps({"flush": True}).encode()
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return default
+            if entry[1] <= time.monotonic():
+                self._drop((namespace, key))
+                return default
+            self._entries.move_to_end((namespace, key))
+            return entry[0]
+
+    def set(
+        self,
+        namespace: str,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        self._store(namespace, key, value, ttl, tags, None)
+
+    def _store(self, namespace, key, value, ttl, tags, generation: Optional[int]) -> None:
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._drop((namespace, key))
+            self._entries[(namespace, key)] = (value, expires_at, tags)
+            self._namespaces.setdefault(namespace, set()).add((namespace, key))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Cached value, or the result of ``loader()`` which is then cached"""
+        value = self.get(namespace, key, MISSING)
+        if value is MISSING:
+            generation = self._generation
+            value = loader()
+            self._store(namespace, key, value, ttl, tags, generation)
+        return value
+
+    def invalidate(self, namespace: str, key: Hashable = MISSING) -> None:
+        """Drop one key, or the whole namespace, in every worker"""
+        if key is MISSING:
+            message = {"namespaces": [namespace]}
+        else:
+            message = {"keys": [[namespace, key]]}
+        self._apply(message)
+        self._publish(message)
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Drop every entry carrying one of ``tags``, in every worker"""
+        if not tags:
+            return
+        message = {"tags": sorted(set(tags))}
+        self._apply(message)
+        self._publish(message)
+
+    def clear(self) -> None:
+        """Drop everything in this worker only"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._namespaces.clear()
+
+    def listen(self, tag: str, callback: Callable[[str], None]) -> None:
+        """Call ``callback(tag)`` whenever another worker invalidates ``tag``"""
+        self._listeners.setdefault(tag, []).append(callback)
+
+    def broadcast_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Pass an application event to the other workers over the bus"""
+        raw = json.dumps({"origin": self.origin, "event": [event_type, data]}, default=str).encode()
+        if len(raw) > MAX_MESSAGE_BYTES:
+            logger.warning("Dropping %s event too large for the cache bus", event_type)
+            return
+        self._enqueue(raw)
+
+    def on_event(self, callback: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call ``callback(event_type, data)`` for events broadcast by other workers"""
+        self._event_listeners.append(callback)
+
+    def start(self) -> None:
+        # Set here rather than on import: with a preloading server the
+        # module is imported once and then forked into every worker
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.bus.start(self.receive)
+        self._publisher = threading.Thread(target=self._run_publisher, name="cache-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop(self) -> None:
+        if self._publisher is not None:
+            try:
+                self._outbox.put(None, timeout=1)
+            except queue.Full:
+                pass
+            self._publisher.join(5)
+            self._publisher = None
+        self.bus.stop()
+
+    def receive(self, raw: bytes) -> None:
+        """Apply an invalidation published by another worker"""
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed cache invalidation")
+            return
+        if message.get("origin") == self.origin:
+            return
+        if "event" in message:
+            event_type, data = message["event"]
+            for callback in self._event_listeners:
+                try:
+                    callback(event_type, data)
+                except Exception:
+                    logger.exception("Listener for %s events failed", event_type)
+            return
+        if message.get("flush"):
+            self.clear()
+            tags = list(self._listeners)
+        else:
+            self._apply(message)
+            tags = message.get("tags", ())
+        for tag in tags:
+            for callback in self._listeners.get(tag, ()):
+                try:
+                    callback(tag)
+                except Exception:
+                    logger.exception("Cache invalidation listener for %s failed", tag)
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        with self._lock:
+            self._generation += 1
+            for namespace, key in message.get("keys", ()):
+                # JSON turns tuple keys into lists
+                self._drop((namespace, tuple(key) if isinstance(key, list) else key))
+            for namespace in message.get("namespaces", ()):
+                for entry_key in list(self._namespaces.get(namespace, ())):
+                    self._drop(entry_key)
+            for tag in message.get("tags", ()):
+                for entry_key in list(self._tags.get(tag, ())):
+                    self._drop(entry_key)
+
+    def _drop(self, entry_key: Key) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        keys = self._namespaces.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key)
+            if not keys:
+                del self._namespaces[entry_key[0]]
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(entry_key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _publish(self, message: Dict[str, Any]) -> None:
+        raw = json.dumps({"origin": self.origin, **message}, default=str).encode()
+        if len(raw) > MAX_MESSAGE_BYTES:
+            raw = json.dumps({"origin": self.origin, "flush": True}).encode()
+        self._enqueue(raw)
+
+    def _enqueue(self, raw: bytes) -> None:
+        if self._publisher is None:
+            self._send(raw)
+            return
+        try:
+            self._outbox.put_nowait(raw)
+        except queue.Full:
+            if not self._overflowed:
+                logger.warning("Cache invalidation queue is full; other workers will be flushed")
+            self._overflowed = True
+
+    def _run_publisher(self) -> None:
+        while True:
+            raw = self._outbox.get()
+            if raw is None:
+                return
+            if self._overflowed:
+                # Some invalidations were dropped, so nothing cached elsewhere can be trusted
+                self._overflowed = False
+                self._send(json.dumps({"origin": self.origin, "flush": True}).encode())
+            self._send(raw)
+
+    def _send(self, raw: bytes) -> None:
+        try:
+            self.bus.publish(raw)
+        except Exception:
+            # Other workers catch up when their entries expire
+            logger.exception("Cache invalidation publish failed")
+
+
+def default_bus_directory() -> str:
+    # One directory per database, so separate deployments on a host stay apart
+    name = sha1(settings.database_url.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"pos-cache-{name}")
+
+
+def create_bus() -> InvalidationBus:
+    backend = settings.cache_backend
+    if backend == "redis":
+        return RedisBus(settings.cache_redis_url, settings.cache_redis_channel)
+    if backend == "unix":
+        if os.name == "posix":
+            return UnixSocketBus(settings.cache_bus_path or default_bus_directory())
+        return InvalidationBus()
+    if backend == "local":
+        return InvalidationBus()
+    raise ValueError(f"Unknown cache backend {backend!r}")
+
+
+cache = Cache(create_bus(), settings.cache_max_entries, settings.cache_default_ttl_seconds)
+
+# Tags invalidated when rows of these models are committed; cached values
+# derived from such rows should carry the same tags. Writes made with SQL
+# statements rather than the ORM are not seen by the flush hook: they go
+# through app.database.record_bulk_writes when the instances are at hand,
+# or name their tags with record_tags.
+MODEL_TAGS: Dict[type, Callable[[Any], Tuple[str, ...]]] = {
+    Product: lambda product: (f"product:{product.id}", "products"),
+    StoreStock: lambda stock: (f"product:{stock.product_id}", "stock"),
+    Category: lambda category: (f"category:{category.id}", "categories"),
+    Customer: lambda customer: (f"customer:{customer.id}", "customers"),
+    Order: lambda order: (f"order:{order.id}", "orders"),
+    OrderItem: lambda item: (f"order:{item.order_id}", "orders"),
+    Promotion: lambda promotion: (f"promotion:{promotion.id}", "promotions"),
+}
+
+_tracked = set()
+
+
+def record_tags(session: Session, *tags: str) -> None:
+    """Invalidate ``tags`` when ``session`` commits, for writes the flush hook cannot see"""
+    if _tracked:
+        session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def track_writes(session_factory) -> None:
+    """Invalidate the tags of rows written by ``session_factory`` sessions once they commit"""
+    if session_factory in _tracked:
+        return
+    _tracked.add(session_factory)
+
+    def collect_instances(session, *groups):
+        tags: Set[str] = session.info.setdefault("cache_tags", set())
+        for group in groups:
+            for instance in group:
+                tags_for = MODEL_TAGS.get(type(instance))
+                if tags_for is not None:
+                    tags.update(tags_for(instance))
+
+    @event.listens_for(session_factory, "after_flush")
+    def collect(session, flush_context):
+        collect_instances(session, session.new, session.dirty, session.deleted)
+
+    bulk_write_listeners.append(collect_instances)
+
+    @event.listens_for(session_factory, "after_commit")
+    def publish(session):
+        tags = session.info.pop("cache_tags", None)
+        if tags:
+            cache.invalidate_tags(*tags)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def discard(session):
+        session.info.pop("cache_tags", None)
+
+
+def start_cache(session_factory) -> None:
+    cache.start()
+    track_writes(session_factory)
+    logger.info("Cache started with the %s invalidation bus", cache.bus.name)
+
+
+def share_events(broker) -> None:
+    """Carry ``broker``'s events between workers on the cache bus, so a
+    dashboard sees orders taken by any worker"""
+    cache.on_event(broker.deliver)
+    broker.forward_to(cache.broadcast_event)
+
+
+def stop_cache() -> None:
+    cache.stop()
@@ -1,36 +1,158 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, List
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Read by pydantic-settings itself, wherever the app is started from
+ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
 
 class Settings(BaseSettings):
     # Database
-    database_url: str = os.getenv("DATABASE_URL", "sqlite:///./pos_system.db")
+    database_url: str = "sqlite:///./pos_system.db"
     
     # Security
-    secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here")
-    algorithm: str = os.getenv("ALGORITHM", "HS256")
-    access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    secret_key: str = "your-secret-key-here"
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 7
+    till_session_expire_days: int = 90  # device-bound sessions for shared tills
+    token_revocation_sync_seconds: float = 5.0  # how soon other workers see a logout
+    
+    # Password hashing; stored hashes with other argon2 parameters are rehashed on login
+    argon2_time_cost: int = 3
+    argon2_memory_cost_kib: int = 65536
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 2  # threads hashing off the event loop; 0 hashes inline
+    password_hash_queue_size: int = 32  # hashes waiting for a thread before logins get a 503
+    password_hash_retry_after_seconds: int = 2
+    password_hash_nice: int = 10  # CPU priority of hashing threads, so scans win under load
     
     # API
     api_title: str = "POS System API"
     api_description: str = "A Point of Sale system API built with FastAPI"
     api_version: str = "1.0.0"
     
+    # Production server (serve.py)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8001
+    server_workers: Optional[int] = None  # defaults to one per CPU core
+    server_backlog: int = 2048  # pending connections queued by the kernel
+    server_keepalive_seconds: int = 30  # longer than the gap between a till's requests
+    server_graceful_timeout_seconds: int = 30  # in-flight requests get this long after SIGTERM
+    server_worker_timeout_seconds: int = 60  # a worker silent this long is restarted
+    
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
+    # Order numbers
+    order_number_strategy: str = "ulid"  # ulid, snowflake
+    order_number_prefix: str = "ORD"
+    order_number_node_id: Optional[int] = None
+    store_code: str = ""
+    till_code: str = ""
+    
+    # Stores
+    default_store_id: int = 1  # used when neither the X-Store-ID header nor the user names a store
+    
     # Tax
-    default_tax_rate: float = 0.08  # 8%
+    default_tax_rate: float = 0.08  # 8%, used when no pricing rules file is set
+    pricing_rules_path: Optional[str] = None  # JSON tax/bulk pricing rules
+    
+    # Promotions
+    promotion_index_ttl_seconds: int = 60
+    
+    # Shared catalog: prices, stock and barcodes in a memory-mapped file read by every worker
+    shared_catalog_enabled: bool = True  # POSIX only
+    shared_catalog_path: Optional[str] = None  # defaults to /dev/shm/pos-catalog-<database hash>.mmap
+    shared_catalog_capacity: int = 200000  # product ids at or above this are read from the database
+    shared_catalog_store_id: Optional[int] = None  # store whose stock is kept; defaults to default_store_id
+    shared_catalog_rebuild_seconds: float = 300.0  # full reload, for changes made outside the ORM
+    
+    # Cache: per-worker entries, invalidated across workers over a bus
+    cache_backend: str = "unix"  # local (this worker only), unix (workers on this host) or redis
+    cache_max_entries: int = 10000
+    cache_default_ttl_seconds: float = 300.0  # bounds staleness if an invalidation is lost
+    cache_bus_path: Optional[str] = None  # unix: socket directory, defaults to /tmp/pos-cache-<database hash>
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_redis_channel: str = "pos:cache:invalidate"
+    
+    # Admission control: per-worker request slots, checkout and scans first
+    admission_control_enabled: bool = True
+    admission_max_concurrency: int = 32  # admitted requests running at once, all classes together
+    admission_critical_limit: int = 32  # checkout, scans, quotes
+    admission_critical_queue_seconds: Optional[float] = None  # wait as long as it takes
+    admission_critical_queue_size: int = 1000
+    admission_normal_limit: int = 16  # lists, lookups and admin writes
+    admission_normal_queue_seconds: Optional[float] = 5.0
+    admission_normal_queue_size: int = 200
+    admission_background_limit: int = 2  # reports and exports
+    admission_background_queue_seconds: Optional[float] = 1.0
+    admission_background_queue_size: int = 10
+    admission_background_list_limit: int = 100  # GETs asking for more rows (limit=) run as background
+    admission_retry_after_seconds: int = 5
+    
+    # Health: startup warm-up and readiness checks
+    warmup_enabled: bool = True
+    warmup_product_limit: int = 5000  # active products read at startup
+    readiness_check_migrations: bool = True  # not ready until the database is at the migration head
+    
+    # Background tasks
+    task_queue_enabled: bool = True
+    task_queue_concurrency: int = 4
+    task_queue_batch_size: int = 50
+    task_queue_poll_interval_seconds: float = 2.0
+    task_queue_max_attempts: int = 5
+    task_queue_retry_backoff_seconds: float = 2.0
+    task_queue_lease_seconds: int = 300  # running tasks older than this are retried
+    task_queue_retention_hours: int = 24  # finished tasks are purged after this
+    
+    # Stock reservations: pending orders hold stock until completed, cancelled or expired
+    stock_reservation_ttl_seconds: float = 1800.0  # a pending order older than this is cancelled
+    stock_reservation_sweep_seconds: float = 60.0
+    stock_reservation_sweep_batch_size: int = 500  # orders released per transaction
+    stock_reservation_sweep_max_batches: Optional[int] = 20  # per run
+    
+    # Order archival
+    order_archive_after_months: Optional[int] = None  # archive finished orders older than this; unset disables
+    order_archive_interval_seconds: float = 3600.0
+    order_archive_batch_size: int = 500  # orders moved per transaction
+    order_archive_max_batches: Optional[int] = 20  # per run, so one run never holds the queue for long
+    
+    # Server-sent events
+    event_queue_size: int = 100  # per connection; a full queue is replaced by a resync event
+    event_heartbeat_seconds: float = 15.0
+    stream_token_expire_seconds: int = 60  # only needed to open a stream, so kept short
+    
+    # Metrics
+    metrics_enabled: bool = True  # when off, no middleware or engine hooks are installed
+    
+    # Query profiling
+    slow_query_threshold_ms: Optional[float] = None  # log statements slower than this
+    query_profiling_enabled: bool = False
+    query_profile_sample_rate: float = 0.01  # fraction of requests profiled
+    query_profile_header: bool = True  # add X-Query-Profile to profiled responses
+    query_profile_duplicate_warning: int = 10  # duplicates that raise the log line to a warning
+    
+    # SQLite profile, applied to every new SQLite connection
+    sqlite_tuning_enabled: bool = True
+    sqlite_journal_mode: str = "WAL"  # readers no longer block the writer
+    sqlite_synchronous: str = "NORMAL"  # fsync at checkpoints, not every commit; safe with WAL
+    sqlite_mmap_size: int = 268435456  # 256 MiB of the file read through mmap
+    sqlite_cache_size: int = -65536  # negative is KiB, so 64 MiB page cache per connection
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_temp_store: str = "MEMORY"
+    
+    # Read replica
+    read_replica_url: Optional[str] = None  # list and report endpoints read from here when set
+    read_replica_max_lag_seconds: float = 5.0  # beyond this, reads fall back to the primary
+    read_replica_lag_check_seconds: float = 1.0
+    read_your_writes_seconds: float = 10.0  # a client reads from the primary this long after writing
     
     # Pagination
     default_page_size: int = 50
     max_page_size: int = 100
     
     class Config:
-        env_file = ".env"
+        env_file = ENV_FILE
         case_sensitive = False
 
 # Create a global settings instance
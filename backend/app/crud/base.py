@@ -1,24 +1,40 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from fastapi.encoders import jsonable_encoder
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Generic, List, Optional, Sequence, Type, TypeVar, Union
 from pydantic import BaseModel
+from sqlalchemy import delete, insert, inspect, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from app.database import Base
+from sqlalchemy.orm.attributes import set_committed_value
+from app.database import Base, record_bulk_writes
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+
+@lru_cache(maxsize=None)
+def model_columns(model: Type[Base]) -> FrozenSet[str]:
+    """Column attribute names of a mapped class, introspected once per model"""
+    return frozenset(attr.key for attr in inspect(model).column_attrs)
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
-        
+
         **Parameters**
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
 
+    @property
+    def columns(self) -> FrozenSet[str]:
+        # Looked up on first use: inspecting a model configures every mapper,
+        # which would otherwise happen while the app is still importing
+        return model_columns(self.model)
+
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
 
@@ -27,8 +43,44 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         return db.query(self.model).offset(skip).limit(limit).all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
+    @staticmethod
+    def _data(obj_in: Union[BaseModel, Dict[str, Any]], exclude_unset: bool = False) -> Dict[str, Any]:
+        if isinstance(obj_in, dict):
+            return obj_in
+        return obj_in.dict(exclude_unset=exclude_unset)
+
+    @staticmethod
+    def _supports_returning(db: Session, statement: str) -> bool:
+        return getattr(db.get_bind().dialect, f"{statement}_returning", False)
+
+    def _load_committed(self, db_obj: ModelType, values: Union[Row, Dict[str, Any]]) -> None:
+        # Put known column values back after commit() expired them, so the
+        # caller can read them without a refresh SELECT
+        mapping = values._mapping if isinstance(values, Row) else values
+        for key in self.columns:
+            if key in mapping:
+                set_committed_value(db_obj, key, mapping[key])
+
+    def _snapshot(self, db_obj: ModelType) -> Dict[str, Any]:
+        return {key: db_obj.__dict__[key] for key in self.columns if key in db_obj.__dict__}
+
+    def create(
+        self, db: Session, *, obj_in: Union[CreateSchemaType, Dict[str, Any]], returning: bool = False
+    ) -> ModelType:
+        """Insert one row.
+
+        With ``returning=True`` on a database that supports it, the row,
+        including server defaults, comes back from ``INSERT ... RETURNING``
+        instead of a separate refresh SELECT after the commit.
+        """
+        obj_in_data = self._data(obj_in)
+        if returning and self._supports_returning(db, "insert"):
+            db_obj = db.scalars(insert(self.model).returning(self.model), [obj_in_data]).one()
+            values = self._snapshot(db_obj)
+            record_bulk_writes(db, written=[db_obj])
+            db.commit()
+            self._load_committed(db_obj, values)
+            return db_obj
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
         db.commit()
@@ -40,23 +92,103 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        returning: bool = False
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        """Apply the given fields to ``db_obj``.
+
+        With ``returning=True`` the change is issued as ``UPDATE ... RETURNING``
+        and the row it returns, including ``onupdate`` values, is loaded back
+        into ``db_obj`` without a refresh SELECT.
+        """
+        update_data = {
+            field: value
+            for field, value in self._data(obj_in, exclude_unset=True).items()
+            if field in self.columns
+        }
+        if returning and self._supports_returning(db, "update"):
+            if not update_data:
+                return db_obj
+            table = self.model.__table__
+            row = db.execute(
+                update(table).where(table.c.id == db_obj.id).values(**update_data).returning(*table.c)
+            ).one()
+            self._load_committed(db_obj, row)
+            record_bulk_writes(db, written=[db_obj])
+            db.commit()
+            self._load_committed(db_obj, row)
+            return db_obj
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).get(id)
+        obj = db.get(self.model, id)
         db.delete(obj)
         db.commit()
         return obj
+
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[ModelType]:
+        """Insert many rows in one statement and return them.
+
+        Uses ``INSERT ... RETURNING`` where the database supports it, so the
+        objects come back with ids and defaults and need no refresh.
+        """
+        rows = [self._data(obj_in) for obj_in in objs_in]
+        if not rows:
+            return []
+        if self._supports_returning(db, "insert"):
+            db_objs = db.scalars(insert(self.model).returning(self.model), rows).all()
+            snapshots = [self._snapshot(db_obj) for db_obj in db_objs]
+            record_bulk_writes(db, written=db_objs)
+            db.commit()
+            for db_obj, values in zip(db_objs, snapshots):
+                self._load_committed(db_obj, values)
+            return list(db_objs)
+        db_objs = [self.model(**row) for row in rows]
+        db.add_all(db_objs)
+        db.commit()
+        return db_objs
+
+    def update_many(self, db: Session, *, objs_in: Sequence[Dict[str, Any]]) -> int:
+        """Bulk UPDATE by primary key; each dict needs an ``id`` plus the changed fields.
+
+        The updated rows are read back in one SELECT for the write hooks,
+        which need whole rows rather than the changed fields.
+        """
+        rows = [
+            {field: value for field, value in obj_in.items() if field in self.columns}
+            for obj_in in objs_in
+        ]
+        rows = [row for row in rows if len(row) > 1]
+        if not rows:
+            return 0
+        db.execute(update(self.model), rows)
+        updated = (
+            db.query(self.model)
+            .filter(self.model.id.in_([row["id"] for row in rows]))
+            .populate_existing()
+            .all()
+        )
+        record_bulk_writes(db, written=updated)
+        db.commit()
+        return len(rows)
+
+    def remove_many(self, db: Session, *, ids: Sequence[int]) -> int:
+        """Delete rows by id in one statement and return how many were removed"""
+        if not ids:
+            return 0
+        # Loaded first so the write hooks know what went
+        db_objs = db.query(self.model).filter(self.model.id.in_(ids)).all()
+        result = db.execute(
+            delete(self.model).where(self.model.id.in_(ids)),
+            execution_options={"synchronize_session": "fetch"}
+        )
+        record_bulk_writes(db, deleted=db_objs)
+        db.commit()
+        return result.rowcount
@@ -7,19 +7,31 @@ from app.models import Order, OrderItem
 from app.schemas import OrderCreate, OrderUpdate
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
-    def get_by_order_number(self, db: Session, *, order_number: str) -> Optional[Order]:
-        return db.query(Order).filter(Order.order_number == order_number).first()
+    @staticmethod
+    def _for_store(query, store_id: Optional[int]):
+        # Leading with store_id lets the (store_id, ...) indexes prune other branches
+        if store_id is not None:
+            query = query.filter(Order.store_id == store_id)
+        return query
+
+    def get_by_order_number(
+        self, db: Session, *, order_number: str, store_id: Optional[int] = None
+    ) -> Optional[Order]:
+        return self._for_store(
+            db.query(Order).filter(Order.order_number == order_number), store_id
+        ).first()
 
     def get_by_customer(
         self, 
         db: Session, 
         *, 
         customer_id: int, 
+        store_id: Optional[int] = None,
         skip: int = 0, 
         limit: int = 100
     ) -> List[Order]:
         return (
-            db.query(Order)
+            self._for_store(db.query(Order), store_id)
             .filter(Order.customer_id == customer_id)
             .order_by(desc(Order.created_at))
             .offset(skip)
@@ -32,11 +44,12 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         db: Session, 
         *, 
         status: str, 
+        store_id: Optional[int] = None,
         skip: int = 0, 
         limit: int = 100
     ) -> List[Order]:
         return (
-            db.query(Order)
+            self._for_store(db.query(Order), store_id)
             .filter(Order.status == status)
             .order_by(desc(Order.created_at))
             .offset(skip)
@@ -50,11 +63,12 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         *,
         start_date: datetime,
         end_date: datetime,
+        store_id: Optional[int] = None,
         skip: int = 0,
         limit: int = 100
     ) -> List[Order]:
         return (
-            db.query(Order)
+            self._for_store(db.query(Order), store_id)
             .filter(
                 and_(
                     Order.created_at >= start_date,
@@ -67,9 +81,9 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             .all()
         )
 
-    def get_recent(self, db: Session, *, limit: int = 10) -> List[Order]:
+    def get_recent(self, db: Session, *, store_id: Optional[int] = None, limit: int = 10) -> List[Order]:
         return (
-            db.query(Order)
+            self._for_store(db.query(Order), store_id)
             .order_by(desc(Order.created_at))
             .limit(limit)
             .all()
@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from app.crud.base import CRUDBase
-from app.models import Product, Category
+from app.cache import cache
+from app.crud.base import CRUDBase, model_columns
+from app.models import Product, Category, StoreStock
 from app.schemas import ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
@@ -51,12 +52,16 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         
         return db_query.offset(skip).limit(limit).all()
 
-    def get_low_stock(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Product]:
+    def get_low_stock(
+        self, db: Session, *, store_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Product]:
         return (
             db.query(Product)
+            .join(StoreStock, StoreStock.product_id == Product.id)
             .filter(
+                StoreStock.store_id == store_id,
                 Product.is_active == True,
-                Product.stock_quantity <= Product.min_stock_level
+                StoreStock.available <= Product.min_stock_level
             )
             .offset(skip)
             .limit(limit)
@@ -67,5 +72,16 @@ class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
     def get_by_name(self, db: Session, *, name: str) -> Optional[Category]:
         return db.query(Category).filter(Category.name == name).first()
 
+    def get_multi_cached(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Category rows as dicts, cached per worker until a category changes"""
+        def load() -> List[Dict[str, Any]]:
+            columns = model_columns(Category)
+            return [
+                {column: getattr(row, column) for column in columns}
+                for row in self.get_multi(db, skip=skip, limit=limit)
+            ]
+
+        return cache.get_or_load("categories", (skip, limit), load, tags=("categories",))
+
 product = CRUDProduct(Product)
 category = CRUDCategory(Category)
@@ -0,0 +1,25 @@
+from typing import List
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models import Promotion
+from app.schemas import PromotionCreate, PromotionUpdate
+
+class CRUDPromotion(CRUDBase[Promotion, PromotionCreate, PromotionUpdate]):
+    def get_active(self, db: Session, *, at: datetime, skip: int = 0, limit: int = 100) -> List[Promotion]:
+        return (
+            db.query(Promotion)
+            .filter(
+                Promotion.is_active == True,
+                (Promotion.starts_at == None) | (Promotion.starts_at <= at),
+                (Promotion.ends_at == None) | (Promotion.ends_at > at)
+            )
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_by_product(self, db: Session, *, product_id: int) -> List[Promotion]:
+        return db.query(Promotion).filter(Promotion.product_id == product_id).all()
+
+promotion = CRUDPromotion(Promotion)
@@ -1,19 +1,207 @@
-from sqlalchemy import create_engine
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 
-engine = create_engine(
-    settings.database_url, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+logger = logging.getLogger(__name__)
+
+
+def _create_engine(url: str, **kwargs):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        **kwargs
+    )
+
+    if url.startswith("sqlite"):
+        from app.sqlite_profile import configure_sqlite_engine
+        configure_sqlite_engine(engine, url)
+
+    if settings.metrics_enabled:
+        from app.metrics import instrument_engine
+        instrument_engine(engine)
+
+    if settings.slow_query_threshold_ms is not None or settings.query_profiling_enabled:
+        from app.profiling import instrument_engine_profiling
+        instrument_engine_profiling(engine)
+
+    return engine
+
+
+engine = _create_engine(settings.database_url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
+# Hooks that follow writes through after_flush (shared catalog, cache,
+# read-your-writes) also register here, for rows written by statements that
+# bypass the unit of work, such as CRUDBase's RETURNING and bulk paths
+BulkWriteListener = Callable[[Session, List[Any], List[Any]], None]
+bulk_write_listeners: List[BulkWriteListener] = []
+
+
+def record_bulk_writes(session: Session, written: Iterable[Any] = (), deleted: Iterable[Any] = ()) -> None:
+    """Hand instances written or deleted outside a flush to the write hooks"""
+    written, deleted = list(written), list(deleted)
+    if not written and not deleted:
+        return
+    for listener in bulk_write_listeners:
+        listener(session, written, deleted)
+
+# Replication lag in seconds, or NULL when the server is not a standby.
+# A standby that has replayed everything it received is not lagging, even
+# if the primary has been idle since the last replayed transaction.
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaRouter:
+    """Decides whether a read can go to the replica.
+
+    Reads stay on the primary for ``read_your_writes_seconds`` after the
+    same client committed a write, and for everyone while the replica lags
+    more than ``read_replica_max_lag_seconds`` or cannot be reached. Lag is
+    measured by a background thread every ``read_replica_lag_check_seconds``
+    and requests only read the last measurement. Write times are kept per
+    process, so with several workers stickiness only holds within the
+    worker that took the write.
+    """
+
+    def __init__(self, replica_engine):
+        self.engine = replica_engine
+        self._lock = threading.Lock()
+        self._writes: Dict[str, float] = {}
+        # (lag, monotonic time measured); replaced whole so readers need no lock
+        self._measurement: Tuple[Optional[float], float] = (None, 0.0)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_write(self, client: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._writes[client] = now
+            if len(self._writes) > 1024:
+                cutoff = now - settings.read_your_writes_seconds
+                self._writes = {key: at for key, at in self._writes.items() if at > cutoff}
+
+    def recently_wrote(self, client: str) -> bool:
+        written = self._writes.get(client)
+        return written is not None and time.monotonic() - written < settings.read_your_writes_seconds
+
+    def measure_lag(self) -> Optional[float]:
+        """Query the replica's lag now and keep it for ``lag``"""
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    lag = float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as exc:
+            logger.warning("Read replica unavailable, reading from primary: %s", exc)
+            lag = None
+        self._measurement = (lag, time.monotonic())
+        return lag
+
+    def lag(self) -> Optional[float]:
+        """Last measured lag in seconds, None when unknown or out of date"""
+        lag, measured = self._measurement
+        # A measurement the thread has not renewed, e.g. while a check hangs
+        # on an unreachable replica, no longer says anything about the lag
+        if time.monotonic() - measured > 3 * settings.read_replica_lag_check_seconds:
+            return None
+        return lag
+
+    def use_replica(self, client: str) -> bool:
+        if self.recently_wrote(client):
+            return False
+        lag = self.lag()
+        return lag is not None and lag <= settings.read_replica_max_lag_seconds
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-lag-check", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self.measure_lag()
+            if self._stopping.wait(settings.read_replica_lag_check_seconds):
+                break
+
+
+replica_router: Optional[ReplicaRouter] = None
+ReplicaSessionLocal = None
+
+if settings.read_replica_url:
+    replica_engine = _create_engine(settings.read_replica_url, pool_pre_ping=True)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    replica_router = ReplicaRouter(replica_engine)
+
+    @event.listens_for(ReplicaSessionLocal, "before_flush")
+    def _reject_replica_writes(session, flush_context, instances):
+        raise RuntimeError("Replica sessions are read-only; use get_db for writes")
+
+    @event.listens_for(SessionLocal, "after_flush")
+    def _mark_write(session, flush_context):
+        session.info["wrote"] = True
+
+    def _mark_bulk_write(session, written, deleted):
+        session.info["wrote"] = True
+
+    bulk_write_listeners.append(_mark_bulk_write)
+
+    @event.listens_for(SessionLocal, "after_commit")
+    def _record_write(session):
+        client = session.info.get("client")
+        if session.info.pop("wrote", False) and client is not None:
+            replica_router.record_write(client)
+
+
+def client_key(request: Request) -> str:
+    """Identify the caller for read-your-writes, by token or address"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else ""
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    if replica_router is not None:
+        db.info["client"] = client_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints such as lists and reports.
+
+    Uses the read replica when one is configured, it is keeping up, and the
+    caller has not just written; otherwise the primary.
+    """
+    if replica_router is None or not replica_router.use_replica(client_key(request)):
+        yield from get_db(request)
+        return
+    db: Session = ReplicaSessionLocal()
     try:
         yield db
     finally:
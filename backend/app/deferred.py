@@ -0,0 +1,32 @@
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Slow to import and only needed once requests arrive, so the app imports
+# them where they are used instead of at startup
+DEFERRED_MODULES = (
+    "jose.jwt",  # token signing; loads the cryptography backends
+    "passlib.context",
+    "passlib.handlers.argon2",
+)
+
+
+def import_deferred() -> None:
+    """Import the deferred modules now, e.g. in a preloading master before it forks"""
+    from app.passwords import get_pwd_context
+
+    for name in DEFERRED_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.warning("Deferred module %s is not installed", name)
+    get_pwd_context()
+
+
+def import_deferred_in_background() -> threading.Thread:
+    """Load them on a thread once the worker is serving, ahead of the first login"""
+    thread = threading.Thread(target=import_deferred, name="deferred-imports", daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,9 @@
-from fastapi import Depends, Query
+from fastapi import Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.auth import get_current_active_user
+from app.database import get_read_db
 from app.config import settings
+from app.models import Store, User
 from typing import Optional
 
 class CommonQueryParams:
@@ -33,3 +35,28 @@ def get_common_params(params: CommonQueryParams = Depends()) -> CommonQueryParam
 
 def get_search_params(params: SearchQueryParams = Depends()) -> SearchQueryParams:
     return params
+
+async def get_current_store(
+    x_store_id: Optional[int] = Header(None, description="Store to act for; defaults to the user's store"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Store:
+    """Resolve the store a request acts for: header, then user, then default.
+
+    Read from the read session, which list endpoints share, so resolving
+    the store does not pin a primary connection on replica-backed reads.
+    """
+    store_id = x_store_id or current_user.store_id or settings.default_store_id
+    if (
+        current_user.store_id is not None
+        and store_id != current_user.store_id
+        and not current_user.is_admin
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to act for this store"
+        )
+    store = db.get(Store, store_id)
+    if store is None or not store.is_active:
+        raise HTTPException(status_code=400, detail="Store not found or inactive")
+    return store
@@ -0,0 +1,135 @@
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one server-sent event frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+RESYNC_FRAME = format_sse("resync", {"reason": "subscriber fell behind"})
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+
+
+class Subscriber:
+    """One connected screen with its own bounded queue.
+
+    ``store_id`` limits it to events of one store; events without a store,
+    such as a deactivated product, reach every screen. When a slow client lets its queue fill up, the backlog is dropped and
+    replaced by a single ``resync`` event telling it to refetch, so one slow
+    screen never holds memory or delays the others.
+    """
+
+    def __init__(self, max_queue: int, store_id: Optional[int] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.store_id = store_id
+        self.dropped = 0
+
+    def wants(self, store_id: Optional[int]) -> bool:
+        return store_id is None or self.store_id is None or store_id == self.store_id
+
+    def offer(self, frame: bytes) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+
+
+class EventBroker:
+    """Pub/sub fan-out for order and stock events.
+
+    ``publish`` can be called from any thread. The event is serialized once
+    and handed to the event loop in a single callback that copies the same
+    frame into every subscriber queue, so 200 open dashboards cost one
+    serialization and one loop wake-up per event. Subscribers are per
+    worker; with a ``forward`` set, events also go to the other workers,
+    which hand them to ``deliver``.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._forward: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def forward_to(self, forward: Optional[Callable[[str, Dict[str, Any]], None]]) -> None:
+        """Also pass every event published in this worker to ``forward``"""
+        self._forward = forward
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        forward = self._forward
+        if forward is not None:
+            try:
+                forward(event_type, data)
+            except Exception:
+                logger.exception("Forwarding %s event failed", event_type)
+        self.deliver(event_type, data)
+
+    def deliver(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Send an event to this worker's subscribers only"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        with self._lock:
+            event_id = next(self._ids)
+        frame = format_sse(event_type, data, event_id)
+        try:
+            loop.call_soon_threadsafe(self._fan_out, frame, data.get("store_id"))
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
+
+    def _fan_out(self, frame: bytes, store_id: Optional[int]) -> None:
+        for subscriber in tuple(self._subscribers):
+            if subscriber.wants(store_id):
+                subscriber.offer(frame)
+
+    def subscribe(self, store_id: Optional[int] = None) -> Subscriber:
+        """Register a screen for events of ``store_id``, or of every store when None"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(settings.event_queue_size, store_id)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        if subscriber.dropped:
+            logger.info("Event subscriber left after dropping %s events", subscriber.dropped)
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Yield frames for one subscriber, with heartbeats while idle"""
+        try:
+            yield format_sse("ready", {"subscribers": self.subscriber_count})
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.event_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    frame = HEARTBEAT_FRAME
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+
+event_broker = EventBroker()
@@ -1,5 +1,6 @@
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
 import logging
@@ -51,7 +52,8 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         status_code=422,
         content={
             "detail": "Validation error",
-            "errors": exc.errors(),
+            # Errors from validators carry the exception itself in "ctx"
+            "errors": jsonable_encoder(exc.errors()),
             "type": "validation_error"
         }
     )
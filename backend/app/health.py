@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import Product
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+
+@lru_cache(maxsize=None)
+def expected_heads() -> Tuple[str, ...]:
+    """Head revisions of the migrations shipped with this code, read once"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    return tuple(sorted(ScriptDirectory.from_config(config).get_heads()))
+
+
+class Readiness:
+    """Whether this worker has warmed up, and the outcome of the last attempt"""
+
+    def __init__(self):
+        self.warmed = False
+        self.warmed_at: Optional[float] = None
+        self.warm_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def warm_up(self, session_factory=SessionLocal) -> bool:
+        """Touch the hot paths once so the first scans are as fast as later ones"""
+        with self._lock:
+            if self.warmed:
+                return True
+            started = time.perf_counter()
+            try:
+                _warm(session_factory)
+            except Exception as exc:
+                self.error = f"{type(exc).__name__}: {exc}"
+                logger.exception("Warm-up failed; readiness will retry it")
+                return False
+            self.warm_seconds = time.perf_counter() - started
+            self.warmed_at = time.time()
+            self.warmed = True
+            self.error = None
+            logger.info("Warm-up finished in %.0f ms", self.warm_seconds * 1000)
+            return True
+
+
+readiness = Readiness()
+
+
+def _warm(session_factory) -> None:
+    from app.crud.crud_product import category as category_crud
+    from app.services.promotions import get_promotion_index
+    from app.services.shared_catalog import shared_catalog
+    from app.services.stock import stock_levels
+
+    configure_mappers()
+    store_id = settings.default_store_id
+    db = session_factory()
+    try:
+        # Active catalog: the product list query and its stock lookup, which
+        # compiles their statements and pulls the rows into the database cache
+        products = (
+            db.query(Product)
+            .filter(Product.is_active == True)
+            .limit(settings.warmup_product_limit)
+            .all()
+        )
+        stock_levels(db, store_id, (product.id for product in products))
+        # Barcode map: the shared catalog holds it once opened; the database
+        # lookup behind it is compiled here for catalog misses
+        barcode = next((product.barcode for product in products if product.barcode), None)
+        if barcode is not None:
+            if shared_catalog is not None:
+                shared_catalog.find_barcode(barcode)
+            db.query(Product).filter(Product.barcode == barcode, Product.is_active == True).first()
+        # Categories and promotions are served from the cache
+        category_crud.get_multi_cached(db, skip=0, limit=100)
+        get_promotion_index(db)
+    finally:
+        db.close()
+
+
+def check_database() -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            result: Dict[str, Any] = {"ok": True}
+            if settings.readiness_check_migrations:
+                result["migrations"] = _check_migrations(connection)
+                result["ok"] = result["migrations"]["ok"]
+    except Exception as exc:
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def _check_migrations(connection) -> Dict[str, Any]:
+    from alembic.runtime.migration import MigrationContext
+
+    current = tuple(sorted(MigrationContext.configure(connection).get_current_heads()))
+    expected = expected_heads()
+    return {"ok": current == expected, "current": list(current), "expected": list(expected)}
+
+
+def check_readiness() -> Tuple[bool, Dict[str, Any]]:
+    """Run every readiness check; blocking, so call it off the event loop"""
+    from app.services.shared_catalog import shared_catalog
+
+    checks: Dict[str, Any] = {"database": check_database()}
+    if checks["database"]["ok"] and settings.warmup_enabled and not readiness.warmed:
+        # Startup warm-up failed, most likely because the database was down
+        readiness.warm_up()
+    checks["warm"] = {
+        "ok": readiness.warmed or not settings.warmup_enabled,
+        "seconds": None if readiness.warm_seconds is None else round(readiness.warm_seconds, 3),
+        "error": readiness.error,
+    }
+    if shared_catalog is not None:
+        checks["catalog"] = {"ok": shared_catalog.loaded}
+    return all(check["ok"] for check in checks.values()), checks
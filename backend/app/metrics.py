@@ -0,0 +1,306 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders Prometheus text"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        """Add a callable returning metrics computed at scrape time"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "pos_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "pos_http_request_duration_seconds", "HTTP request latency", ("method", "route")
+))
+http_response_size = registry.register(Histogram(
+    "pos_http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS
+))
+http_requests_in_flight = registry.register(Gauge(
+    "pos_http_requests_in_flight", "HTTP requests currently being served"
+))
+http_request_db_queries = registry.register(Histogram(
+    "pos_http_request_db_queries", "Database queries issued per HTTP request", ("method", "route"), QUERY_COUNT_BUCKETS
+))
+http_request_db_duration = registry.register(Histogram(
+    "pos_http_request_db_seconds", "Database time per HTTP request", ("method", "route")
+))
+db_queries_total = registry.register(Counter(
+    "pos_db_queries_total", "Database statements executed"
+))
+db_query_duration = registry.register(Histogram(
+    "pos_db_query_duration_seconds", "Database statement latency", (), QUERY_LATENCY_BUCKETS
+))
+
+
+class RequestStats:
+    """Per-request database counters, shared with the engine hooks"""
+
+    __slots__ = ("query_count", "query_seconds")
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement and attribute it to the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        db_queries_total.inc()
+        db_query_duration.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.query_seconds += elapsed
+
+
+def route_label(scope: Scope) -> str:
+    """Route template for a request, e.g. ``/api/orders/{order_id}``"""
+    route = scope.get("route")
+    if route is None:
+        app = scope.get("app")
+        for candidate in getattr(getattr(app, "router", None), "routes", ()):
+            # Requests answered before routing (shed, or 404) land here;
+            # skip entries without a template of their own, like mounts
+            if not hasattr(candidate, "path"):
+                continue
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+        else:
+            return "unmatched"
+    template = route.path
+    # Routes of an included router may carry only their own part of the
+    # path; take the router prefix from the request path in that case
+    parts = scope["path"].split("/")
+    depth = template.count("/")
+    if len(parts) - 1 > depth:
+        template = "/".join(parts[:len(parts) - depth]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, size and DB usage per route.
+
+    Written against the raw ASGI interface rather than BaseHTTPMiddleware so
+    it adds no extra task per request and does not buffer streaming
+    responses such as the event stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = "500"
+        size = 0
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_request.reset(token)
+            method = scope["method"]
+            route = route_label(scope)
+            http_requests_total.inc((method, route, status))
+            http_request_duration.observe(elapsed, (method, route))
+            http_response_size.observe(size, (method, route))
+            http_request_db_queries.observe(stats.query_count, (method, route))
+            http_request_db_duration.observe(stats.query_seconds, (method, route))
+
+
+def collect_runtime_metrics() -> Iterable[Metric]:
+    """Task queue, event stream and admission gauges, read at scrape time"""
+    from app.config import settings
+    from app.events import event_broker
+    from app.services.task_queue import task_queue
+
+    stats = task_queue.stats.snapshot()
+    depth = Gauge("pos_task_queue_depth", "Outbox tasks waiting to run")
+    depth.set(task_queue.depth())
+    in_flight = Gauge("pos_task_queue_in_flight", "Outbox tasks currently running")
+    in_flight.set(task_queue.in_flight)
+    outcomes = Counter("pos_tasks_total", "Outbox task executions by outcome", ("outcome",))
+    for outcome in ("succeeded", "retried", "failed"):
+        outcomes.inc((outcome,), stats[outcome])
+    wait = Counter("pos_task_queue_wait_seconds_total", "Time tasks spent due but not yet started")
+    wait.inc(amount=stats["queue_seconds_total"])
+    run = Counter("pos_task_run_seconds_total", "Time spent running tasks")
+    run.inc(amount=stats["run_seconds_total"])
+    subscribers = Gauge("pos_event_subscribers", "Connected event stream clients")
+    subscribers.set(event_broker.subscriber_count)
+    metrics = [depth, in_flight, outcomes, wait, run, subscribers]
+    if settings.admission_control_enabled:
+        metrics.extend(_admission_metrics())
+    return metrics
+
+
+def _admission_metrics() -> List[Metric]:
+    from app.admission import PRIORITIES, admission_controller as controller
+
+    running = Gauge("pos_admission_running", "Admitted requests running, by class", ("class",))
+    waiting = Gauge("pos_admission_waiting", "Requests waiting for a slot, by class", ("class",))
+    rejected = Counter("pos_admission_rejected_total", "Requests shed with 503, by class", ("class",))
+    queued = Counter("pos_admission_queue_seconds_total", "Time requests spent waiting for a slot", ("class",))
+    for name in PRIORITIES:
+        running.set(controller.running[name], (name,))
+        waiting.set(controller.waiting(name), (name,))
+        rejected.inc((name,), controller.rejected[name])
+        queued.inc((name,), controller.queue_seconds_total[name])
+    return [running, waiting, rejected, queued]
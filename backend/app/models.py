@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.money import Money
 
 class User(Base):
     __tablename__ = "users"
@@ -13,6 +15,19 @@ class User(Base):
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    store_id = Column(Integer, ForeignKey("stores.id"))  # home store; tills are limited to it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    store = relationship("Store")
+
+class Store(Base):
+    __tablename__ = "stores"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    address = Column(Text)
+    is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Customer(Base):
@@ -43,11 +58,10 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    price = Column(Float, nullable=False)
-    cost = Column(Float, default=0.0)
+    price = Column(Money, nullable=False)
+    cost = Column(Money, default=0)
     sku = Column(String, unique=True, index=True)
     barcode = Column(String, unique=True, index=True)
-    stock_quantity = Column(Integer, default=0)
     min_stock_level = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
     category_id = Column(Integer, ForeignKey("categories.id"))
@@ -56,18 +70,53 @@ class Product(Base):
     
     category = relationship("Category", back_populates="products")
     order_items = relationship("OrderItem", back_populates="product")
+    stock_levels = relationship("StoreStock", back_populates="product")
+
+class StoreStock(Base):
+    __tablename__ = "store_stock"
+    
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, index=True)
+    quantity = Column(Integer, nullable=False, default=0)  # on hand
+    reserved = Column(Integer, nullable=False, default=0, server_default="0")  # held by pending orders
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    store = relationship("Store")
+    product = relationship("Product", back_populates="stock_levels")
+    
+    @hybrid_property
+    def available(self):
+        # Usable on instances and in queries alike
+        return self.quantity - self.reserved
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # released after this
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_store_created_at", "store_id", "created_at"),
+        Index("ix_orders_store_status_created_at", "store_id", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    order_number = Column(String, unique=True, nullable=False)
+    order_number = Column(String, unique=True, index=True, nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
-    subtotal = Column(Float, nullable=False)
-    tax_amount = Column(Float, default=0.0)
-    discount_amount = Column(Float, default=0.0)
-    total_amount = Column(Float, nullable=False)
+    subtotal = Column(Money, nullable=False)
+    tax_amount = Column(Money, default=0)
+    discount_amount = Column(Money, default=0)  # promotions plus the manual discount
+    promotion_discount = Column(Money, nullable=False, default=0, server_default="0")
+    total_amount = Column(Money, nullable=False)
     payment_method = Column(String)
     status = Column(String, default="pending")  # pending, completed, cancelled, refunded
     notes = Column(Text)
@@ -76,6 +125,7 @@ class Order(Base):
     
     customer = relationship("Customer", back_populates="orders")
     user = relationship("User")
+    store = relationship("Store")
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
 class OrderItem(Base):
@@ -85,8 +135,163 @@ class OrderItem(Base):
     order_id = Column(Integer, ForeignKey("orders.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
-    unit_price = Column(Float, nullable=False)
-    total_price = Column(Float, nullable=False)
+    unit_price = Column(Money, nullable=False)
+    total_price = Column(Money, nullable=False)
     
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
+
+class Cart(Base):
+    __tablename__ = "carts"
+    __table_args__ = (
+        Index("ix_carts_store_status", "store_id", "status"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    customer_id = Column(Integer, ForeignKey("customers.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"))  # set at checkout
+    status = Column(String, nullable=False, default="open")  # open, checked_out, abandoned
+    payment_method = Column(String)
+    notes = Column(Text)
+    # Running totals, kept up to date line by line by app.services.carts
+    subtotal = Column(Money, nullable=False, default=0)
+    promotion_discount = Column(Money, nullable=False, default=0)
+    discount_amount = Column(Money, nullable=False, default=0)  # manual, taken off after tax
+    tax_amount = Column(Money, nullable=False, default=0)
+    total_amount = Column(Money, nullable=False, default=0)
+    tax_bases = Column(Text, nullable=False, default="{}")  # JSON: taxable minor units per tax profile
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    user = relationship("User")
+    customer = relationship("Customer")
+    items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
+    
+    # Derived per response by app.services.carts, not stored
+    taxes = ()
+    stock_warnings = ()
+
+class CartItem(Base):
+    __tablename__ = "cart_items"
+    __table_args__ = (
+        UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_product"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cart_id = Column(Integer, ForeignKey("carts.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    category_id = Column(Integer)  # as priced, for promotions and tax
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Money, nullable=False)  # after bulk tiers, or the manual price
+    manual_price = Column(Boolean, nullable=False, default=False)
+    total_price = Column(Money, nullable=False)
+    discount = Column(Money, nullable=False, default=0)  # best promotion for the line
+    promotion_id = Column(Integer)
+    promotion_name = Column(String)
+    tax_profile = Column(String, nullable=False)  # key into Cart.tax_bases
+    
+    cart = relationship("Cart", back_populates="items")
+    product = relationship("Product")
+
+class Promotion(Base):
+    __tablename__ = "promotions"
+    __table_args__ = (
+        Index("ix_promotions_active_window", "is_active", "ends_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    promotion_type = Column(String, nullable=False)  # buy_x_get_y, percent_off_product, percent_off_category
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
+    buy_quantity = Column(Integer)
+    get_quantity = Column(Integer)
+    percent_off = Column(Float)
+    starts_at = Column(DateTime(timezone=True))
+    ends_at = Column(DateTime(timezone=True))
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    product = relationship("Product")
+    category = relationship("Category")
+
+class OutboxTask(Base):
+    __tablename__ = "outbox_tasks"
+    __table_args__ = (
+        Index("ix_outbox_tasks_status_available_at", "status", "available_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_name = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String, primary_key=True)  # token id; one row per revoked token
+    user_id = Column(Integer, ForeignKey("users.id"))
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # row can go after this
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# Archived orders keep the columns of the hot tables. On PostgreSQL they are
+# range-partitioned by month of the order date (app.services.archive
+# creates the partitions); elsewhere they are plain tables.
+
+class ArchivedOrder(Base):
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        Index("ix_orders_archive_order_number", "order_number"),
+        Index("ix_orders_archive_store_created_at", "store_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    order_number = Column(String, nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    subtotal = Column(Money, nullable=False)
+    tax_amount = Column(Money, default=0)
+    discount_amount = Column(Money, default=0)
+    promotion_discount = Column(Money, nullable=False, default=0, server_default="0")
+    total_amount = Column(Money, nullable=False)
+    payment_method = Column(String)
+    status = Column(String)
+    notes = Column(Text)
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+    
+    customer = relationship("Customer", viewonly=True)
+    user = relationship("User", viewonly=True)
+    order_items = relationship(
+        "ArchivedOrderItem",
+        primaryjoin="foreign(ArchivedOrderItem.order_id) == ArchivedOrder.id",
+        viewonly=True
+    )
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_created_at = Column(DateTime(timezone=True), primary_key=True)
+    order_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"))
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Money, nullable=False)
+    total_price = Column(Money, nullable=False)
+    
+    product = relationship("Product", viewonly=True)
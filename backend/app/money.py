@@ -0,0 +1,53 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Optional
+from sqlalchemy.types import BigInteger, TypeDecorator
+
+# Amounts are stored as integer minor units (pesewas/cents)
+MINOR_UNIT_EXPONENT = 2
+MINOR_UNITS = 10 ** MINOR_UNIT_EXPONENT
+CENT = Decimal(1).scaleb(-MINOR_UNIT_EXPONENT)
+ZERO = Decimal(0).quantize(CENT)
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Convert a float, int, str or Decimal amount to a 2dp Decimal"""
+    if value is None:
+        return ZERO
+    if isinstance(value, float):
+        # str() gives the shortest repr, so 19.99 stays 19.99 rather than 19.989999...
+        value = str(value)
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_minor(value: Any) -> int:
+    """Convert an amount to integer minor units"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value * MINOR_UNITS
+    return int(to_decimal(value).scaleb(MINOR_UNIT_EXPONENT))
+
+
+def from_minor(value: int) -> Decimal:
+    """Convert integer minor units back to a 2dp Decimal"""
+    return Decimal(value).scaleb(-MINOR_UNIT_EXPONENT).quantize(CENT)
+
+
+def round_minor(value: Decimal) -> int:
+    """Round a fractional minor unit amount half-up to a whole minor unit"""
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class Money(TypeDecorator):
+    """Monetary column stored as integer minor units and exposed as Decimal"""
+
+    impl = BigInteger  # int32 would cap totals near 21M cedis on PostgreSQL
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return to_minor(value)
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[Decimal]:
+        if value is None:
+            return None
+        return from_minor(value)
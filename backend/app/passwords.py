@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional, Tuple, TypeVar
+import asyncio
+import os
+import threading
+from fastapi import HTTPException, status
+from app.config import settings
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """The argon2 CryptContext, built on first use since passlib and argon2 are slow to import"""
+    from passlib.context import CryptContext
+
+    # Hashes made with other parameters still verify; needs_update/verify_and_update
+    # flag them so logins can upgrade them in place
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=settings.argon2_time_cost,
+        argon2__memory_cost=settings.argon2_memory_cost_kib,
+        argon2__parallelism=settings.argon2_parallelism,
+    )
+
+
+def _lower_priority() -> None:
+    # Linux applies niceness per thread, so hashing yields the CPU to request handling
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), settings.password_hash_nice)
+    except (AttributeError, OSError):
+        pass
+
+
+class PasswordHasher:
+    """Runs argon2 off the event loop on a small thread pool.
+
+    argon2-cffi releases the GIL while hashing, so threads run in parallel
+    with each other and with request handling. At most ``workers`` hashes
+    run at once and ``queue_size`` more may wait; beyond that callers get a
+    503 with Retry-After instead of queueing without bound. Hashing threads
+    run at a lower CPU priority where the OS allows it.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix="password-hash", initializer=_lower_priority
+                    )
+        return self._executor
+
+    async def _run(self, function: Callable[..., T], *args) -> T:
+        if self._slots is None:
+            # Pool disabled: hash on the calling thread as before
+            return function(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, try again shortly",
+                headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+            )
+        try:
+            future = self._pool().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the hash finishes, even if the request gave up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; the second item is a new hash when the stored one uses old parameters"""
+        return await self._run(self._verify_and_update, password, hashed_password)
+
+    @staticmethod
+    def _hash(password: str) -> str:
+        return get_pwd_context().hash(password)
+
+    @staticmethod
+    def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return get_pwd_context().verify_and_update(password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_size)
@@ -0,0 +1,138 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+import logging
+import random
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.metrics import route_label
+
+logger = logging.getLogger("app.profiling")
+
+MAX_STATEMENT_LENGTH = 500
+
+
+class QueryProfile:
+    """Statements issued while serving one request"""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    @property
+    def duplicates(self) -> int:
+        """Executions beyond the first of each distinct statement"""
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return max(self.statements.items(), key=lambda item: item[1])
+
+    def header_value(self) -> str:
+        return f"count={self.count};time_ms={self.seconds * 1000:.1f};duplicates={self.duplicates}"
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+current_scope: ContextVar[Optional[Scope]] = ContextVar("current_scope", default=None)
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Describe bound parameters by type only, never by value"""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def instrument_engine_profiling(engine: Engine) -> None:
+    """Log slow statements and feed the per-request query profile"""
+    threshold = settings.slow_query_threshold_ms
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._profile_started
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            scope = current_scope.get()
+            route = f"{scope['method']} {route_label(scope)}" if scope is not None else "background"
+            logger.warning(
+                "Slow query %.1fms on %s: %s params=%s",
+                elapsed * 1000, route, _shorten(statement), parameter_shape(parameters, executemany)
+            )
+
+
+class QueryProfilerMiddleware:
+    """Attach a query breakdown to a sample of requests.
+
+    Sampled requests get an ``X-Query-Profile`` header (count, total time,
+    duplicate statements) and a log line naming the most repeated
+    statement, which is how N+1 patterns show up. Every request records
+    its scope so slow-query log lines can name the route.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scope_token = current_scope.set(scope)
+        if not settings.query_profiling_enabled or random.random() >= settings.query_profile_sample_rate:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_scope.reset(scope_token)
+            return
+
+        profile = QueryProfile()
+        profile_token = current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.query_profile_header:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-profile", profile.header_value().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(profile_token)
+            current_scope.reset(scope_token)
+            if profile.count:
+                statement, repeats = profile.most_repeated()
+                log = logger.warning if profile.duplicates >= settings.query_profile_duplicate_warning else logger.info
+                log(
+                    "Query profile %s %s: count=%s time=%.1fms duplicates=%s most_repeated=%sx %s",
+                    scope["method"], route_label(scope), profile.count, profile.seconds * 1000,
+                    profile.duplicates, repeats, _shorten(statement)
+                )
@@ -1,22 +1,35 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.models import User
-from app.schemas import Token, UserCreate, User as UserSchema
+from app.schemas import Logout, TillSession, TillSessionCreate, Token, TokenRefresh, UserCreate, User as UserSchema
+from app.passwords import password_hasher
 from app.auth import (
     authenticate_user, 
     create_access_token, 
-    get_password_hash,
+    create_refresh_token,
+    create_till_session_token,
+    decode_token,
+    revoke_token,
     get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    oauth2_scheme,
+    ACCESS_TOKEN,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN,
+    TILL_SESSION_TOKEN
 )
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
 async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    # Hash before querying so no connection is held while waiting for the pool
+    hashed_password = await password_hasher.hash(user.password)
+
     # Check if user already exists
     db_user = db.query(User).filter(
         (User.username == user.username) | (User.email == user.email)
@@ -28,7 +41,6 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -46,7 +58,7 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,7 +69,79 @@ async def login_for_access_token(
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user.username)
+    }
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: TokenRefresh, db: Session = Depends(get_db)):
+    """Trade a refresh token or till session token for a new access token.
+
+    Refresh tokens are single use and come back rotated; till session tokens
+    stay valid and must be presented with the device ID they were issued to.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(body.refresh_token, REFRESH_TOKEN)
+    except HTTPException:
+        payload = decode_token(body.refresh_token, TILL_SESSION_TOKEN)
+        if body.device_id is None or payload.get("dev") != body.device_id:
+            raise credentials_exception
+    
+    user = db.query(User).filter(User.username == payload["sub"]).first()
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    claims = {"sub": user.username}
+    refresh_token = None
+    if payload["typ"] == REFRESH_TOKEN:
+        # Revoking first makes a replayed or concurrently used token fail
+        if not revoke_token(db, payload, user_id=user.id):
+            raise credentials_exception
+        refresh_token = create_refresh_token(user.username)
+    else:
+        claims["dev"] = payload["dev"]
+    access_token = create_access_token(
+        data=claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/till-session", response_model=TillSession)
+async def create_till_session(
+    body: TillSessionCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Issue a long-lived session token bound to one till device"""
+    token = create_till_session_token(current_user.username, body.device_id)
+    return {
+        "till_session_token": token,
+        "token_type": "bearer",
+        "device_id": body.device_id,
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=settings.till_session_expire_days)
+    }
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: Optional[Logout] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Revoke the current access token and, if given, a refresh or till session token"""
+    payload = decode_token(token, ACCESS_TOKEN)
+    revoke_token(db, payload)
+    if body is not None and body.refresh_token:
+        for token_type in (REFRESH_TOKEN, TILL_SESSION_TOKEN):
+            try:
+                revoke_token(db, decode_token(body.refresh_token, token_type))
+                break
+            except HTTPException:
+                continue
 
 @router.get("/me", response_model=UserSchema)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
@@ -0,0 +1,122 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc
+from app.database import get_db
+from app.models import Cart, Store, User
+from app.schemas import (
+    Cart as CartSchema, CartCheckout, CartCreate, CartItemAdd, CartItemUpdate, CartLineChange,
+    CartUpdate, Order as OrderSchema
+)
+from app.auth import get_current_active_user
+from app.dependencies import get_current_store
+from app.services.carts import CartService
+
+router = APIRouter()
+
+@router.post("/", response_model=CartSchema)
+async def create_cart(
+    cart: CartCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    return CartService.create_cart(db, cart, current_user, store)
+
+@router.get("/", response_model=List[CartSchema])
+async def read_open_carts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    # Lets a till pick its carts up again after a restart
+    carts = (
+        db.query(Cart)
+        .options(selectinload(Cart.items))
+        .filter(Cart.store_id == store.id, Cart.user_id == current_user.id, Cart.status == "open")
+        .order_by(desc(Cart.created_at))
+        .all()
+    )
+    return [CartService.describe(db, cart) for cart in carts]
+
+@router.get("/{cart_id}", response_model=CartSchema)
+async def read_cart(
+    cart_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id)
+    return CartService.describe(db, cart)
+
+@router.put("/{cart_id}", response_model=CartSchema)
+async def update_cart(
+    cart_id: int,
+    cart_update: CartUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    return CartService.update_cart(db, cart, cart_update)
+
+@router.delete("/{cart_id}")
+async def abandon_cart(
+    cart_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    CartService.abandon_cart(db, cart)
+    return {"message": "Cart abandoned successfully"}
+
+@router.post("/{cart_id}/items", response_model=CartLineChange)
+async def add_cart_item(
+    cart_id: int,
+    item: CartItemAdd,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    line, warning = CartService.set_line(
+        db, cart, item.product_id, item.quantity, item.unit_price, add=True
+    )
+    return {"item": line, "stock_warning": warning, "totals": cart}
+
+@router.put("/{cart_id}/items/{product_id}", response_model=CartLineChange)
+async def update_cart_item(
+    cart_id: int,
+    product_id: int,
+    item: CartItemUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    line, warning = CartService.set_line(db, cart, product_id, item.quantity, item.unit_price)
+    return {"item": line, "stock_warning": warning, "totals": cart}
+
+@router.delete("/{cart_id}/items/{product_id}", response_model=CartLineChange)
+async def remove_cart_item(
+    cart_id: int,
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    CartService.set_line(db, cart, product_id, 0)
+    return {"item": None, "stock_warning": None, "totals": cart}
+
+@router.post("/{cart_id}/checkout", response_model=OrderSchema)
+async def checkout_cart(
+    cart_id: int,
+    checkout: CartCheckout,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    cart = CartService.get_cart(db, cart_id, store.id, lock=True)
+    return CartService.checkout(db, cart, checkout, current_user, store)
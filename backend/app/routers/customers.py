@@ -1,7 +1,7 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Customer, User
 from app.schemas import Customer as CustomerSchema, CustomerCreate, CustomerUpdate
 from app.auth import get_current_active_user
@@ -31,7 +31,7 @@ async def read_customers(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     query = db.query(Customer)
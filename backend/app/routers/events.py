@@ -0,0 +1,35 @@
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.models import Store, User
+from app.auth import create_stream_token, get_current_active_user, get_stream_grant
+from app.config import settings
+from app.dependencies import get_current_store
+from app.events import event_broker
+from app.schemas import StreamToken
+
+router = APIRouter()
+
+@router.post("/token", response_model=StreamToken)
+async def create_token(
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    """Short-lived token for opening the event stream; admins see every store"""
+    store_id = None if current_user.is_admin else store.id
+    return {
+        "token": create_stream_token(current_user.username, store_id),
+        "expires_in": settings.stream_token_expire_seconds,
+        "store_id": store_id
+    }
+
+@router.get("/stream")
+async def stream_events(grant: Tuple[User, Optional[int]] = Depends(get_stream_grant)):
+    """Server-sent events for order-created/completed/cancelled and stock changes"""
+    _, store_id = grant
+    subscriber = event_broker.subscribe(store_id)
+    return StreamingResponse(
+        event_broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,21 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.health import check_readiness
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    """The worker is running and its event loop answers; nothing else is checked"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness_check():
+    """Database reachable and fully migrated, hot data loaded"""
+    # The checks block on the database, which may be the thing that is down
+    ready, checks = await asyncio.to_thread(check_readiness)
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", "checks": checks},
+        status_code=200 if ready else 503
+    )
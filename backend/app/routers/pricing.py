@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Store, User
+from app.money import from_minor
+from app.schemas import OrderCreate, OrderQuote
+from app.auth import get_current_active_user, get_current_admin_user
+from app.dependencies import get_current_store
+from app.cache import cache
+from app.services.order_service import OrderService
+from app.services.pricing_rules import get_pricing_rules, reload_pricing_rules
+
+router = APIRouter()
+
+@router.post("/quote", response_model=OrderQuote)
+async def quote_order(
+    order: OrderCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
+):
+    totals, _, _ = OrderService.quote_order(db, order, store.id)
+    return {
+        "subtotal": from_minor(totals.subtotal),
+        "tax_amount": from_minor(totals.tax_amount),
+        "discount_amount": from_minor(totals.discount_amount),
+        "total_amount": from_minor(totals.total_amount),
+        "promotion_discount": from_minor(totals.promotion_discount),
+        "taxes": [
+            {"code": code, "amount": from_minor(amount)}
+            for code, amount in totals.taxes.items()
+        ],
+        "items": [
+            {
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "unit_price": from_minor(line.unit_price),
+                "total_price": from_minor(line.total_price),
+                "discount": from_minor(line.discount)
+            }
+            for line in totals.lines
+        ],
+        "promotions": [
+            {
+                "promotion_id": match.promotion_id,
+                "name": match.name,
+                "product_id": match.product_id,
+                "amount": from_minor(match.amount)
+            }
+            for match in totals.promotions
+        ]
+    }
+
+@router.get("/rules")
+async def read_pricing_rules(current_user: User = Depends(get_current_admin_user)):
+    return get_pricing_rules().definition
+
+@router.post("/rules/reload")
+async def reload_rules(current_user: User = Depends(get_current_admin_user)):
+    try:
+        rules = reload_pricing_rules()
+    except (OSError, ValueError, KeyError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid pricing rules: {exc}")
+    cache.invalidate_tags("pricing_rules")
+    return {"message": "Pricing rules reloaded", "rules": rules.definition}
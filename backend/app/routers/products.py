@@ -1,8 +1,8 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Product, Category, User
+from app.database import get_db, get_read_db
+from app.models import Product, Category, Store, User
 from app.schemas import (
     Product as ProductSchema, 
     ProductCreate, 
@@ -12,6 +12,11 @@ from app.schemas import (
     CategoryUpdate
 )
 from app.auth import get_current_active_user
+from app.crud.crud_product import category as category_crud
+from app.dependencies import get_current_store
+from app.events import event_broker
+from app.services.shared_catalog import shared_catalog
+from app.services.stock import product_with_stock, set_stock, stock_levels, with_stock
 
 router = APIRouter()
 
@@ -32,11 +37,10 @@ async def create_category(
 async def read_categories(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    categories = db.query(Category).offset(skip).limit(limit).all()
-    return categories
+    return category_crud.get_multi_cached(db, skip=skip, limit=limit)
 
 @router.get("/categories/{category_id}", response_model=CategorySchema)
 async def read_category(
@@ -95,7 +99,8 @@ async def delete_category(
 async def create_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
 ):
     # Check if category exists if provided
     if product.category_id:
@@ -114,11 +119,20 @@ async def create_product(
         if existing_product:
             raise HTTPException(status_code=400, detail="Barcode already exists")
     
-    db_product = Product(**product.dict())
+    product_data = product.dict()
+    stock_quantity = product_data.pop("stock_quantity") or 0
+    db_product = Product(**product_data)
     db.add(db_product)
+    db.flush()
+    set_stock(db, store.id, db_product.id, stock_quantity)
     db.commit()
     db.refresh(db_product)
-    return db_product
+    event_broker.publish("stock.changed", {
+        "store_id": store.id,
+        "product_id": db_product.id,
+        "stock_quantity": stock_quantity
+    })
+    return product_with_stock(db_product, stock_quantity)
 
 @router.get("/", response_model=List[ProductSchema])
 async def read_products(
@@ -127,8 +141,9 @@ async def read_products(
     category_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
     active_only: bool = Query(True),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
 ):
     query = db.query(Product)
     
@@ -147,25 +162,27 @@ async def read_products(
         )
     
     products = query.offset(skip).limit(limit).all()
-    return products
+    return with_stock(db, store.id, products)
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def read_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
 ):
     product = db.query(Product).filter(Product.id == product_id).first()
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return with_stock(db, store.id, [product])[0]
 
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
     product_id: int,
     product_update: ProductUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
 ):
     product = db.query(Product).filter(Product.id == product_id).first()
     if product is None:
@@ -196,12 +213,23 @@ async def update_product(
         if not category:
             raise HTTPException(status_code=400, detail="Category not found")
     
+    stock_quantity = update_data.pop("stock_quantity", None)
+    if stock_quantity is not None:
+        set_stock(db, store.id, product.id, stock_quantity)
+    
     for field, value in update_data.items():
         setattr(product, field, value)
     
     db.commit()
     db.refresh(product)
-    return product
+    available = stock_levels(db, store.id, [product.id])[product.id]
+    if stock_quantity is not None:
+        event_broker.publish("stock.changed", {
+            "store_id": store.id,
+            "product_id": product.id,
+            "stock_quantity": available
+        })
+    return product_with_stock(product, available)
 
 @router.delete("/{product_id}")
 async def delete_product(
@@ -216,18 +244,28 @@ async def delete_product(
     # Soft delete by setting is_active to False
     product.is_active = False
     db.commit()
+    event_broker.publish("product.deactivated", {"product_id": product_id})
     return {"message": "Product deactivated successfully"}
 
 @router.get("/barcode/{barcode}", response_model=ProductSchema)
 async def get_product_by_barcode(
     barcode: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: Store = Depends(get_current_store)
 ):
-    product = db.query(Product).filter(
-        Product.barcode == barcode,
-        Product.is_active == True
-    ).first()
+    product = None
+    product_id = shared_catalog.find_barcode(barcode) if shared_catalog is not None else None
+    if product_id is not None:
+        # Barcode hashes can collide, so check the row the catalog points at
+        product = db.get(Product, product_id)
+        if product is not None and (product.barcode != barcode or not product.is_active):
+            product = None
+    if product is None:
+        product = db.query(Product).filter(
+            Product.barcode == barcode,
+            Product.is_active == True
+        ).first()
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return with_stock(db, store.id, [product])[0]
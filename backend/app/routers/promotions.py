@@ -0,0 +1,108 @@
+from typing import List
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import Promotion, Product, Category, User
+from app.schemas import (
+    Promotion as PromotionSchema,
+    PromotionCreate,
+    PromotionUpdate
+)
+from app.auth import get_current_active_user
+from app.crud.crud_promotion import promotion as promotion_crud
+
+router = APIRouter()
+
+def validate_promotion(db: Session, promotion: Promotion) -> None:
+    """Check that a promotion has the fields its type needs"""
+    if promotion.promotion_type == "buy_x_get_y":
+        if not promotion.product_id:
+            raise HTTPException(status_code=400, detail="buy_x_get_y promotions need a product_id")
+        if not promotion.buy_quantity or not promotion.get_quantity or promotion.buy_quantity < 1 or promotion.get_quantity < 1:
+            raise HTTPException(status_code=400, detail="buy_x_get_y promotions need buy_quantity and get_quantity of at least 1")
+    elif promotion.promotion_type == "percent_off_product":
+        if not promotion.product_id or not promotion.percent_off:
+            raise HTTPException(status_code=400, detail="percent_off_product promotions need a product_id and percent_off")
+    elif promotion.promotion_type == "percent_off_category":
+        if not promotion.category_id or not promotion.percent_off:
+            raise HTTPException(status_code=400, detail="percent_off_category promotions need a category_id and percent_off")
+    
+    if promotion.starts_at and promotion.ends_at and promotion.ends_at <= promotion.starts_at:
+        raise HTTPException(status_code=400, detail="ends_at must be after starts_at")
+    
+    if promotion.product_id and not db.query(Product).filter(Product.id == promotion.product_id).first():
+        raise HTTPException(status_code=400, detail="Product not found")
+    if promotion.category_id and not db.query(Category).filter(Category.id == promotion.category_id).first():
+        raise HTTPException(status_code=400, detail="Category not found")
+
+@router.post("/", response_model=PromotionSchema)
+async def create_promotion(
+    promotion: PromotionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    db_promotion = Promotion(**promotion.dict())
+    validate_promotion(db, db_promotion)
+    db.add(db_promotion)
+    db.commit()
+    db.refresh(db_promotion)
+    return db_promotion
+
+@router.get("/", response_model=List[PromotionSchema])
+async def read_promotions(
+    skip: int = 0,
+    limit: int = 100,
+    active_only: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    if active_only:
+        return promotion_crud.get_active(db, at=datetime.now(timezone.utc), skip=skip, limit=limit)
+    return promotion_crud.get_multi(db, skip=skip, limit=limit)
+
+@router.get("/{promotion_id}", response_model=PromotionSchema)
+async def read_promotion(
+    promotion_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    promotion = promotion_crud.get(db, id=promotion_id)
+    if promotion is None:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    return promotion
+
+@router.put("/{promotion_id}", response_model=PromotionSchema)
+async def update_promotion(
+    promotion_id: int,
+    promotion_update: PromotionUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    promotion = promotion_crud.get(db, id=promotion_id)
+    if promotion is None:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    
+    update_data = promotion_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(promotion, field, value)
+    validate_promotion(db, promotion)
+    
+    db.commit()
+    db.refresh(promotion)
+    return promotion
+
+@router.delete("/{promotion_id}")
+async def delete_promotion(
+    promotion_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    promotion = promotion_crud.get(db, id=promotion_id)
+    if promotion is None:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    
+    # Soft delete so past orders can still be explained
+    promotion.is_active = False
+    db.commit()
+    return {"message": "Promotion deactivated successfully"}
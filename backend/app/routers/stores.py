@@ -0,0 +1,99 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db
+from app.models import Store, User
+from app.schemas import (
+    Product as ProductSchema,
+    Store as StoreSchema,
+    StoreCreate,
+    StoreUpdate,
+    User as UserSchema
+)
+from app.auth import get_current_active_user, get_current_admin_user
+from app.crud.crud_product import product as product_crud
+from app.services.stock import with_stock
+
+router = APIRouter()
+
+@router.get("/", response_model=List[StoreSchema])
+async def read_stores(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return db.query(Store).order_by(Store.id).all()
+
+@router.post("/", response_model=StoreSchema)
+async def create_store(
+    store: StoreCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    if db.query(Store).filter(Store.code == store.code).first():
+        raise HTTPException(status_code=400, detail="Store code already exists")
+    
+    db_store = Store(**store.dict())
+    db.add(db_store)
+    db.commit()
+    db.refresh(db_store)
+    return db_store
+
+@router.get("/{store_id}", response_model=StoreSchema)
+async def read_store(
+    store_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    store = db.get(Store, store_id)
+    if store is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return store
+
+@router.put("/{store_id}", response_model=StoreSchema)
+async def update_store(
+    store_id: int,
+    store_update: StoreUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    store = db.get(Store, store_id)
+    if store is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    
+    for field, value in store_update.dict(exclude_unset=True).items():
+        setattr(store, field, value)
+    
+    db.commit()
+    db.refresh(store)
+    return store
+
+@router.put("/{store_id}/users/{user_id}", response_model=UserSchema)
+async def assign_user_to_store(
+    store_id: int,
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    if db.get(Store, store_id) is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user.store_id = store_id
+    db.commit()
+    db.refresh(user)
+    return user
+
+@router.get("/{store_id}/low-stock", response_model=List[ProductSchema])
+def read_low_stock(
+    store_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.store_id not in (None, store_id) and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not allowed to act for this store")
+    products = product_crud.get_low_stock(db, store_id=store_id, skip=skip, limit=limit)
+    return with_stock(db, store_id, products)
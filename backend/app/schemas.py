@@ -29,6 +29,7 @@ class User(UserBase):
     id: int
     is_active: bool
     is_admin: bool
+    store_id: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -57,6 +58,28 @@ class Customer(CustomerBase):
     class Config:
         from_attributes = True
 
+# Store schemas
+class StoreBase(BaseModel):
+    code: str
+    name: str
+    address: Optional[str] = None
+    is_active: Optional[bool] = True
+
+class StoreCreate(StoreBase):
+    pass
+
+class StoreUpdate(BaseModel):
+    name: Optional[str] = None
+    address: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class Store(StoreBase):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Category schemas
 class CategoryBase(BaseModel):
     name: str
@@ -106,6 +129,26 @@ class ProductUpdate(BaseModel):
 
 class Product(ProductBase):
     id: int
+    stock_quantity: int  # available at the store the request acts for; see app.services.stock
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    category: Optional[Category] = None
+    
+    class Config:
+        from_attributes = True
+
+class OrderItemProduct(BaseModel):
+    """Product as nested in orders: stock is per store and not loaded there"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    price: float
+    cost: Optional[float] = 0.0
+    sku: Optional[str] = None
+    barcode: Optional[str] = None
+    min_stock_level: Optional[int] = 0
+    is_active: Optional[bool] = True
+    category_id: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     category: Optional[Category] = None
@@ -125,7 +168,7 @@ class OrderItemCreate(OrderItemBase):
 class OrderItem(OrderItemBase):
     id: int
     total_price: float
-    product: Optional[Product] = None
+    product: Optional[OrderItemProduct] = None
     
     class Config:
         from_attributes = True
@@ -150,23 +193,218 @@ class OrderUpdate(BaseModel):
 class Order(OrderBase):
     id: int
     order_number: str
+    store_id: int
     user_id: int
     subtotal: float
     tax_amount: float
+    promotion_discount: float = 0.0
     total_amount: float
     status: str
     created_at: datetime
     updated_at: Optional[datetime] = None
     customer: Optional[Customer] = None
     order_items: List[OrderItem] = []
+    archived_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+# Promotion schemas
+PROMOTION_TYPES = ("buy_x_get_y", "percent_off_product", "percent_off_category")
+
+class PromotionBase(BaseModel):
+    name: str
+    promotion_type: str
+    product_id: Optional[int] = None
+    category_id: Optional[int] = None
+    buy_quantity: Optional[int] = None
+    get_quantity: Optional[int] = None
+    percent_off: Optional[float] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    is_active: Optional[bool] = True
+
+    @validator('promotion_type')
+    def validate_promotion_type(cls, v):
+        if v not in PROMOTION_TYPES:
+            raise ValueError(f"promotion_type must be one of: {', '.join(PROMOTION_TYPES)}")
+        return v
+
+    @validator('percent_off')
+    def validate_percent_off(cls, v):
+        if v is not None and not 0 < v <= 100:
+            raise ValueError('percent_off must be between 0 and 100')
+        return v
+
+class PromotionCreate(PromotionBase):
+    pass
+
+class PromotionUpdate(BaseModel):
+    name: Optional[str] = None
+    buy_quantity: Optional[int] = None
+    get_quantity: Optional[int] = None
+    percent_off: Optional[float] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    is_active: Optional[bool] = None
+
+class Promotion(PromotionBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+# Pricing schemas
+class TaxLine(BaseModel):
+    code: str
+    amount: float
+
+class OrderItemQuote(BaseModel):
+    product_id: int
+    quantity: int
+    unit_price: float
+    total_price: float
+    discount: float = 0.0
+
+class AppliedPromotion(BaseModel):
+    promotion_id: int
+    name: str
+    product_id: int
+    amount: float
+
+class OrderQuote(BaseModel):
+    subtotal: float
+    tax_amount: float
+    discount_amount: float
+    total_amount: float
+    promotion_discount: float = 0.0
+    taxes: List[TaxLine] = []
+    items: List[OrderItemQuote] = []
+    promotions: List[AppliedPromotion] = []
+
+# Cart schemas
+class CartBase(BaseModel):
+    customer_id: Optional[int] = None
+    payment_method: Optional[str] = None
+    discount_amount: Optional[float] = 0.0
+    notes: Optional[str] = None
+
+class CartCreate(CartBase):
+    pass
+
+class CartUpdate(BaseModel):
+    customer_id: Optional[int] = None
+    payment_method: Optional[str] = None
+    discount_amount: Optional[float] = None
+    notes: Optional[str] = None
+
+class CartCheckout(BaseModel):
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+
+class CartItemAdd(BaseModel):
+    product_id: int
+    quantity: int = 1
+    unit_price: Optional[float] = None  # a manual price; otherwise the product price
+
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 1:
+            raise ValueError('quantity must be at least 1')
+        return v
+
+class CartItemUpdate(BaseModel):
+    quantity: int  # 0 removes the line
+    unit_price: Optional[float] = None
+
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 0:
+            raise ValueError('quantity cannot be negative')
+        return v
+
+class CartItem(BaseModel):
+    product_id: int
+    quantity: int
+    unit_price: float
+    manual_price: bool
+    total_price: float
+    discount: float = 0.0
+    promotion_id: Optional[int] = None
+    promotion_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class StockWarning(BaseModel):
+    product_id: int
+    requested: int
+    available: int
+
+class CartTotals(BaseModel):
+    subtotal: float
+    promotion_discount: float = 0.0
+    discount_amount: float = 0.0
+    tax_amount: float
+    total_amount: float
+    taxes: List[TaxLine] = []
+
+    class Config:
+        from_attributes = True
+
+class Cart(CartTotals):
+    id: int
+    store_id: int
+    user_id: Optional[int] = None
+    customer_id: Optional[int] = None
+    order_id: Optional[int] = None
+    status: str
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    items: List[CartItem] = []
+    stock_warnings: List[StockWarning] = []
+
+class CartLineChange(BaseModel):
+    item: Optional[CartItem] = None  # None once the line is removed
+    stock_warning: Optional[StockWarning] = None
+    totals: CartTotals
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str  # a refresh token or a till session token
+    device_id: Optional[str] = None  # required with a till session token
+
+class Logout(BaseModel):
+    refresh_token: Optional[str] = None  # also revoked when given
+
+class TillSessionCreate(BaseModel):
+    device_id: str
+    
+    @validator('device_id')
+    def validate_device_id(cls, v):
+        if not v.strip():
+            raise ValueError('Device ID is required')
+        return v.strip()
+
+class TillSession(BaseModel):
+    till_session_token: str
+    token_type: str
+    device_id: str
+    expires_at: datetime
+
+class StreamToken(BaseModel):
+    token: str  # passed as ?token= to GET /api/events/stream
+    expires_in: int
+    store_id: Optional[int] = None  # None: events of every store
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+import logging
+from sqlalchemy import delete, insert, literal, select, text, update
+from sqlalchemy.orm import Session, selectinload
+from app.cache import record_tags
+from app.config import settings
+from app.models import ArchivedOrder, ArchivedOrderItem, Cart, Order, OrderItem
+from app.services.task_queue import register_periodic_task, task_handler, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Orders in these states can no longer change, so they are safe to move
+ARCHIVABLE_STATUSES = ("completed", "cancelled", "refunded")
+
+ORDER_COLUMNS = (
+    "id", "created_at", "order_number", "store_id", "customer_id", "user_id", "subtotal", "tax_amount",
+    "discount_amount", "promotion_discount", "total_amount", "payment_method", "status", "notes", "updated_at",
+)
+ITEM_COLUMNS = ("id", "order_id", "product_id", "quantity", "unit_price", "total_price")
+
+
+def month_start(value: datetime, months_back: int = 0) -> datetime:
+    """First instant of the month ``months_back`` months before ``value``"""
+    index = value.year * 12 + value.month - 1 - months_back
+    year, month = divmod(index, 12)
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+
+def ensure_month_partitions(db: Session, months: Iterable[datetime]) -> None:
+    """Create the monthly archive partitions on PostgreSQL if missing"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for month in sorted(set(months)):
+        upper = month_start(month, -1)
+        for table in (ArchivedOrder.__tablename__, ArchivedOrderItem.__tablename__):
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def archive_orders(db: Session, before: datetime, batch_size: int, max_batches: Optional[int] = None) -> int:
+    """Move finished orders created before ``before`` to the archive tables.
+
+    Works in batches of ``batch_size`` orders, each copied and deleted in its
+    own transaction, and returns the number of orders moved.
+    """
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = (
+            db.query(Order.id, Order.created_at)
+            .filter(Order.status.in_(ARCHIVABLE_STATUSES), Order.created_at < before)
+            .order_by(Order.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        order_ids = [order_id for order_id, _ in batch]
+        ensure_month_partitions(db, (month_start(_as_utc(created_at)) for _, created_at in batch))
+
+        archived_at = utcnow()
+        orders = Order.__table__
+        items = OrderItem.__table__
+        db.execute(
+            insert(ArchivedOrder.__table__).from_select(
+                ORDER_COLUMNS + ("archived_at",),
+                select(*(orders.c[name] for name in ORDER_COLUMNS), literal(archived_at, ArchivedOrder.archived_at.type))
+                .where(orders.c.id.in_(order_ids))
+            )
+        )
+        db.execute(
+            insert(ArchivedOrderItem.__table__).from_select(
+                ITEM_COLUMNS + ("order_created_at",),
+                select(*(items.c[name] for name in ITEM_COLUMNS), orders.c.created_at)
+                .join(orders, orders.c.id == items.c.order_id)
+                .where(items.c.order_id.in_(order_ids))
+            )
+        )
+        db.execute(delete(items).where(items.c.order_id.in_(order_ids)))
+        # Checked-out carts keep their lines; the order they became now lives in the archive
+        carts = Cart.__table__
+        db.execute(update(carts).where(carts.c.order_id.in_(order_ids)).values(order_id=None))
+        db.execute(delete(orders).where(orders.c.id.in_(order_ids)))
+        record_tags(db, "orders", *(f"order:{order_id}" for order_id in order_ids))
+        db.commit()
+
+        moved += len(order_ids)
+        batches += 1
+    return moved
+
+
+def find_archived_order(
+    db: Session,
+    *,
+    store_id: int,
+    order_id: Optional[int] = None,
+    order_number: Optional[str] = None
+) -> Optional[ArchivedOrder]:
+    """Look up an archived order by id or number within a store"""
+    query = (
+        db.query(ArchivedOrder)
+        .options(selectinload(ArchivedOrder.order_items), selectinload(ArchivedOrder.customer))
+        .filter(ArchivedOrder.store_id == store_id)
+    )
+    if order_id is not None:
+        query = query.filter(ArchivedOrder.id == order_id)
+    if order_number is not None:
+        query = query.filter(ArchivedOrder.order_number == order_number)
+    return query.first()
+
+
+@task_handler("orders.archive")
+def run_order_archival(db: Session, payload: Dict[str, Any]) -> None:
+    """Scheduled job moving old finished orders out of the hot tables"""
+    months = payload.get("months", settings.order_archive_after_months)
+    if not months:
+        return
+    before = month_start(utcnow(), months)
+    moved = archive_orders(
+        db, before, settings.order_archive_batch_size, max_batches=settings.order_archive_max_batches
+    )
+    if moved:
+        logger.info("Archived %s orders created before %s", moved, before.date())
+
+
+if settings.order_archive_after_months:
+    register_periodic_task("orders.archive", settings.order_archive_interval_seconds)
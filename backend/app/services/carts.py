@@ -0,0 +1,286 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.crud.crud_customer import customer as customer_crud
+from app.models import Cart, CartItem, Order, Product, Store, User
+from app.money import from_minor, to_decimal, to_minor
+from app.schemas import CartCheckout, CartCreate, CartUpdate, OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+from app.services.pricing_rules import PricingRules, TaxProfile, get_pricing_rules
+from app.services.promotions import PromotionIndex, get_promotion_index
+from app.services.stock import stock_levels
+from app.services.totals import LineTotal
+
+# A cart keeps one line per product and its running totals on the cart row,
+# with the taxable base per tax profile so tax is still rounded once per
+# profile as in compute_order_totals. A change prices only the line it
+# touches and swaps that line's old contribution for its new one, so the
+# 80th scan costs the same as the first. Stock checks only warn; checkout
+# reprices the basket through OrderService, which enforces stock.
+
+DEFAULT_TAX_PROFILE = "default"
+
+
+def tax_profile_key(rules: PricingRules, category_id: Optional[int]) -> str:
+    """Key of the tax profile a category is taxed under, as used in ``Cart.tax_bases``"""
+    if category_id in rules.category_profiles:
+        return str(category_id)
+    return DEFAULT_TAX_PROFILE
+
+
+def _tax_profile(rules: PricingRules, key: str) -> TaxProfile:
+    # Rules may have been reloaded since the line was priced
+    if key != DEFAULT_TAX_PROFILE:
+        profile = rules.category_profiles.get(int(key))
+        if profile is not None:
+            return profile
+    return rules.default_profile
+
+
+def taxes_for_bases(bases: Dict[str, int], rules: PricingRules) -> Dict[str, int]:
+    """Tax breakdown by component code for taxable bases keyed by tax profile"""
+    taxes: Dict[str, int] = {}
+    for key, base in bases.items():
+        for code, amount in _tax_profile(rules, key).taxes_for(base).items():
+            taxes[code] = taxes.get(code, 0) + amount
+    return taxes
+
+
+class CartService:
+    @staticmethod
+    def create_cart(db: Session, cart_data: CartCreate, current_user: User, store: Store) -> Cart:
+        """Open an empty cart for a till"""
+        if cart_data.customer_id and not customer_crud.get(db, id=cart_data.customer_id):
+            raise HTTPException(status_code=400, detail="Customer not found")
+
+        cart = Cart(
+            store_id=store.id,
+            user_id=current_user.id,
+            customer_id=cart_data.customer_id,
+            payment_method=cart_data.payment_method,
+            notes=cart_data.notes,
+            status="open",
+            subtotal=0,
+            promotion_discount=0,
+            discount_amount=to_decimal(cart_data.discount_amount or 0),
+            tax_amount=0,
+            total_amount=0,
+            tax_bases="{}"
+        )
+        CartService.refresh_totals(cart, {})
+        db.add(cart)
+        db.commit()
+        db.refresh(cart)
+        return cart
+
+    @staticmethod
+    def get_cart(db: Session, cart_id: int, store_id: int, lock: bool = False) -> Cart:
+        """Load a store's cart, locking its row for a change when asked"""
+        query = db.query(Cart).filter(Cart.id == cart_id, Cart.store_id == store_id)
+        if lock:
+            query = query.with_for_update()
+        cart = query.first()
+        if cart is None:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return cart
+
+    @staticmethod
+    def require_open(cart: Cart) -> None:
+        if cart.status != "open":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot change cart with status: {cart.status}"
+            )
+
+    @staticmethod
+    def describe(db: Session, cart: Cart) -> Cart:
+        """Fill in the tax breakdown and stock warnings of every line for a response"""
+        cart.taxes = CartService.tax_lines(
+            taxes_for_bases(json.loads(cart.tax_bases), get_pricing_rules())
+        )
+        cart.stock_warnings = CartService.stock_warnings(db, cart.store_id, cart.items)
+        return cart
+
+    @staticmethod
+    def tax_lines(taxes: Dict[str, int]) -> List[dict]:
+        return [{"code": code, "amount": from_minor(amount)} for code, amount in taxes.items()]
+
+    @staticmethod
+    def stock_warnings(db: Session, store_id: int, items: Iterable[CartItem]) -> List[dict]:
+        """Lines asking for more than the store has on hand; these never block a change"""
+        items = list(items)
+        levels = stock_levels(db, store_id, (item.product_id for item in items))
+        return [
+            {"product_id": item.product_id, "requested": item.quantity, "available": levels[item.product_id]}
+            for item in items
+            if levels[item.product_id] < item.quantity
+        ]
+
+    @staticmethod
+    def refresh_totals(cart: Cart, bases: Dict[str, int], rules: Optional[PricingRules] = None) -> None:
+        """Recompute tax and total from the running subtotal, discounts and tax bases"""
+        if rules is None:
+            rules = get_pricing_rules()
+        taxes = taxes_for_bases(bases, rules)
+        tax_amount = sum(taxes.values())
+        cart.tax_bases = json.dumps(bases, sort_keys=True)
+        cart.tax_amount = from_minor(tax_amount)
+        cart.total_amount = from_minor(
+            to_minor(cart.subtotal) + tax_amount
+            - to_minor(cart.promotion_discount) - to_minor(cart.discount_amount)
+        )
+        cart.taxes = CartService.tax_lines(taxes)
+
+    @staticmethod
+    def _apply_line(cart: Cart, bases: Dict[str, int], item: CartItem, sign: int) -> None:
+        # Add (sign 1) or take out (sign -1) a line's share of the running totals
+        cart.subtotal = from_minor(to_minor(cart.subtotal) + sign * to_minor(item.total_price))
+        cart.promotion_discount = from_minor(
+            to_minor(cart.promotion_discount) + sign * to_minor(item.discount)
+        )
+        base = bases.get(item.tax_profile, 0) + sign * (to_minor(item.total_price) - to_minor(item.discount))
+        if base:
+            bases[item.tax_profile] = base
+        else:
+            bases.pop(item.tax_profile, None)
+
+    @staticmethod
+    def _price_line(
+        item: CartItem, product: Product, quantity: int, rules: PricingRules, promotions: PromotionIndex
+    ) -> None:
+        # Same steps as compute_order_totals, for this one line
+        if item.manual_price:
+            unit_price = to_minor(item.unit_price)
+        else:
+            unit_price = rules.unit_price_for(product.id, product.category_id, quantity, to_minor(product.price))
+        total_price = unit_price * quantity
+        line = LineTotal(product.id, quantity, unit_price, total_price, product.category_id)
+        discounts, matches = promotions.evaluate([line])
+
+        item.quantity = quantity
+        item.category_id = product.category_id
+        item.unit_price = from_minor(unit_price)
+        item.total_price = from_minor(total_price)
+        item.discount = from_minor(discounts[0])
+        item.promotion_id = matches[0].promotion_id if matches else None
+        item.promotion_name = matches[0].name if matches else None
+        item.tax_profile = tax_profile_key(rules, product.category_id)
+
+    @staticmethod
+    def set_line(
+        db: Session,
+        cart: Cart,
+        product_id: int,
+        quantity: int,
+        unit_price: Optional[float] = None,
+        add: bool = False
+    ) -> Tuple[Optional[CartItem], Optional[dict]]:
+        """Set a product's quantity in the cart, or add to it with ``add``, and commit.
+
+        A quantity of 0 removes the line. ``unit_price`` sets a manual price;
+        0 goes back to the product price. Returns the line (None once
+        removed) and a stock warning when the store has less on hand.
+        """
+        CartService.require_open(cart)
+        item = (
+            db.query(CartItem)
+            .filter(CartItem.cart_id == cart.id, CartItem.product_id == product_id)
+            .first()
+        )
+        if item is None and not add:
+            raise HTTPException(status_code=404, detail="Product not in cart")
+        if add and item is not None:
+            quantity += item.quantity
+
+        product = None
+        if quantity > 0:
+            product = db.get(Product, product_id)
+            if not product or not product.is_active:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Product with ID {product_id} not found or inactive"
+                )
+
+        rules = get_pricing_rules()
+        bases = json.loads(cart.tax_bases)
+        if item is not None:
+            CartService._apply_line(cart, bases, item, -1)
+
+        if quantity == 0:
+            db.delete(item)
+            item = None
+        else:
+            if item is None:
+                item = CartItem(cart_id=cart.id, product_id=product_id, manual_price=False)
+                db.add(item)
+            if unit_price is not None:
+                item.manual_price = unit_price > 0
+                item.unit_price = to_decimal(unit_price)
+            CartService._price_line(item, product, quantity, rules, get_promotion_index(db))
+            CartService._apply_line(cart, bases, item, 1)
+
+        CartService.refresh_totals(cart, bases, rules)
+        db.commit()
+
+        warning = None
+        if item is not None:
+            warnings = CartService.stock_warnings(db, cart.store_id, [item])
+            warning = warnings[0] if warnings else None
+        return item, warning
+
+    @staticmethod
+    def update_cart(db: Session, cart: Cart, cart_update: CartUpdate) -> Cart:
+        """Change the customer, payment method, notes or manual discount"""
+        CartService.require_open(cart)
+        update_data = cart_update.dict(exclude_unset=True)
+        if update_data.get("customer_id") and not customer_crud.get(db, id=update_data["customer_id"]):
+            raise HTTPException(status_code=400, detail="Customer not found")
+
+        if "discount_amount" in update_data:
+            cart.discount_amount = to_decimal(update_data.pop("discount_amount"))
+        for field, value in update_data.items():
+            setattr(cart, field, value)
+        CartService.refresh_totals(cart, json.loads(cart.tax_bases))
+        db.commit()
+        return CartService.describe(db, cart)
+
+    @staticmethod
+    def abandon_cart(db: Session, cart: Cart) -> Cart:
+        CartService.require_open(cart)
+        cart.status = "abandoned"
+        db.commit()
+        return cart
+
+    @staticmethod
+    def checkout(
+        db: Session, cart: Cart, checkout: CartCheckout, current_user: User, store: Store
+    ) -> Order:
+        """Convert the cart to an order; the order and the closed cart commit together"""
+        CartService.require_open(cart)
+        if not cart.items:
+            raise HTTPException(status_code=400, detail="Cart is empty")
+        if checkout.payment_method is not None:
+            cart.payment_method = checkout.payment_method
+        if checkout.notes is not None:
+            cart.notes = checkout.notes
+
+        # The order is priced afresh, so a price or promotion that changed
+        # while the cart was open is charged as it stands now
+        order_data = OrderCreate(
+            customer_id=cart.customer_id,
+            payment_method=cart.payment_method,
+            discount_amount=float(cart.discount_amount),
+            notes=cart.notes,
+            items=[
+                OrderItemCreate(
+                    product_id=item.product_id,
+                    quantity=item.quantity,
+                    unit_price=float(item.unit_price) if item.manual_price else 0
+                )
+                for item in cart.items
+            ]
+        )
+        return OrderService.create_order_with_items(db, order_data, current_user, store, cart=cart)
+
+cart_service = CartService()
@@ -0,0 +1,172 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+import os
+import threading
+import time
+from app.config import settings
+
+# Crockford base32 keeps ids case-insensitive, URL safe and lexicographically sortable
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _encode_base32(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class OrderNumberGenerator(ABC):
+    """Base class for order number strategies.
+
+    Generators run entirely in process and never touch the database. Order
+    numbers are built as ``<prefix>-<store>-<till>-<id>`` with empty parts
+    skipped, so numbers issued by the same till sort in issue order.
+    """
+
+    def __init__(self, prefix: str = "ORD", store_code: str = "", till_code: str = ""):
+        parts = [part.strip().upper() for part in (prefix, store_code, till_code)]
+        self.prefix = "-".join(part for part in parts if part)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def next_id(self) -> str:
+        """The unique, sortable part of the next order number"""
+
+    def generate(self) -> str:
+        """Generate the next order number"""
+        unique_id = self.next_id()
+        return f"{self.prefix}-{unique_id}" if self.prefix else unique_id
+
+
+class UlidOrderNumberGenerator(OrderNumberGenerator):
+    """ULID ids: 48-bit millisecond timestamp plus 80 bits of randomness.
+
+    Within one millisecond the random part is incremented instead of redrawn
+    (monotonic ULID), so ids from one process are strictly increasing. Separate
+    processes draw independent 80-bit random parts, which makes collisions
+    between workers sharing a prefix practically impossible.
+    """
+
+    RANDOM_BITS = 80
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_ms = -1
+        self._last_random = 0
+
+    def next_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            else:
+                # Same millisecond (or clock moved backwards): stay monotonic
+                self._last_random += 1
+                if self._last_random >> self.RANDOM_BITS:
+                    self._last_ms += 1
+                    self._last_random = int.from_bytes(os.urandom(10), "big")
+            ms, rand = self._last_ms, self._last_random
+        return _encode_base32(ms, 10) + _encode_base32(rand, 16)
+
+
+class SnowflakeOrderNumberGenerator(OrderNumberGenerator):
+    """Short numeric ids: milliseconds since 2024-01-01, node id and sequence.
+
+    Layout is ``ms << 22 | node << 12 | sequence`` rendered as 19 zero-padded
+    digits. Ids are unique as long as every process sharing a prefix has its
+    own ``node_id`` (0-1023). ``build_order_number_generator`` takes it from
+    ``ORDER_NUMBER_NODE_ID`` plus the worker index that ``serve.py`` gives
+    each gunicorn worker, so tills sharing a prefix need base ids at least
+    their worker count apart. Without the setting it is the process id
+    modulo 1024.
+    """
+
+    EPOCH_MS = 1704067200000
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+
+    def __init__(self, *args, node_id: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if node_id is None:
+            node_id = os.getpid()
+        self.node_id = node_id & ((1 << self.NODE_BITS) - 1)
+        self._last_value = 0
+
+    def next_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            value = (now_ms << (self.NODE_BITS + self.SEQUENCE_BITS)) | (self.node_id << self.SEQUENCE_BITS)
+            if value <= self._last_value:
+                # Same millisecond: bump the sequence, borrowing from the next
+                # millisecond once 4096 ids have been issued
+                value = self._last_value + 1
+                if (value >> self.SEQUENCE_BITS) & ((1 << self.NODE_BITS) - 1) != self.node_id:
+                    value = ((value >> (self.NODE_BITS + self.SEQUENCE_BITS)) + 1) << (self.NODE_BITS + self.SEQUENCE_BITS)
+                    value |= self.node_id << self.SEQUENCE_BITS
+            self._last_value = value
+        return f"{value:019d}"
+
+
+ORDER_NUMBER_GENERATORS: Dict[str, Type[OrderNumberGenerator]] = {
+    "ulid": UlidOrderNumberGenerator,
+    "snowflake": SnowflakeOrderNumberGenerator,
+}
+
+_generator: Optional[OrderNumberGenerator] = None
+_generator_lock = threading.Lock()
+
+# Index of this worker among the server's workers; set after the fork by serve.py
+_worker_index: Optional[int] = None
+# Set by serve.py for workers it cannot number, which then use their process id
+NODE_ID_FROM_PID_ENV = "ORDER_NUMBER_NODE_ID_FROM_PID"
+
+
+def register_order_number_generator(name: str, generator_class: Type[OrderNumberGenerator]) -> None:
+    """Register a custom order number strategy under ``name``"""
+    ORDER_NUMBER_GENERATORS[name] = generator_class
+
+
+def set_worker_index(index: Optional[int]) -> None:
+    """Record this worker's index so snowflake workers get distinct node ids"""
+    global _worker_index, _generator
+    with _generator_lock:
+        _worker_index = index
+        _generator = None
+
+
+def snowflake_node_id() -> Optional[int]:
+    """``ORDER_NUMBER_NODE_ID`` offset by the worker index, or None to use the process id"""
+    if settings.order_number_node_id is None or os.environ.get(NODE_ID_FROM_PID_ENV):
+        return None
+    return settings.order_number_node_id + (_worker_index or 0)
+
+
+def build_order_number_generator(strategy: Optional[str] = None) -> OrderNumberGenerator:
+    """Build a generator for ``strategy`` using the configured prefix parts"""
+    strategy = strategy or settings.order_number_strategy
+    try:
+        generator_class = ORDER_NUMBER_GENERATORS[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown order number strategy: {strategy}")
+    kwargs = {}
+    if issubclass(generator_class, SnowflakeOrderNumberGenerator):
+        kwargs["node_id"] = snowflake_node_id()
+    return generator_class(
+        prefix=settings.order_number_prefix,
+        store_code=settings.store_code,
+        till_code=settings.till_code,
+        **kwargs
+    )
+
+
+def get_order_number_generator() -> OrderNumberGenerator:
+    """Return the process-wide generator, creating it on first use"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = build_order_number_generator()
+    return _generator
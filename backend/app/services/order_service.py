@@ -1,101 +1,130 @@
-from typing import List
+from decimal import Decimal
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from app.models import Order, OrderItem, Product, User
+from app.models import Cart, Order, OrderItem, Product, Store, User
 from app.schemas import OrderCreate, OrderItemCreate
-from app.crud.crud_product import product as product_crud
 from app.crud.crud_customer import customer as customer_crud
-from app.config import settings
-import uuid
-from datetime import datetime
+from app.events import event_broker
+from app.money import from_minor, to_minor
+from app.services.order_numbers import get_order_number_generator
+from app.services.promotions import get_promotion_index
+from app.services.reservations import release_reservations, reserve_stock
+from app.services.stock import adjust_stock, stock_rows
+from app.services.task_queue import enqueue_task, task_queue
+from app.services import order_tasks  # noqa: F401 - registers task handlers
+from app.services.totals import BasketLine, compute_order_totals, tax_for
 
 class OrderService:
     @staticmethod
     def generate_order_number() -> str:
-        """Generate a unique order number"""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        unique_id = str(uuid.uuid4())[:8].upper()
-        return f"ORD-{timestamp}-{unique_id}"
+        """Generate a unique, sortable order number"""
+        return get_order_number_generator().generate()
 
     @staticmethod
-    def calculate_tax(subtotal: float, tax_rate: float = None) -> float:
-        """Calculate tax amount"""
-        if tax_rate is None:
-            tax_rate = settings.default_tax_rate
-        return round(subtotal * tax_rate, 2)
+    def calculate_tax(subtotal: Decimal, tax_rate: float = None) -> Decimal:
+        """Calculate tax amount with the default tax profile of the pricing rules"""
+        return from_minor(tax_for(to_minor(subtotal), tax_rate))
 
     @staticmethod
-    def validate_order_items(db: Session, items: List[OrderItemCreate]) -> tuple:
-        """Validate order items and return processed data"""
+    def validate_order_items(
+        db: Session, items: List[OrderItemCreate], store_id: int, lock: bool = False
+    ) -> tuple:
+        """Validate order items against a store's stock and return ``(lines, products, stock)``.
+
+        ``lines`` holds ``BasketLine`` tuples with prices in minor units, ready
+        for ``compute_order_totals``. ``stock`` maps product ids to the store's
+        ``StoreStock`` rows, locked for update when ``lock`` is set.
+        """
         if not items:
             raise HTTPException(status_code=400, detail="Order must have at least one item")
         
-        subtotal = 0.0
-        order_items_data = []
+        # Load every product in the basket with a single query
+        product_ids = {item.product_id for item in items}
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_(product_ids)).all()
+        }
+        stock = stock_rows(db, store_id, product_ids, lock=lock)
+        
+        requested: Dict[int, int] = {}
+        lines = []
         
         for item in items:
-            product = product_crud.get(db, id=item.product_id)
+            product = products.get(item.product_id)
             if not product or not product.is_active:
                 raise HTTPException(
                     status_code=400, 
                     detail=f"Product with ID {item.product_id} not found or inactive"
                 )
             
-            # Check stock availability
-            if product.stock_quantity < item.quantity:
+            # Check stock availability across all lines for the same product
+            requested[product.id] = requested.get(product.id, 0) + item.quantity
+            available = stock[product.id].available if product.id in stock else 0
+            if available < requested[product.id]:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Insufficient stock for product {product.name}. Available: {product.stock_quantity}, Requested: {item.quantity}"
+                    detail=f"Insufficient stock for product {product.name}. Available: {available}, Requested: {requested[product.id]}"
                 )
             
             # Use current product price if unit_price not provided or is 0
-            unit_price = item.unit_price if item.unit_price > 0 else product.price
-            total_price = unit_price * item.quantity
-            subtotal += total_price
-            
-            order_items_data.append({
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "unit_price": unit_price,
-                "total_price": total_price,
-                "product": product
-            })
+            manual_price = item.unit_price > 0
+            unit_price = item.unit_price if manual_price else product.price
+            lines.append(BasketLine(
+                product_id=product.id,
+                category_id=product.category_id,
+                quantity=item.quantity,
+                unit_price=to_minor(unit_price),
+                manual_price=manual_price
+            ))
         
-        return subtotal, order_items_data
+        return lines, products, stock
+
+    @staticmethod
+    def quote_order(db: Session, order_data: OrderCreate, store_id: int, lock: bool = False) -> tuple:
+        """Validate items and price the basket without writing anything"""
+        lines, products, stock = OrderService.validate_order_items(
+            db, order_data.items, store_id, lock=lock
+        )
+        totals = compute_order_totals(
+            lines,
+            discount=to_minor(order_data.discount_amount or 0),
+            promotions=get_promotion_index(db)
+        )
+        return totals, products, stock
 
     @staticmethod
     def create_order_with_items(
         db: Session, 
         order_data: OrderCreate, 
-        current_user: User
+        current_user: User,
+        store: Store,
+        cart: Optional[Cart] = None
     ) -> Order:
-        """Create order with items and update stock"""
+        """Create order with items and update the store's stock, closing ``cart`` if given"""
         # Validate customer if provided
         if order_data.customer_id:
             customer = customer_crud.get(db, id=order_data.customer_id)
             if not customer:
                 raise HTTPException(status_code=400, detail="Customer not found")
         
-        # Validate and process order items
-        subtotal, order_items_data = OrderService.validate_order_items(db, order_data.items)
-        
-        # Calculate totals
-        tax_amount = OrderService.calculate_tax(subtotal)
-        discount_amount = order_data.discount_amount or 0.0
-        total_amount = subtotal + tax_amount - discount_amount
+        # Validate items and price the basket
+        totals, products, stock = OrderService.quote_order(db, order_data, store.id, lock=True)
         
-        if total_amount < 0:
+        if totals.total_amount < 0:
             raise HTTPException(status_code=400, detail="Total amount cannot be negative")
         
         # Create order
         db_order = Order(
             order_number=OrderService.generate_order_number(),
+            store_id=store.id,
             customer_id=order_data.customer_id,
             user_id=current_user.id,
-            subtotal=subtotal,
-            tax_amount=tax_amount,
-            discount_amount=discount_amount,
-            total_amount=total_amount,
+            subtotal=from_minor(totals.subtotal),
+            tax_amount=from_minor(totals.tax_amount),
+            discount_amount=from_minor(totals.discount_amount),
+            promotion_discount=from_minor(totals.promotion_discount),
+            total_amount=from_minor(totals.total_amount),
             payment_method=order_data.payment_method,
             notes=order_data.notes,
             status="pending"
@@ -104,58 +133,117 @@ class OrderService:
         db.add(db_order)
         db.flush()  # Get the order ID without committing
         
-        # Create order items and update stock
-        for item_data in order_items_data:
+        # Create order items
+        quantities: Dict[int, int] = {}
+        for line in totals.lines:
             db_order_item = OrderItem(
                 order_id=db_order.id,
-                product_id=item_data["product_id"],
-                quantity=item_data["quantity"],
-                unit_price=item_data["unit_price"],
-                total_price=item_data["total_price"]
+                product_id=line.product_id,
+                quantity=line.quantity,
+                unit_price=from_minor(line.unit_price),
+                total_price=from_minor(line.total_price)
             )
             db.add(db_order_item)
-            
-            # Update product stock
-            product = item_data["product"]
-            product.stock_quantity -= item_data["quantity"]
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        
+        # Hold the stock until the order is completed, cancelled or expires
+        stock_levels = reserve_stock(db, db_order, stock, quantities)
+        
+        # A cart is closed in the same commit as the order it became
+        if cart is not None:
+            cart.status = "checked_out"
+            cart.order_id = db_order.id
+        
+        # Post-commit side effects go through the outbox in the same transaction
+        enqueue_task(db, "order.created", {"order_id": db_order.id})
         
         db.commit()
+        task_queue.notify()
         db.refresh(db_order)
+        OrderService.publish_order_event("order.created", db_order)
+        OrderService.publish_stock_levels(store.id, stock_levels)
         return db_order
 
+    @staticmethod
+    def apply_manual_discount(order: Order, discount: Decimal) -> Order:
+        """Set a new manual discount on an order, without committing.
+
+        The lines, promotion discount and tax stay as they were charged when
+        the order was placed; only the manual discount and the total change.
+        """
+        # discount_amount holds the promotion discount plus the manual one
+        discount_amount = to_minor(order.promotion_discount) + to_minor(discount)
+        total_amount = to_minor(order.subtotal) + to_minor(order.tax_amount) - discount_amount
+        if total_amount < 0:
+            raise HTTPException(status_code=400, detail="Total amount cannot be negative")
+        order.discount_amount = from_minor(discount_amount)
+        order.total_amount = from_minor(total_amount)
+        return order
+
     @staticmethod
     def cancel_order(db: Session, order: Order) -> Order:
-        """Cancel order and restore stock"""
+        """Cancel order and release its stock"""
+        # Locked so the reservation sweeper cannot cancel it at the same time
+        db.refresh(order, with_for_update=True)
         if order.status not in ["pending"]:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Cannot cancel order with status: {order.status}"
             )
         
-        # Restore stock quantities
-        order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-        for item in order_items:
-            product = product_crud.get(db, id=item.product_id)
-            if product:
-                product.stock_quantity += item.quantity
+        stock_levels = release_reservations(db, order)
+        if stock_levels is None:
+            # Placed before reservations: its stock was taken when it was created
+            order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
+            stock_levels = {}
+            for item in order_items:
+                stock_row = adjust_stock(db, order.store_id, item.product_id, item.quantity)
+                stock_levels[item.product_id] = stock_row.available
         
         order.status = "cancelled"
         db.commit()
         db.refresh(order)
+        OrderService.publish_order_event("order.cancelled", order)
+        OrderService.publish_stock_levels(order.store_id, stock_levels)
         return order
 
     @staticmethod
     def complete_order(db: Session, order: Order) -> Order:
-        """Complete an order"""
+        """Complete an order and take its reserved stock off the shelf count"""
+        db.refresh(order, with_for_update=True)
         if order.status != "pending":
             raise HTTPException(
                 status_code=400, 
                 detail=f"Cannot complete order with status: {order.status}"
             )
         
+        release_reservations(db, order, take=True)
         order.status = "completed"
         db.commit()
         db.refresh(order)
+        OrderService.publish_order_event("order.completed", order)
         return order
 
+    @staticmethod
+    def publish_order_event(event_type: str, order: Order) -> None:
+        """Push an order event to connected screens"""
+        event_broker.publish(event_type, {
+            "id": order.id,
+            "order_number": order.order_number,
+            "store_id": order.store_id,
+            "status": order.status,
+            "customer_id": order.customer_id,
+            "total_amount": float(order.total_amount)
+        })
+
+    @staticmethod
+    def publish_stock_levels(store_id: int, stock_levels: Dict[int, int]) -> None:
+        """Push new stock levels for the given products at a store"""
+        for product_id, stock_quantity in stock_levels.items():
+            event_broker.publish("stock.changed", {
+                "store_id": store_id,
+                "product_id": product_id,
+                "stock_quantity": stock_quantity
+            })
+
 order_service = OrderService()
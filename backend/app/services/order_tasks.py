@@ -0,0 +1,36 @@
+from typing import Any, Dict
+import logging
+from sqlalchemy.orm import Session
+from app.models import Order, OrderItem, Product, StoreStock
+from app.services.task_queue import task_handler
+
+logger = logging.getLogger(__name__)
+
+# Side effects of the order pipeline that run after the order is committed.
+# Cache invalidation is not a task here: app.cache publishes the tags of
+# every committed order from its commit hook, off the request path.
+
+@task_handler("order.created")
+def emit_low_stock_alerts(db: Session, payload: Dict[str, Any]) -> None:
+    """Warn about products in the order that dropped to their minimum level"""
+    low_stock = (
+        db.query(Product, StoreStock)
+        .join(OrderItem, OrderItem.product_id == Product.id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(
+            StoreStock,
+            (StoreStock.product_id == Product.id) & (StoreStock.store_id == Order.store_id)
+        )
+        .filter(
+            OrderItem.order_id == payload["order_id"],
+            Product.is_active == True,
+            StoreStock.available <= Product.min_stock_level
+        )
+        .distinct()
+        .all()
+    )
+    for product, stock in low_stock:
+        logger.warning(
+            "Low stock at store %s: %s (ID %s) has %s left, minimum is %s",
+            stock.store_id, product.name, product.id, stock.available, product.min_stock_level
+        )
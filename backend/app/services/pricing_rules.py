@@ -0,0 +1,178 @@
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import threading
+from app.cache import cache
+from app.config import settings
+from app.money import round_minor, to_minor
+
+logger = logging.getLogger(__name__)
+
+# Rule definitions are plain JSON, for example:
+#
+# {
+#   "taxes": [
+#     {"code": "NHIL", "rate": 0.025},
+#     {"code": "GETFUND", "rate": 0.025},
+#     {"code": "COVID", "rate": 0.01},
+#     {"code": "VAT", "rate": 0.15, "compound": true}
+#   ],
+#   "categories": {"4": {"taxes": []}},
+#   "bulk_pricing": [
+#     {"product_id": 12, "min_quantity": 10, "unit_price": 4.50},
+#     {"category_id": 3, "min_quantity": 24, "percent_off": 5}
+#   ]
+# }
+#
+# Non-compound components are levied on the line base; compound components
+# are levied on the base plus all non-compound levies (VAT on top of NHIL,
+# GETFund and COVID in Ghana). A category with its own "taxes" list replaces
+# the default components, so an empty list makes the category exempt.
+
+
+class TaxComponent(NamedTuple):
+    code: str
+    rate: Decimal
+    compound: bool
+
+
+class TaxProfile:
+    """A precompiled, ordered set of tax components"""
+
+    __slots__ = ("components",)
+
+    def __init__(self, components: Tuple[TaxComponent, ...]):
+        # Non-compound levies first so compound components see their total
+        self.components = tuple(sorted(components, key=lambda component: component.compound))
+
+    def taxes_for(self, base: int) -> Dict[str, int]:
+        """Tax breakdown by component code for an integer taxable base"""
+        breakdown = {}
+        levies = 0
+        for component in self.components:
+            taxable = base + levies if component.compound else base
+            amount = round_minor(taxable * component.rate)
+            breakdown[component.code] = breakdown.get(component.code, 0) + amount
+            if not component.compound:
+                levies += amount
+        return breakdown
+
+
+class BulkTier(NamedTuple):
+    min_quantity: int
+    unit_price: Optional[int]
+    percent_off: Optional[Decimal]
+
+
+class PricingRules:
+    """Rule definitions compiled into dict/tuple lookups.
+
+    Evaluation never touches the database: a basket is priced with one dict
+    lookup per line for tiers and one for the tax profile.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        self.definition = definition
+
+        self.default_profile = TaxProfile(self._compile_components(definition.get("taxes", [])))
+        self.category_profiles: Dict[int, TaxProfile] = {}
+        for category_id, category_rules in definition.get("categories", {}).items():
+            if "taxes" in category_rules:
+                self.category_profiles[int(category_id)] = TaxProfile(
+                    self._compile_components(category_rules["taxes"])
+                )
+
+        self.product_tiers: Dict[int, Tuple[BulkTier, ...]] = {}
+        self.category_tiers: Dict[int, Tuple[BulkTier, ...]] = {}
+        product_tiers: Dict[int, List[BulkTier]] = {}
+        category_tiers: Dict[int, List[BulkTier]] = {}
+        for rule in definition.get("bulk_pricing", []):
+            tier = self._compile_tier(rule)
+            if rule.get("product_id") is not None:
+                product_tiers.setdefault(int(rule["product_id"]), []).append(tier)
+            elif rule.get("category_id") is not None:
+                category_tiers.setdefault(int(rule["category_id"]), []).append(tier)
+            else:
+                raise ValueError("Bulk pricing rule needs a product_id or category_id")
+        # Highest threshold first so the first match is the best tier
+        for target, source in ((self.product_tiers, product_tiers), (self.category_tiers, category_tiers)):
+            for key, tiers in source.items():
+                target[key] = tuple(sorted(tiers, key=lambda tier: tier.min_quantity, reverse=True))
+
+    @staticmethod
+    def _compile_components(components: List[Dict[str, Any]]) -> Tuple[TaxComponent, ...]:
+        compiled = []
+        for component in components:
+            rate = Decimal(str(component["rate"]))
+            if rate < 0:
+                raise ValueError(f"Tax rate for {component['code']} cannot be negative")
+            compiled.append(TaxComponent(str(component["code"]), rate, bool(component.get("compound", False))))
+        return tuple(compiled)
+
+    @staticmethod
+    def _compile_tier(rule: Dict[str, Any]) -> BulkTier:
+        min_quantity = int(rule["min_quantity"])
+        if min_quantity < 1:
+            raise ValueError("Bulk pricing min_quantity must be at least 1")
+        if rule.get("unit_price") is not None:
+            return BulkTier(min_quantity, to_minor(rule["unit_price"]), None)
+        if rule.get("percent_off") is not None:
+            return BulkTier(min_quantity, None, Decimal(str(rule["percent_off"])) / 100)
+        raise ValueError("Bulk pricing rule needs a unit_price or percent_off")
+
+    @classmethod
+    def from_settings(cls) -> "PricingRules":
+        """Load the rules file from settings, or a single flat default rate"""
+        if settings.pricing_rules_path:
+            with open(settings.pricing_rules_path) as rules_file:
+                return cls(json.load(rules_file))
+        return cls({"taxes": [{"code": "TAX", "rate": settings.default_tax_rate}]})
+
+    def tax_profile_for(self, category_id: Optional[int]) -> TaxProfile:
+        return self.category_profiles.get(category_id, self.default_profile)
+
+    def unit_price_for(
+        self, product_id: int, category_id: Optional[int], quantity: int, unit_price: int
+    ) -> int:
+        """Apply the best bulk tier for the line quantity"""
+        tiers = self.product_tiers.get(product_id) or self.category_tiers.get(category_id)
+        if tiers:
+            for tier in tiers:
+                if quantity >= tier.min_quantity:
+                    if tier.unit_price is not None:
+                        return min(unit_price, tier.unit_price)
+                    return unit_price - round_minor(unit_price * tier.percent_off)
+        return unit_price
+
+
+_rules: Optional[PricingRules] = None
+_rules_lock = threading.Lock()
+
+
+def get_pricing_rules() -> PricingRules:
+    """Return the compiled rules, compiling them on first use"""
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = PricingRules.from_settings()
+    return _rules
+
+
+def reload_pricing_rules() -> PricingRules:
+    """Recompile the rules from their source and swap them in atomically"""
+    global _rules
+    rules = PricingRules.from_settings()
+    with _rules_lock:
+        _rules = rules
+    logger.info("Pricing rules reloaded")
+    return rules
+
+
+def _reload_on_invalidation(tag: str) -> None:
+    # Another worker reloaded; read the same source so all workers agree
+    reload_pricing_rules()
+
+
+cache.listen("pricing_rules", _reload_on_invalidation)
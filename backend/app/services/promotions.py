@@ -0,0 +1,165 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import logging
+import time
+from sqlalchemy.orm import Session
+from app.cache import cache
+from app.config import settings
+from app.models import Promotion
+from app.money import round_minor
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledPromotion(NamedTuple):
+    id: int
+    name: str
+    promotion_type: str
+    buy_quantity: int
+    get_quantity: int
+    percent_off: Decimal
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+
+    def is_live(self, now: datetime) -> bool:
+        if self.starts_at is not None and now < self.starts_at:
+            return False
+        if self.ends_at is not None and now >= self.ends_at:
+            return False
+        return True
+
+
+class PromotionMatch(NamedTuple):
+    promotion_id: int
+    name: str
+    product_id: int
+    amount: int
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; treat them as UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def compile_promotion(promotion: Promotion) -> CompiledPromotion:
+    return CompiledPromotion(
+        id=promotion.id,
+        name=promotion.name,
+        promotion_type=promotion.promotion_type,
+        buy_quantity=promotion.buy_quantity or 0,
+        get_quantity=promotion.get_quantity or 0,
+        percent_off=Decimal(str(promotion.percent_off or 0)) / 100,
+        starts_at=_as_utc(promotion.starts_at),
+        ends_at=_as_utc(promotion.ends_at)
+    )
+
+
+class PromotionIndex:
+    """Active promotions pre-indexed by product and category.
+
+    A basket only looks at the promotions filed under its own products and
+    categories, so evaluation cost depends on the basket size and the handful
+    of matching promotions rather than on the total number of promotions.
+    """
+
+    def __init__(self, promotions: Sequence[Tuple[CompiledPromotion, Optional[int], Optional[int]]]):
+        by_product: Dict[int, List[CompiledPromotion]] = {}
+        by_category: Dict[int, List[CompiledPromotion]] = {}
+        for compiled, product_id, category_id in promotions:
+            if compiled.promotion_type == "percent_off_category":
+                if category_id is not None:
+                    by_category.setdefault(category_id, []).append(compiled)
+            elif product_id is not None:
+                by_product.setdefault(product_id, []).append(compiled)
+        self.by_product = {key: tuple(value) for key, value in by_product.items()}
+        self.by_category = {key: tuple(value) for key, value in by_category.items()}
+        self.size = len(promotions)
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session) -> "PromotionIndex":
+        """Build the index from promotions that are active and not yet over"""
+        now = datetime.now(timezone.utc)
+        promotions = (
+            db.query(Promotion)
+            .filter(
+                Promotion.is_active == True,
+                (Promotion.ends_at == None) | (Promotion.ends_at > now)
+            )
+            .all()
+        )
+        return cls([
+            (compile_promotion(promotion), promotion.product_id, promotion.category_id)
+            for promotion in promotions
+        ])
+
+    @staticmethod
+    def _discount(promotion: CompiledPromotion, quantity: int, unit_price: int, total_price: int) -> int:
+        if promotion.promotion_type == "buy_x_get_y":
+            group = promotion.buy_quantity + promotion.get_quantity
+            if promotion.get_quantity <= 0 or group <= 0:
+                return 0
+            free_units = (quantity // group) * promotion.get_quantity
+            return free_units * unit_price
+        return round_minor(total_price * promotion.percent_off)
+
+    def evaluate(self, lines: Sequence, now: Optional[datetime] = None) -> Tuple[List[int], List[PromotionMatch]]:
+        """Best promotion per product for priced basket lines.
+
+        ``lines`` are ``LineTotal`` tuples. Returns the discount for each line
+        (in minor units, same order as ``lines``) and the promotions applied.
+        Promotions do not stack: each product gets its single best deal.
+        """
+        discounts = [0] * len(lines)
+        if not self.size:
+            return discounts, []
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # Aggregate repeated lines so buy-X-get-Y counts the whole basket
+        by_product: Dict[int, List[int]] = {}
+        for position, line in enumerate(lines):
+            by_product.setdefault(line.product_id, []).append(position)
+
+        matches = []
+        for product_id, positions in by_product.items():
+            first = lines[positions[0]]
+            candidates = self.by_product.get(product_id, ()) + self.by_category.get(first.category_id, ())
+            if not candidates:
+                continue
+            quantity = sum(lines[position].quantity for position in positions)
+            total_price = sum(lines[position].total_price for position in positions)
+            unit_price = min(lines[position].unit_price for position in positions)
+
+            best, best_amount = None, 0
+            for promotion in candidates:
+                if not promotion.is_live(now):
+                    continue
+                amount = self._discount(promotion, quantity, unit_price, total_price)
+                if amount > best_amount:
+                    best, best_amount = promotion, amount
+            if best is None:
+                continue
+
+            best_amount = min(best_amount, total_price)
+            matches.append(PromotionMatch(best.id, best.name, product_id, best_amount))
+            # Spread the product discount over its lines, never beyond a line total
+            remaining = best_amount
+            for position in positions:
+                share = min(remaining, lines[position].total_price)
+                discounts[position] = share
+                remaining -= share
+        return discounts, matches
+
+
+def get_promotion_index(db: Session) -> PromotionIndex:
+    """Return the cached promotion index, rebuilding it when stale"""
+    # Promotion writes invalidate the tag in every worker as they commit
+    return cache.get_or_load(
+        "promotions", "index", lambda: PromotionIndex.load(db),
+        ttl=settings.promotion_index_ttl_seconds, tags=("promotions",)
+    )
+
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from app.cache import record_tags
+from app.config import settings
+from app.models import Order, StockReservation, StoreStock
+from app.services.shared_catalog import record_stock_levels
+from app.services.stock import adjust_stock, stock_rows
+from app.services.task_queue import register_periodic_task, task_handler, utcnow
+
+logger = logging.getLogger(__name__)
+
+# A pending order holds its stock in stock_reservations and in the
+# store_stock.reserved counter, so available stock is quantity - reserved
+# from a single row. Completing the order takes the stock off the shelf
+# count; cancelling it, or letting it expire, gives it back. Pending orders
+# placed before reservations existed took their stock when they were
+# created and have no reservation rows.
+
+
+def reserve_stock(
+    db: Session, order: Order, stock: Dict[int, StoreStock], quantities: Dict[int, int]
+) -> Dict[int, int]:
+    """Hold stock for a pending order until it expires; returns the new available levels"""
+    expires_at = utcnow() + timedelta(seconds=settings.stock_reservation_ttl_seconds)
+    levels = {}
+    for product_id, quantity in quantities.items():
+        row = stock.get(product_id) or adjust_stock(db, order.store_id, product_id, 0)
+        row.reserved += quantity
+        db.add(StockReservation(
+            order_id=order.id,
+            store_id=order.store_id,
+            product_id=product_id,
+            quantity=quantity,
+            expires_at=expires_at
+        ))
+        levels[product_id] = row.available
+    return levels
+
+
+def release_reservations(db: Session, order: Order, take: bool = False) -> Optional[Dict[int, int]]:
+    """Drop an order's holds, taking the stock off the shelf count with ``take``.
+
+    Returns the new available level per product, or None when the order
+    holds nothing because it was placed before reservations existed.
+    """
+    reservations = db.query(StockReservation).filter(StockReservation.order_id == order.id).all()
+    if not reservations:
+        return None
+    stock = stock_rows(db, order.store_id, (reservation.product_id for reservation in reservations), lock=True)
+    levels = {}
+    for reservation in reservations:
+        row = stock.get(reservation.product_id) or adjust_stock(db, order.store_id, reservation.product_id, 0)
+        row.reserved -= reservation.quantity
+        if take:
+            row.quantity -= reservation.quantity
+        levels[reservation.product_id] = row.available
+        db.delete(reservation)
+    return levels
+
+
+def release_expired_reservations(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: int = 500,
+    max_batches: Optional[int] = None
+) -> int:
+    """Cancel pending orders whose holds have expired and give their stock back.
+
+    Works through ``batch_size`` orders per transaction, oldest order first,
+    and returns how many orders were released.
+    """
+    # Imported here: the order service imports this module
+    from app.services.order_service import OrderService
+
+    if now is None:
+        now = utcnow()
+    released = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        order_ids = [
+            order_id for (order_id,) in (
+                db.query(StockReservation.order_id)
+                .filter(StockReservation.expires_at <= now)
+                .distinct()
+                .order_by(StockReservation.order_id)
+                .limit(batch_size)
+            )
+        ]
+        if not order_ids:
+            break
+
+        # Lock the orders before reading anything the release depends on, so
+        # a till completing or cancelling one of them either finishes first
+        # or sees it cancelled. SQLite ignores FOR UPDATE and only locks at a
+        # transaction's first write, hence the no-op UPDATE.
+        db.query(Order).filter(Order.id.in_(order_ids)).update(
+            {Order.status: Order.status}, synchronize_session=False
+        )
+        orders = (
+            db.query(Order)
+            .filter(Order.id.in_(order_ids), Order.status == "pending")
+            .order_by(Order.id)
+            .with_for_update()
+            .populate_existing()
+            .all()
+        )
+        pending_ids = [order.id for order in orders]
+
+        held = (
+            db.query(StockReservation.store_id, StockReservation.product_id, func.sum(StockReservation.quantity))
+            .filter(StockReservation.order_id.in_(pending_ids))
+            .group_by(StockReservation.store_id, StockReservation.product_id)
+            .all()
+        ) if pending_ids else []
+        for store_id, product_id, quantity in held:
+            db.query(StoreStock).filter(
+                StoreStock.store_id == store_id, StoreStock.product_id == product_id
+            ).update({StoreStock.reserved: StoreStock.reserved - quantity}, synchronize_session=False)
+        # Holds left on orders that were completed or cancelled meanwhile were
+        # already given back by whoever finished the order
+        db.query(StockReservation).filter(
+            StockReservation.order_id.in_(order_ids)
+        ).delete(synchronize_session=False)
+        for order in orders:
+            order.status = "cancelled"
+
+        stock_levels: Dict[int, Dict[int, int]] = {}
+        if held:
+            rows = (
+                db.query(StoreStock.store_id, StoreStock.product_id, StoreStock.available)
+                .filter(tuple_(StoreStock.store_id, StoreStock.product_id).in_(
+                    [(store_id, product_id) for store_id, product_id, _ in held]
+                ))
+                .all()
+            )
+            for store_id, product_id, available in rows:
+                stock_levels.setdefault(store_id, {})[product_id] = available
+            for store_id, levels in stock_levels.items():
+                record_stock_levels(db, store_id, levels)
+            record_tags(db, "stock", *(f"product:{product_id}" for _, product_id, _ in held))
+        db.commit()
+
+        for order in orders:
+            OrderService.publish_order_event("order.cancelled", order)
+        for store_id, levels in stock_levels.items():
+            OrderService.publish_stock_levels(store_id, levels)
+        released += len(orders)
+        batches += 1
+    return released
+
+
+@task_handler("stock.release_expired_reservations")
+def run_reservation_sweep(db: Session, payload: Dict[str, Any]) -> None:
+    """Scheduled job releasing stock held by pending orders past their expiry"""
+    released = release_expired_reservations(
+        db,
+        batch_size=settings.stock_reservation_sweep_batch_size,
+        max_batches=settings.stock_reservation_sweep_max_batches
+    )
+    if released:
+        logger.info("Released stock held by %s expired pending orders", released)
+
+
+register_periodic_task("stock.release_expired_reservations", settings.stock_reservation_sweep_seconds)
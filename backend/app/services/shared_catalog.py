@@ -0,0 +1,414 @@
+from contextlib import contextmanager
+from hashlib import blake2b, sha1
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import bulk_write_listeners
+from app.models import Product, StoreStock
+from app.money import to_minor
+from app.services.task_queue import register_periodic_task, task_handler
+
+try:
+    import fcntl
+except ImportError:  # Windows: the catalog stays off
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# File layout, all little-endian:
+#   header   magic, version, capacity, table size, store id, loaded flag, built at
+#   rows     one per product id below capacity: id, price, stock, barcode hash, active
+#   barcodes open-addressing table of (barcode hash, product id)
+# The version is a seqlock: the writer makes it odd before changing
+# anything and even again afterwards, and readers retry (or give up and go
+# to the database) when it was odd or moved while they read.
+MAGIC = b"POSCAT01"
+HEADER = struct.Struct("<8sQIIIId")
+HEADER_SIZE = 64
+VERSION_OFFSET = 8
+ROW = struct.Struct("<qqqQ?7x")
+SLOT = struct.Struct("<Qq")
+EMPTY = 0
+TOMBSTONE = -1
+READ_ATTEMPTS = 100
+
+
+class CatalogEntry(NamedTuple):
+    product_id: int
+    price: int  # minor units
+    stock: int  # available (on hand less reserved) at the catalog's store
+    barcode_hash: int
+    is_active: bool
+
+
+def barcode_hash(barcode: Optional[str]) -> int:
+    """64-bit hash of a barcode; 0 means none"""
+    if not barcode:
+        return 0
+    return int.from_bytes(blake2b(barcode.encode(), digest_size=8).digest(), "little") or 1
+
+
+def default_path() -> str:
+    # One file per database, in shared memory where the OS has it
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    name = sha1(settings.database_url.encode()).hexdigest()[:12]
+    return os.path.join(directory, f"pos-catalog-{name}.mmap")
+
+
+class SharedCatalog:
+    """Product prices, stock and barcodes in a memory-mapped file.
+
+    Every worker process maps the same file and reads it without copying it
+    into Python objects or asking the database. Rows are indexed by product
+    id, so products with ids at or above ``capacity`` are simply not in the
+    catalog and callers fall back to the database. Stock is kept for one
+    store, ``store_id``. Writes happen after commit, one writer at a time
+    (a file lock across processes plus a thread lock within one), and a
+    periodic rebuild picks up changes made outside the ORM. The catalog is
+    a read cache for scans and listings; checkout still validates stock
+    against locked database rows.
+    """
+
+    def __init__(self, path: str, capacity: int, store_id: int):
+        self.path = path
+        self.capacity = capacity
+        self.store_id = store_id
+        self.table_size = 1 << max(4, (capacity * 2 - 1).bit_length())
+        self.rows_offset = HEADER_SIZE
+        self.table_offset = self.rows_offset + capacity * ROW.size
+        self.size = self.table_offset + self.table_size * SLOT.size
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._map is not None
+
+    @property
+    def version(self) -> int:
+        """Changes on every write; readers compare it to spot stale copies"""
+        if self._map is None:
+            return 0
+        return struct.unpack_from("<Q", self._map, VERSION_OFFSET)[0]
+
+    @property
+    def loaded(self) -> bool:
+        return self._map is not None and HEADER.unpack_from(self._map, 0)[5] == 1
+
+    def built_at(self) -> float:
+        return HEADER.unpack_from(self._map, 0)[6] if self._map is not None else 0.0
+
+    def open(self) -> None:
+        if self._map is not None:
+            return
+        self._file = open(self.path, "a+b")
+        with self._write_lock():
+            self._file.seek(0, os.SEEK_END)
+            fresh = self._file.tell() != self.size
+            if fresh:
+                self._file.truncate(0)
+                self._file.truncate(self.size)
+            self._map = mmap.mmap(self._file.fileno(), self.size)
+            magic, _, capacity, table_size, store_id, _, _ = HEADER.unpack_from(self._map, 0)
+            if fresh or magic != MAGIC or (capacity, table_size, store_id) != (
+                self.capacity, self.table_size, self.store_id
+            ):
+                # Another layout or store: start empty until the next rebuild
+                self._map[:] = bytes(self.size)
+                HEADER.pack_into(self._map, 0, MAGIC, 0, self.capacity, self.table_size, self.store_id, 0, 0.0)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    # Reads
+
+    def _read(self, reader):
+        for _ in range(READ_ATTEMPTS):
+            before = self.version
+            if before & 1:
+                time.sleep(0)
+                continue
+            value = reader(self._map)
+            if self.version == before:
+                return value
+        return None
+
+    def _entry(self, buffer, product_id: int) -> Optional[CatalogEntry]:
+        if not 0 < product_id < self.capacity:
+            return None
+        row = ROW.unpack_from(buffer, self.rows_offset + product_id * ROW.size)
+        return CatalogEntry(*row) if row[0] == product_id else None
+
+    def get(self, product_id: int) -> Optional[CatalogEntry]:
+        if not self.loaded:
+            return None
+        return self._read(lambda buffer: self._entry(buffer, product_id))
+
+    def find_barcode(self, barcode: str) -> Optional[int]:
+        """Product id for a barcode, or None if it is not in the catalog"""
+        if not self.loaded:
+            return None
+        wanted = barcode_hash(barcode)
+
+        def reader(buffer):
+            for slot in self._probe(wanted):
+                stored, product_id = SLOT.unpack_from(buffer, self.table_offset + slot * SLOT.size)
+                if stored == EMPTY and product_id == EMPTY:
+                    return None
+                if stored == wanted and product_id > 0:
+                    return product_id
+            return None
+
+        return self._read(reader)
+
+    def stock_levels(self, store_id: int, product_ids: Iterable[int]) -> Optional[Dict[int, int]]:
+        """Stock per product, or None unless every product is in the catalog"""
+        if store_id != self.store_id or not self.loaded:
+            return None
+        product_ids = list(product_ids)
+
+        def reader(buffer):
+            levels = {}
+            for product_id in product_ids:
+                entry = self._entry(buffer, product_id)
+                if entry is None:
+                    return None
+                levels[product_id] = entry.stock
+            return levels
+
+        return self._read(reader)
+
+    def _probe(self, hashed: int):
+        mask = self.table_size - 1
+        start = hashed & mask
+        for step in range(self.table_size):
+            yield (start + step) & mask
+
+    # Writes
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _begin(self) -> int:
+        version = self.version + 1
+        struct.pack_into("<Q", self._map, VERSION_OFFSET, version)
+        return version
+
+    def _end(self, version: int) -> None:
+        struct.pack_into("<Q", self._map, VERSION_OFFSET, version + 1)
+
+    def apply(
+        self,
+        products: Iterable[Tuple[int, Optional[Dict[str, Any]]]] = (),
+        stock: Iterable[Tuple[int, int]] = ()
+    ) -> None:
+        """Write committed changes: ``products`` as (id, fields or None when
+        deleted) and ``stock`` as (product id, quantity) at the catalog's store"""
+        if self._map is None or not self.loaded:
+            return
+        products = [(product_id, fields) for product_id, fields in products if 0 < product_id < self.capacity]
+        stock = [(product_id, quantity) for product_id, quantity in stock if 0 < product_id < self.capacity]
+        if not products and not stock:
+            return
+        with self._write_lock():
+            version = self._begin()
+            try:
+                for product_id, fields in products:
+                    self._write_product(product_id, fields)
+                for product_id, quantity in stock:
+                    offset = self.rows_offset + product_id * ROW.size
+                    row = list(ROW.unpack_from(self._map, offset))
+                    if row[0] == product_id:
+                        row[2] = quantity
+                        ROW.pack_into(self._map, offset, *row)
+            finally:
+                self._end(version)
+
+    def _write_product(self, product_id: int, fields: Optional[Dict[str, Any]]) -> None:
+        offset = self.rows_offset + product_id * ROW.size
+        old = ROW.unpack_from(self._map, offset)
+        old_hash = old[3] if old[0] == product_id else 0
+        if fields is None:
+            ROW.pack_into(self._map, offset, 0, 0, 0, 0, False)
+            new_hash = 0
+        else:
+            new_hash = barcode_hash(fields["barcode"])
+            stock = old[2] if old[0] == product_id else fields.get("stock", 0)
+            ROW.pack_into(self._map, offset, product_id, fields["price"], stock, new_hash, fields["is_active"])
+        if old_hash != new_hash:
+            if old_hash:
+                self._remove_barcode(old_hash, product_id)
+            if new_hash:
+                self._insert_barcode(self._map, new_hash, product_id)
+
+    def _insert_barcode(self, buffer, hashed: int, product_id: int) -> None:
+        for slot in self._probe(hashed):
+            offset = self.table_offset + slot * SLOT.size
+            stored, current = SLOT.unpack_from(buffer, offset)
+            if current <= 0 or (stored == hashed and current == product_id):
+                SLOT.pack_into(buffer, offset, hashed, product_id)
+                return
+
+    def _remove_barcode(self, hashed: int, product_id: int) -> None:
+        for slot in self._probe(hashed):
+            offset = self.table_offset + slot * SLOT.size
+            stored, current = SLOT.unpack_from(self._map, offset)
+            if stored == EMPTY and current == EMPTY:
+                return
+            if stored == hashed and current == product_id:
+                SLOT.pack_into(self._map, offset, hashed, TOMBSTONE)
+                return
+
+    def rebuild(self, db: Session) -> int:
+        """Reload every product and the store's stock from the database"""
+        stock = dict(
+            db.query(StoreStock.product_id, StoreStock.available)
+            .filter(StoreStock.store_id == self.store_id, StoreStock.product_id < self.capacity)
+        )
+        rows = bytearray(self.capacity * ROW.size)
+        table = bytearray(self.table_size * SLOT.size)
+        count = 0
+        for product_id, price, barcode, is_active in (
+            db.query(Product.id, Product.price, Product.barcode, Product.is_active)
+            .filter(Product.id < self.capacity)
+        ):
+            hashed = barcode_hash(barcode)
+            ROW.pack_into(
+                rows, product_id * ROW.size,
+                product_id, to_minor(price), stock.get(product_id, 0), hashed, bool(is_active)
+            )
+            if hashed:
+                self._insert_barcode_into(table, hashed, product_id)
+            count += 1
+
+        with self._write_lock():
+            version = self._begin()
+            try:
+                self._map[self.rows_offset:self.table_offset] = rows
+                self._map[self.table_offset:self.size] = table
+                HEADER.pack_into(
+                    self._map, 0, MAGIC, version, self.capacity, self.table_size, self.store_id, 1, time.time()
+                )
+            finally:
+                self._end(version)
+        return count
+
+    def _insert_barcode_into(self, table: bytearray, hashed: int, product_id: int) -> None:
+        mask = self.table_size - 1
+        slot = hashed & mask
+        while SLOT.unpack_from(table, slot * SLOT.size)[1] > 0:
+            slot = (slot + 1) & mask
+        SLOT.pack_into(table, slot * SLOT.size, hashed, product_id)
+
+
+shared_catalog: Optional[SharedCatalog] = None
+if settings.shared_catalog_enabled and fcntl is not None:
+    shared_catalog = SharedCatalog(
+        settings.shared_catalog_path or default_path(),
+        settings.shared_catalog_capacity,
+        settings.shared_catalog_store_id or settings.default_store_id,
+    )
+
+
+def _product_fields(product: Product) -> Dict[str, Any]:
+    return {"price": to_minor(product.price), "barcode": product.barcode, "is_active": bool(product.is_active)}
+
+
+def track_changes(session_factory) -> None:
+    """Copy committed product and stock changes of ORM sessions into the catalog"""
+
+    def collect_instances(session, written, deleted):
+        changes: List = session.info.setdefault("catalog_changes", [])
+        for instance in written:
+            if isinstance(instance, Product):
+                changes.append(("product", instance.id, _product_fields(instance)))
+            elif isinstance(instance, StoreStock) and instance.store_id == shared_catalog.store_id:
+                changes.append(("stock", instance.product_id, instance.available))
+        for instance in deleted:
+            if isinstance(instance, Product):
+                changes.append(("product", instance.id, None))
+            elif isinstance(instance, StoreStock) and instance.store_id == shared_catalog.store_id:
+                changes.append(("stock", instance.product_id, 0))
+
+    @event.listens_for(session_factory, "after_flush")
+    def collect(session, flush_context):
+        collect_instances(session, session.new | session.dirty, session.deleted)
+
+    bulk_write_listeners.append(collect_instances)
+
+    @event.listens_for(session_factory, "after_commit")
+    def publish(session):
+        changes = session.info.pop("catalog_changes", None)
+        if not changes:
+            return
+        try:
+            shared_catalog.apply(
+                products=[(key, value) for kind, key, value in changes if kind == "product"],
+                stock=[(key, value) for kind, key, value in changes if kind == "stock"],
+            )
+        except Exception:
+            # The database has the change; the next rebuild will catch up
+            logger.exception("Shared catalog update failed")
+
+    @event.listens_for(session_factory, "after_rollback")
+    def discard(session):
+        session.info.pop("catalog_changes", None)
+
+
+def record_stock_levels(session: Session, store_id: int, levels: Dict[int, int]) -> None:
+    """Queue stock levels written with SQL UPDATEs, which the flush hook
+    never sees, for the catalog when ``session`` commits"""
+    if shared_catalog is None or not shared_catalog.is_open or store_id != shared_catalog.store_id:
+        return
+    changes: List = session.info.setdefault("catalog_changes", [])
+    changes.extend(("stock", product_id, level) for product_id, level in levels.items())
+
+
+def start_shared_catalog(session_factory) -> None:
+    """Map the catalog, reload it and start following commits of ``session_factory``"""
+    if shared_catalog is None or shared_catalog.is_open:
+        return
+    shared_catalog.open()
+    # Always reload: the file outlives the server and may describe an older database
+    db = session_factory()
+    try:
+        count = shared_catalog.rebuild(db)
+    finally:
+        db.close()
+    track_changes(session_factory)
+    logger.info("Shared catalog %s loaded with %s products", shared_catalog.path, count)
+
+
+def stop_shared_catalog() -> None:
+    if shared_catalog is not None:
+        shared_catalog.close()
+
+
+@task_handler("catalog.rebuild")
+def rebuild_shared_catalog(db: Session, payload: Dict[str, Any]) -> None:
+    """Scheduled full reload, for changes made outside the ORM"""
+    if shared_catalog is not None and shared_catalog.is_open:
+        shared_catalog.rebuild(db)
+
+
+if shared_catalog is not None:
+    register_periodic_task("catalog.rebuild", settings.shared_catalog_rebuild_seconds)
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List
+from sqlalchemy.orm import Session
+from app.models import Product, StoreStock
+from app.schemas import Product as ProductSchema
+from app.services.shared_catalog import shared_catalog
+
+# Stock is kept per (store, product) in store_stock, so tills in different
+# branches update different rows and never wait on each other
+
+
+def stock_levels(db: Session, store_id: int, product_ids: Iterable[int]) -> Dict[int, int]:
+    """Available quantity (on hand less reserved) per product at one store; missing rows count as 0"""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    if shared_catalog is not None:
+        levels = shared_catalog.stock_levels(store_id, product_ids)
+        if levels is not None:
+            return levels
+    rows = (
+        db.query(StoreStock.product_id, StoreStock.available)
+        .filter(StoreStock.store_id == store_id, StoreStock.product_id.in_(product_ids))
+        .all()
+    )
+    levels = dict.fromkeys(product_ids, 0)
+    levels.update(rows)
+    return levels
+
+
+def product_with_stock(product: Product, stock_quantity: int) -> ProductSchema:
+    """Product response carrying its available quantity at one store"""
+    fields = {name: getattr(product, name) for name in ProductSchema.model_fields if name != "stock_quantity"}
+    return ProductSchema(stock_quantity=stock_quantity, **fields)
+
+
+def with_stock(db: Session, store_id: int, products: List[Product]) -> List[ProductSchema]:
+    """Product responses with each product's available quantity at the store"""
+    levels = stock_levels(db, store_id, (product.id for product in products))
+    return [product_with_stock(product, levels[product.id]) for product in products]
+
+
+def stock_rows(
+    db: Session, store_id: int, product_ids: Iterable[int], lock: bool = False
+) -> Dict[int, StoreStock]:
+    """Load the store's stock rows for the products, locking them if asked"""
+    query = db.query(StoreStock).filter(
+        StoreStock.store_id == store_id, StoreStock.product_id.in_(set(product_ids))
+    )
+    if lock:
+        query = query.with_for_update()
+    return {row.product_id: row for row in query.all()}
+
+
+def set_stock(db: Session, store_id: int, product_id: int, quantity: int) -> StoreStock:
+    """Set the available quantity of a product at a store, without committing.
+
+    Units held by pending orders stay on hand on top of ``quantity``, so this
+    is the inverse of what stock_levels reports.
+    """
+    row = db.get(StoreStock, (store_id, product_id), with_for_update=True)
+    if row is None:
+        row = StoreStock(store_id=store_id, product_id=product_id, quantity=quantity, reserved=0)
+        db.add(row)
+    else:
+        row.quantity = quantity + row.reserved
+    return row
+
+
+def adjust_stock(db: Session, store_id: int, product_id: int, delta: int) -> StoreStock:
+    """Add ``delta`` (negative to remove) to a product's stock at a store"""
+    row = db.get(StoreStock, (store_id, product_id))
+    if row is None:
+        row = StoreStock(store_id=store_id, product_id=product_id, quantity=0)
+        db.add(row)
+    row.quantity += delta
+    return row
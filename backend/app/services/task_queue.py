@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import OutboxTask
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[[Session, Dict[str, Any]], None]
+
+task_handlers: Dict[str, TaskHandler] = {}
+
+# name -> (interval seconds, payload) of tasks enqueued on a schedule
+periodic_tasks: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def task_handler(name: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register a function as the handler for tasks called ``name``"""
+    def decorator(func: TaskHandler) -> TaskHandler:
+        task_handlers[name] = func
+        return func
+    return decorator
+
+
+def register_periodic_task(
+    name: str, interval_seconds: float, payload: Optional[Dict[str, Any]] = None
+) -> None:
+    """Have the queue enqueue task ``name`` every ``interval_seconds``.
+
+    The task runs through the outbox like any other, with retries, and is
+    not enqueued again while a previous run is still pending or running.
+    """
+    periodic_tasks[name] = (interval_seconds, payload or {})
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_task(
+    db: Session,
+    task_name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    delay_seconds: float = 0
+) -> OutboxTask:
+    """Add a task to the outbox as part of the caller's transaction.
+
+    The task only becomes visible to the queue when the caller commits, so a
+    rolled back order never sends a receipt. Call ``task_queue.notify()``
+    after the commit to have it picked up straight away.
+    """
+    now = utcnow()
+    task = OutboxTask(
+        task_name=task_name,
+        payload=json.dumps(payload or {}),
+        status="pending",
+        attempts=0,
+        available_at=now + timedelta(seconds=delay_seconds),
+        created_at=now
+    )
+    db.add(task)
+    return task
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class TaskQueueStats:
+    """Counters and latency totals for the metrics endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.queue_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "started": self.started,
+                "succeeded": self.succeeded,
+                "retried": self.retried,
+                "failed": self.failed,
+                "queue_seconds_total": self.queue_seconds_total,
+                "run_seconds_total": self.run_seconds_total,
+            }
+
+
+class TaskQueue:
+    """In-process worker for the transactional outbox.
+
+    A dispatcher thread claims due tasks from ``outbox_tasks`` and runs them
+    on a thread pool with at most ``concurrency`` tasks in flight. Failed
+    tasks are retried with exponential backoff until ``max_attempts``. Tasks
+    are claimed with a conditional UPDATE, so several workers can share the
+    outbox, and tasks left running by a crashed worker are retried once their
+    lease expires.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.concurrency = settings.task_queue_concurrency
+        self.stats = TaskQueueStats()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_maintenance = 0.0
+        self._periodic_due: Dict[str, float] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="task-worker"
+        )
+        self._thread = threading.Thread(target=self._run, name="task-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info("Task queue started with concurrency %s", self.concurrency)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming tasks and wait for in-flight tasks to finish"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+        self._thread = None
+        logger.info("Task queue stopped")
+
+    def notify(self) -> None:
+        """Wake the dispatcher, e.g. right after committing new tasks"""
+        self._wakeup.set()
+
+    def depth(self) -> int:
+        """Number of tasks waiting to run"""
+        db = self.session_factory()
+        try:
+            return db.query(func.count(OutboxTask.id)).filter(OutboxTask.status == "pending").scalar()
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._maintenance()
+                self._enqueue_periodic()
+                claimed = self._dispatch_due()
+            except Exception:
+                logger.exception("Task dispatcher error")
+                claimed = 0
+            if not claimed:
+                self._wakeup.wait(settings.task_queue_poll_interval_seconds)
+                self._wakeup.clear()
+
+    def _maintenance(self) -> None:
+        """Requeue expired leases and purge old finished tasks once a minute"""
+        if time.monotonic() - self._last_maintenance < 60:
+            return
+        self._last_maintenance = time.monotonic()
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            requeued = (
+                db.query(OutboxTask)
+                .filter(
+                    OutboxTask.status == "running",
+                    OutboxTask.started_at < now - timedelta(seconds=settings.task_queue_lease_seconds)
+                )
+                .update({"status": "pending", "available_at": now}, synchronize_session=False)
+            )
+            db.query(OutboxTask).filter(
+                OutboxTask.status.in_(["done", "failed"]),
+                OutboxTask.finished_at < now - timedelta(hours=settings.task_queue_retention_hours)
+            ).delete(synchronize_session=False)
+            db.commit()
+            if requeued:
+                logger.warning("Requeued %s tasks with expired leases", requeued)
+        finally:
+            db.close()
+
+    def _enqueue_periodic(self) -> None:
+        """Enqueue scheduled tasks whose interval has elapsed"""
+        now = time.monotonic()
+        due = [
+            (name, payload) for name, (interval, payload) in periodic_tasks.items()
+            if self._periodic_due.get(name, 0.0) <= now
+        ]
+        if not due:
+            return
+        db = self.session_factory()
+        try:
+            for name, payload in due:
+                self._periodic_due[name] = now + periodic_tasks[name][0]
+                queued = (
+                    db.query(OutboxTask.id)
+                    .filter(OutboxTask.task_name == name, OutboxTask.status.in_(["pending", "running"]))
+                    .first()
+                )
+                if queued is None:
+                    enqueue_task(db, name, payload)
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self, limit: int) -> List[int]:
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            candidates = [
+                task_id for (task_id,) in db.query(OutboxTask.id)
+                .filter(OutboxTask.status == "pending", OutboxTask.available_at <= now)
+                .order_by(OutboxTask.available_at, OutboxTask.id)
+                .limit(limit)
+            ]
+            claimed = []
+            for task_id in candidates:
+                updated = (
+                    db.query(OutboxTask)
+                    .filter(OutboxTask.id == task_id, OutboxTask.status == "pending")
+                    .update({"status": "running", "started_at": now}, synchronize_session=False)
+                )
+                if updated:
+                    claimed.append(task_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _dispatch_due(self) -> int:
+        free = self.concurrency - self._in_flight
+        if free <= 0:
+            return 0
+        claimed = self._claim(min(free, settings.task_queue_batch_size))
+        for task_id in claimed:
+            with self._in_flight_lock:
+                self._in_flight += 1
+            self._executor.submit(self._execute, task_id)
+        return len(claimed)
+
+    def _execute(self, task_id: int) -> None:
+        db = self.session_factory()
+        started = time.perf_counter()
+        try:
+            task = db.query(OutboxTask).filter(OutboxTask.id == task_id).first()
+            if task is None:
+                return
+            with self.stats.lock:
+                self.stats.started += 1
+                self.stats.queue_seconds_total += max(
+                    0.0, (_as_utc(task.started_at) - _as_utc(task.available_at)).total_seconds()
+                )
+            handler = task_handlers.get(task.task_name)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for task {task.task_name}")
+                handler(db, json.loads(task.payload))
+                task.status = "done"
+                task.finished_at = utcnow()
+                db.commit()
+                with self.stats.lock:
+                    self.stats.succeeded += 1
+            except Exception as exc:
+                db.rollback()
+                self._record_failure(db, task, exc)
+        except Exception:
+            logger.exception("Could not run task %s", task_id)
+        finally:
+            db.close()
+            with self.stats.lock:
+                self.stats.run_seconds_total += time.perf_counter() - started
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            self._wakeup.set()
+
+    def _record_failure(self, db: Session, task: OutboxTask, exc: Exception) -> None:
+        task.attempts += 1
+        task.last_error = f"{type(exc).__name__}: {exc}"
+        if task.attempts >= settings.task_queue_max_attempts or isinstance(exc, LookupError):
+            task.status = "failed"
+            task.finished_at = utcnow()
+            logger.error("Task %s (%s) failed permanently: %s", task.id, task.task_name, task.last_error)
+            with self.stats.lock:
+                self.stats.failed += 1
+        else:
+            delay = settings.task_queue_retry_backoff_seconds * (2 ** (task.attempts - 1))
+            task.status = "pending"
+            task.available_at = utcnow() + timedelta(seconds=delay)
+            logger.warning(
+                "Task %s (%s) failed, retrying in %.1fs: %s",
+                task.id, task.task_name, delay, task.last_error
+            )
+            with self.stats.lock:
+                self.stats.retried += 1
+        db.commit()
+
+
+task_queue = TaskQueue()
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import logging
+import threading
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import RevokedToken
+from app.services.task_queue import register_periodic_task, task_handler, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class RevocationList:
+    """Revoked token ids, kept in memory so checking a token needs no query.
+
+    The ``revoked_tokens`` table is the source of truth: revoking writes a
+    row (its primary key makes a refresh token single-use even across
+    workers) and every process reloads rows revoked elsewhere every
+    ``token_revocation_sync_seconds``. Only tokens that have not expired yet
+    are kept, so the set stays as small as the number of recent logouts and
+    refreshes.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._revoked: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._synced_at: Optional[datetime] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime, user_id: Optional[int] = None) -> bool:
+        """Revoke a token id; False when it was already revoked"""
+        db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=utcnow()))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            self._add(jti, expires_at)
+            return False
+        self._add(jti, expires_at)
+        return True
+
+    def sync(self) -> None:
+        """Load tokens revoked since the last sync and forget expired ones"""
+        now = utcnow()
+        db = self.session_factory()
+        try:
+            query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+            if self._synced_at is not None:
+                # Overlap a little so rows committed during the last sync are not missed
+                query = query.filter(RevokedToken.revoked_at >= self._synced_at)
+            rows = query.all()
+        finally:
+            db.close()
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = _as_utc(expires_at)
+            self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        self._synced_at = now - timedelta(seconds=settings.token_revocation_sync_seconds)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.sync()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="token-revocation-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(settings.token_revocation_sync_seconds):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+    def _add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[jti] = _as_utc(expires_at)
+
+
+revocation_list = RevocationList()
+
+
+@task_handler("auth.purge_revoked_tokens")
+def purge_revoked_tokens(db: Session, payload: Dict[str, Any]) -> None:
+    """Drop revocations of tokens that have expired anyway"""
+    purged = db.query(RevokedToken).filter(RevokedToken.expires_at <= utcnow()).delete(synchronize_session=False)
+    db.commit()
+    if purged:
+        logger.info("Purged %s expired token revocations", purged)
+
+
+register_periodic_task("auth.purge_revoked_tokens", 3600)
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from app.money import round_minor
+from app.services.pricing_rules import PricingRules, get_pricing_rules
+from app.services.promotions import PromotionIndex, PromotionMatch
+
+# All amounts in this module are integer minor units
+
+
+class BasketLine(NamedTuple):
+    product_id: int
+    category_id: Optional[int]
+    quantity: int
+    unit_price: int
+    # Prices typed in by the cashier are kept as-is and skip bulk tiers
+    manual_price: bool = False
+
+
+class LineTotal(NamedTuple):
+    product_id: int
+    quantity: int
+    unit_price: int
+    total_price: int
+    category_id: Optional[int] = None
+    discount: int = 0
+
+
+class OrderTotals(NamedTuple):
+    lines: List[LineTotal]
+    subtotal: int
+    tax_amount: int
+    discount_amount: int
+    total_amount: int
+    taxes: Dict[str, int]
+    promotion_discount: int = 0
+    promotions: List[PromotionMatch] = []
+
+
+def tax_for(subtotal: int, tax_rate: Optional[float] = None) -> int:
+    """Tax on an integer subtotal.
+
+    With an explicit ``tax_rate`` this is a flat rate rounded half-up once;
+    otherwise the default tax profile of the pricing rules is applied.
+    """
+    if tax_rate is None:
+        return sum(get_pricing_rules().default_profile.taxes_for(subtotal).values())
+    return round_minor(subtotal * Decimal(str(tax_rate)))
+
+
+def compute_order_totals(
+    lines: Iterable[BasketLine],
+    discount: int = 0,
+    rules: Optional[PricingRules] = None,
+    promotions: Optional[PromotionIndex] = None
+) -> OrderTotals:
+    """Compute line totals, promotions, subtotal, tax, discount and total.
+
+    Bulk tiers are applied per line, promotions reduce the taxable amount of
+    the lines they apply to, and taxable amounts are accumulated per tax
+    profile so each tax component is rounded once per basket. ``discount``
+    is the manual discount and is taken off after tax, as before.
+    """
+    if rules is None:
+        rules = get_pricing_rules()
+
+    line_totals = []
+    subtotal = 0
+    for line in lines:
+        unit_price = line.unit_price
+        if not line.manual_price:
+            unit_price = rules.unit_price_for(line.product_id, line.category_id, line.quantity, unit_price)
+        total_price = unit_price * line.quantity
+        subtotal += total_price
+        line_totals.append(LineTotal(line.product_id, line.quantity, unit_price, total_price, line.category_id))
+
+    matches: List[PromotionMatch] = []
+    promotion_discount = 0
+    if promotions is not None:
+        line_discounts, matches = promotions.evaluate(line_totals)
+        promotion_discount = sum(line_discounts)
+        if promotion_discount:
+            line_totals = [
+                line._replace(discount=line_discount)
+                for line, line_discount in zip(line_totals, line_discounts)
+            ]
+
+    base_by_profile = {}
+    for line in line_totals:
+        profile = rules.tax_profile_for(line.category_id)
+        base_by_profile[profile] = base_by_profile.get(profile, 0) + line.total_price - line.discount
+
+    taxes: Dict[str, int] = {}
+    for profile, base in base_by_profile.items():
+        for code, amount in profile.taxes_for(base).items():
+            taxes[code] = taxes.get(code, 0) + amount
+    tax_amount = sum(taxes.values())
+    discount_amount = discount + promotion_discount
+
+    return OrderTotals(
+        lines=line_totals,
+        subtotal=subtotal,
+        tax_amount=tax_amount,
+        discount_amount=discount_amount,
+        total_amount=subtotal + tax_amount - discount_amount,
+        taxes=taxes,
+        promotion_discount=promotion_discount,
+        promotions=matches
+    )
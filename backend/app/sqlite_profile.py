@@ -0,0 +1,44 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+def apply_sqlite_profile(engine: Engine, in_memory: bool = False) -> None:
+    """Set the production pragmas on every new connection of a SQLite engine"""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}",
+        f"PRAGMA temp_store = {settings.sqlite_temp_store}",
+    ]
+    if not in_memory:
+        # journal_mode is stored in the database file; mmap has no file to map
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+        pragmas.append(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def enforce_foreign_keys(engine: Engine) -> None:
+    """SQLite ignores FOREIGN KEY constraints unless each connection asks for them"""
+
+    @event.listens_for(engine, "connect")
+    def set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA foreign_keys = ON")
+        finally:
+            cursor.close()
+
+
+def configure_sqlite_engine(engine: Engine, url: str) -> None:
+    enforce_foreign_keys(engine)
+    if not settings.sqlite_tuning_enabled:
+        return
+    apply_sqlite_profile(engine, in_memory=":memory:" in url or url.rstrip("/").endswith("sqlite:"))
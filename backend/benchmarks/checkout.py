@@ -0,0 +1,162 @@
+"""Load test the checkout path with scripted till workloads.
+
+    python -m benchmarks.checkout --database-url sqlite:///./bench.db --concurrency 8 --duration 30
+
+Seeds a dataset (unless --no-seed), then runs one simulated till per unit of
+concurrency against the real FastAPI app, in process through httpx's ASGI
+transport or against a running server with --base-url. Each till loops
+over: scan 1-8 barcodes, search the catalog, create an order, complete it,
+and every few checkouts list recent orders. Per-endpoint p50/p95/p99
+latency and throughput are written to a JSON file that
+``python -m benchmarks.compare`` can diff between commits.
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import random
+import time
+from benchmarks.common import environment, migrate, summarize, use_database, write_results
+from benchmarks import seed as seeding
+
+ENDPOINTS = ("login", "scan", "search", "create_order", "complete_order", "list_orders")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+
+    async def call(self, name: str, request) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+
+async def run_till(client, recorder: Recorder, till: int, args: argparse.Namespace, deadline: float) -> int:
+    rng = random.Random(args.seed + till)
+    response = await recorder.call("login", client.post(
+        "/api/auth/login", data={"username": f"till{till:02d}", "password": seeding.PASSWORD}
+    ))
+    if response is None:
+        return 0
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    checkouts = 0
+    while time.monotonic() < deadline and (not args.iterations or checkouts < args.iterations):
+        items = []
+        for _ in range(rng.randint(1, 8)):
+            barcode = seeding.barcode_for(rng.randint(1, args.products))
+            scanned = await recorder.call("scan", client.get(f"/api/products/barcode/{barcode}", headers=headers))
+            if scanned is not None:
+                items.append({"product_id": scanned.json()["id"], "quantity": rng.randint(1, 3), "unit_price": 0})
+
+        await recorder.call("search", client.get(
+            "/api/products/", params={"search": rng.choice(seeding.WORDS), "limit": 20}, headers=headers
+        ))
+
+        if items:
+            created = await recorder.call("create_order", client.post(
+                "/api/orders/", json={"items": items, "payment_method": "cash"}, headers=headers
+            ))
+            if created is not None:
+                await recorder.call("complete_order", client.post(
+                    f"/api/orders/{created.json()['id']}/complete", headers=headers
+                ))
+
+        if checkouts % 5 == 0:
+            await recorder.call("list_orders", client.get("/api/orders/", params={"limit": 20}, headers=headers))
+        checkouts += 1
+    return checkouts
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    recorder = Recorder()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        lifespan = None
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        lifespan = app.router.lifespan_context(app)
+
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            started = time.perf_counter()
+            deadline = time.monotonic() + args.duration
+            checkouts = await asyncio.gather(*(
+                run_till(client, recorder, till, args, deadline)
+                for till in range(1, args.concurrency + 1)
+            ))
+            duration = time.perf_counter() - started
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    endpoints = {
+        name: summarize(recorder.latencies[name], recorder.errors[name], duration)
+        for name in ENDPOINTS
+    }
+    requests = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "duration_seconds": round(duration, 2),
+        "checkouts": sum(checkouts),
+        "checkouts_per_second": round(sum(checkouts) / duration, 2),
+        "requests": requests,
+        "requests_per_second": round(requests / duration, 2),
+        "endpoints": endpoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seeding.add_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="simulated tills")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--iterations", type=int, default=0, help="checkouts per till (0 = until --duration)")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--no-seed", action="store_true", help="reuse an already seeded database")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    args = parser.parse_args()
+    args.tills = max(args.tills, args.concurrency)
+
+    use_database(args.database_url)
+    dataset = None
+    if not args.no_seed:
+        migrate(args.database_url)
+        dataset = seeding.seed(args)
+
+    results = asyncio.run(run(args))
+    results.update({
+        "benchmark": "checkout",
+        "environment": environment(),
+        "database": args.database_url.split("://")[0],
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "dataset": dataset,
+    })
+    path = write_results(results, args.output, "checkout")
+
+    print(f"{'endpoint':<16}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for name, endpoint in results["endpoints"].items():
+        print(
+            f"{name:<16}{endpoint['count']:>8}{endpoint['errors']:>8}{endpoint['p50_ms']:>10}"
+            f"{endpoint['p95_ms']:>10}{endpoint['p99_ms']:>10}{endpoint['throughput_rps']:>10}"
+        )
+    print(f"{results['checkouts_per_second']} checkouts/s, {results['requests_per_second']} requests/s")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
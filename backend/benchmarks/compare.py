@@ -0,0 +1,53 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/head.json
+
+Prints the change of each per-endpoint latency percentile and throughput.
+Exits with status 1 when any p95 regresses by more than --threshold percent,
+so it can gate a CI job.
+"""
+from typing import Any, Dict
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> bool:
+    regressed = False
+    print(f"base {base['environment']['commit']}  head {head['environment']['commit']}")
+    print(f"{'endpoint':<16}" + "".join(f"{metric:>22}" for metric in METRICS))
+    for name, head_endpoint in head.get("endpoints", {}).items():
+        base_endpoint = base.get("endpoints", {}).get(name)
+        if base_endpoint is None:
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = change(base_endpoint[metric], head_endpoint[metric])
+            cells.append(f"{head_endpoint[metric]:>12} ({delta:+6.1f}%)")
+            if metric == "p95_ms" and delta > threshold:
+                regressed = True
+        print(f"{name:<16}" + "".join(f"{cell:>22}" for cell in cells))
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 regression in percent")
+    args = parser.parse_args()
+    with open(args.base) as base_file, open(args.head) as head_file:
+        regressed = compare(json.load(base_file), json.load(head_file), args.threshold)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Barcode scan latency while many cashiers log in at once.
+
+    python -m benchmarks.login_storm --logins 30 --duration 10
+
+Runs the in-process app twice, each in a fresh subprocess against its own
+database: once hashing passwords inline on the event loop
+(PASSWORD_HASH_WORKERS=0) and once on the password hashing pool. In each
+run one till scans barcodes continuously, first alone and then while
+``--logins`` other tills log in over and over. Scan latency should stay
+flat through the storm; logins turned away with 503 are counted separately.
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import BACKEND_DIR, environment, migrate, summarize, use_database, write_results
+
+MODES = {
+    "inline": {"PASSWORD_HASH_WORKERS": "0"},
+    "pool": {},
+}
+SCAN_INTERVAL = 0.05  # a fast cashier, 20 scans a second
+
+
+async def scan(client, headers: Dict[str, str], products: int, deadline: float, latencies: List[float]) -> None:
+    """Scan at a fixed cadence; latency counts from when the scan was due, so a frozen loop shows up"""
+    from benchmarks import seed as seeding
+
+    number = 0
+    due = time.perf_counter()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        barcode = seeding.barcode_for(number % products + 1)
+        response = await client.get(f"/api/products/barcode/{barcode}", headers=headers)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - due)
+        number += 1
+        due += SCAN_INTERVAL
+
+
+async def log_in(client, till: int, deadline: float, outcomes: Dict[str, Any]) -> None:
+    from benchmarks import seed as seeding
+
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/auth/login", data={"username": f"till{till:02d}", "password": seeding.PASSWORD}
+        )
+        if response.status_code == 200:
+            outcomes["latencies"].append(time.perf_counter() - started)
+        elif response.status_code == 503:
+            outcomes["rejected"] += 1
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+        else:
+            outcomes["errors"] += 1
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from benchmarks import seed as seeding
+    from main import app
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+    async with client, app.router.lifespan_context(app):
+        response = await client.post("/api/auth/login", data={"username": "till01", "password": seeding.PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        quiet: List[float] = []
+        await scan(client, headers, args.products, time.monotonic() + args.quiet, quiet)
+
+        storm: List[float] = []
+        logins = {"latencies": [], "rejected": 0, "errors": 0}
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            scan(client, headers, args.products, deadline, storm),
+            *(log_in(client, till, deadline, logins) for till in range(2, args.logins + 2)),
+        )
+        duration = time.perf_counter() - started
+
+    login_summary = summarize(logins["latencies"], logins["errors"], duration)
+    login_summary["rejected"] = logins["rejected"]
+    return {
+        "scan_quiet": summarize(quiet, 0, args.quiet),
+        "scan_storm": summarize(storm, 0, duration),
+        "login": login_summary,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=30, help="tills logging in concurrently")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of login storm")
+    parser.add_argument("--quiet", type=float, default=3.0, help="seconds of scanning before the storm")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        use_database(args.database_url)
+        from benchmarks import seed as seeding
+
+        migrate(args.database_url)
+        seeding.seed(argparse.Namespace(
+            categories=10, products=args.products, customers=10, orders=0, tills=args.logins + 1, seed=42
+        ))
+        print(json.dumps(asyncio.run(run(args))))
+        return
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, env in MODES.items():
+            database_url = f"sqlite:///{os.path.join(directory, name + '.db')}"
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.login_storm", "--child", "--database-url", database_url,
+                 "--logins", str(args.logins), "--duration", str(args.duration), "--quiet", str(args.quiet),
+                 "--products", str(args.products)],
+                cwd=BACKEND_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True
+            )
+            results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    print(f"{'mode':<8}{'phase':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'503s':>8}")
+    for name, result in results.items():
+        for phase in ("scan_quiet", "scan_storm", "login"):
+            summary = result[phase]
+            print(f"{name:<8}{phase:<12}{summary['count']:>8}{summary['p50_ms']:>10}{summary['p95_ms']:>10}"
+                  f"{summary['p99_ms']:>10}{summary['max_ms']:>10}{summary.get('rejected', ''):>8}")
+
+    path = write_results({
+        "benchmark": "login_storm",
+        "environment": environment(),
+        "logins": args.logins,
+        "duration_seconds": args.duration,
+        "modes": results,
+    }, args.output, "login-storm")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Micro-benchmarks for ORM, pricing and serialization hot spots.
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter crud --number 2000
+    python -m benchmarks.micro --order-number-collisions 10000000
+
+Each case reports time per operation and memory behaviour measured with
+tracemalloc: ``peak_bytes`` is the transient high-water mark of one
+operation and ``retained_blocks`` is the number of memory blocks still
+alive per operation afterwards (non-zero means caches or leaks). CPython
+does not expose a total allocation count, so these two stand in for it.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import gc
+import time
+import tracemalloc
+from benchmarks.common import environment, migrate, use_database, write_results
+from benchmarks import seed as seeding
+
+Case = Tuple[str, Callable[[], Any], int]
+
+
+def measure(func: Callable[[], Any], number: int) -> Dict[str, Any]:
+    for _ in range(min(number, 10)):
+        func()
+
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - started
+    finally:
+        gc.enable()
+
+    # Memory pass, separate from timing because tracing slows everything down
+    samples = max(1, min(number, 50))
+    tracemalloc.start()
+    try:
+        func()
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "number": number,
+        "us_per_op": round(elapsed / number / 1000, 3),
+        "ops_per_second": round(number / (elapsed / 1e9), 1),
+        "peak_bytes": peak,
+        "retained_blocks": round(retained / samples, 2),
+    }
+
+
+def build_cases(args: argparse.Namespace) -> List[Case]:
+    from app.auth import get_password_hash, verify_password
+    from app.crud.crud_customer import customer as customer_crud
+    from app.database import SessionLocal
+    from app.models import Order
+    from app.schemas import Order as OrderSchema, OrderItemCreate
+    from app.services.order_numbers import SnowflakeOrderNumberGenerator, UlidOrderNumberGenerator
+    from app.services.order_service import OrderService
+    from app.services.shared_catalog import shared_catalog, start_shared_catalog
+    from app.services.stock import stock_levels
+    from app.services.totals import BasketLine, compute_order_totals
+    from sqlalchemy.orm import selectinload
+
+    start_shared_catalog(SessionLocal)
+    db = SessionLocal()
+    items = [
+        OrderItemCreate(product_id=product_id, quantity=2, unit_price=0)
+        for product_id in range(1, args.basket_size + 1)
+    ]
+    lines = [
+        BasketLine(product_id=line, category_id=line % 7, quantity=2, unit_price=1999)
+        for line in range(1, args.basket_size + 1)
+    ]
+    customer = customer_crud.get(db, id=1)
+    order = (
+        db.query(Order)
+        .options(selectinload(Order.order_items), selectinload(Order.customer))
+        .filter(Order.id == 1)
+        .one()
+    )
+    password_hash = get_password_hash(seeding.PASSWORD)
+    ulid = UlidOrderNumberGenerator()
+    snowflake = SnowflakeOrderNumberGenerator(node_id=1)
+    counter = iter(range(10 ** 12))
+
+    def crud_update():
+        customer_crud.update(db, db_obj=customer, obj_in={"phone": f"0{next(counter)}"})
+
+    def crud_update_returning():
+        customer_crud.update(db, db_obj=customer, obj_in={"phone": f"0{next(counter)}"}, returning=True)
+
+    def serialize_order():
+        OrderSchema.model_validate(order).model_dump_json()
+
+    product_ids = list(range(1, args.basket_size + 1))
+    barcode = seeding.barcode_for(1)
+
+    def stock_levels_db():
+        # A store the shared catalog does not cover, so the query path runs
+        stock_levels(db, -1, product_ids)
+
+    number = args.number
+    cases = [
+        ("order_numbers.ulid", ulid.generate, number * 10),
+        ("order_numbers.snowflake", snowflake.generate, number * 10),
+        ("totals.compute_order_totals", lambda: compute_order_totals(lines), number),
+        ("order_service.validate_order_items", lambda: OrderService.validate_order_items(db, items, seeding.STORE_ID), number),
+        ("crud.update", crud_update, number),
+        ("crud.update_returning", crud_update_returning, number),
+        ("schemas.order_from_attributes", serialize_order, number),
+        ("auth.get_password_hash", lambda: get_password_hash(seeding.PASSWORD), args.hash_number),
+        ("auth.verify_password", lambda: verify_password(seeding.PASSWORD, password_hash), args.hash_number),
+        ("stock.stock_levels_db", stock_levels_db, number),
+    ]
+    if shared_catalog is not None:
+        cases += [
+            ("stock.stock_levels_shared_catalog", lambda: stock_levels(db, seeding.STORE_ID, product_ids), number),
+            ("shared_catalog.find_barcode", lambda: shared_catalog.find_barcode(barcode), number * 10),
+        ]
+    return cases
+
+
+def check_order_number_collisions(count: int) -> Dict[str, Any]:
+    """Generate ``count`` ids per strategy and check uniqueness and ordering"""
+    from app.services.order_numbers import SnowflakeOrderNumberGenerator, UlidOrderNumberGenerator
+
+    results = {}
+    for name, generator in (
+        ("ulid", UlidOrderNumberGenerator(prefix="ORD", store_code="S1", till_code="T1")),
+        ("snowflake", SnowflakeOrderNumberGenerator(prefix="ORD", store_code="S1", till_code="T1", node_id=1)),
+    ):
+        seen = set()
+        previous = ""
+        collisions = out_of_order = 0
+        started = time.perf_counter()
+        for _ in range(count):
+            number = generator.generate()
+            if number in seen:
+                collisions += 1
+            seen.add(number)
+            if number <= previous:
+                out_of_order += 1
+            previous = number
+        results[name] = {
+            "generated": count,
+            "collisions": collisions,
+            "out_of_order": out_of_order,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        print(f"{name}: {results[name]}")
+        del seen
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./micro-benchmark.db")
+    parser.add_argument("--number", type=int, default=1000, help="operations per case")
+    parser.add_argument("--hash-number", type=int, default=20, help="operations for password hashing cases")
+    parser.add_argument("--basket-size", type=int, default=20)
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--order-number-collisions", type=int, metavar="N",
+                        help="generate N order numbers per strategy and check for collisions instead")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    args = parser.parse_args()
+
+    use_database(args.database_url)
+    if args.order_number_collisions:
+        collisions = check_order_number_collisions(args.order_number_collisions)
+        raise SystemExit(1 if any(result["collisions"] or result["out_of_order"] for result in collisions.values()) else 0)
+
+    migrate(args.database_url)
+    seed_args = argparse.Namespace(
+        categories=10, products=max(args.basket_size, 200), customers=50, orders=50, tills=1, seed=42
+    )
+    seeding.seed(seed_args)
+
+    cases: Dict[str, Any] = {}
+    print(f"{'case':<40}{'us/op':>12}{'ops/s':>14}{'peak bytes':>12}{'retained':>10}")
+    for name, func, number in build_cases(args):
+        if args.filter and args.filter not in name:
+            continue
+        cases[name] = measure(func, number)
+        result = cases[name]
+        print(f"{name:<40}{result['us_per_op']:>12}{result['ops_per_second']:>14}"
+              f"{result['peak_bytes']:>12}{result['retained_blocks']:>10}")
+
+    path = write_results({
+        "benchmark": "micro",
+        "environment": environment(),
+        "database": args.database_url.split("://")[0],
+        "cases": cases,
+    }, args.output, "micro")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Seed a realistic POS dataset for benchmarks.
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db --products 5000
+
+The database is migrated to the latest schema first. Rows are written with
+executemany inserts so a large order history seeds in seconds.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict
+import argparse
+import random
+import time
+from benchmarks.common import migrate, use_database
+
+PASSWORD = "benchmark-pass"
+STORE_ID = 1
+WORDS = (
+    "rice", "oil", "sugar", "milk", "bread", "soap", "tomato", "sardine", "tea", "coffee",
+    "flour", "salt", "pepper", "water", "juice", "biscuit", "noodles", "beans", "yam", "gari",
+)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000, help="historical orders")
+    parser.add_argument("--tills", type=int, default=8, help="cashier accounts till01..tillNN")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def barcode_for(product_index: int) -> str:
+    return f"600{product_index:010d}"
+
+
+def seed(args: argparse.Namespace) -> Dict[str, Any]:
+    """Create the dataset; returns its shape for the results file"""
+    from app.auth import get_password_hash
+    from app.database import engine
+    from app.models import (
+        ArchivedOrder, ArchivedOrderItem, Cart, CartItem, Category, Customer, Order, OrderItem, OutboxTask,
+        Product, Promotion, RevokedToken, StockReservation, StoreStock, User
+    )
+    from app.services.order_numbers import UlidOrderNumberGenerator
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+
+    with engine.begin() as conn:
+        for table in (
+            OutboxTask, Promotion, CartItem, Cart, StockReservation, ArchivedOrderItem, ArchivedOrder,
+            OrderItem, Order, StoreStock, Product, Category, Customer, RevokedToken, User
+        ):
+            conn.execute(table.__table__.delete())
+
+        password_hash = get_password_hash(PASSWORD)
+        conn.execute(User.__table__.insert(), [
+            {
+                "username": f"till{index:02d}",
+                "email": f"till{index:02d}@example.com",
+                "full_name": f"Till {index:02d}",
+                "hashed_password": password_hash,
+                "is_active": True,
+                "is_admin": index == 1,
+            }
+            for index in range(1, args.tills + 1)
+        ])
+
+        conn.execute(Category.__table__.insert(), [
+            {"id": index, "name": f"Category {index}"} for index in range(1, args.categories + 1)
+        ])
+
+        prices = {}
+        products = []
+        for index in range(1, args.products + 1):
+            price = Decimal(rng.randint(50, 50000)) / 100
+            prices[index] = price
+            products.append({
+                "id": index,
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {index}",
+                "description": f"{rng.choice(WORDS)} {rng.choice(WORDS)} pack",
+                "price": price,
+                "cost": (price * Decimal("0.7")).quantize(Decimal("0.01")),
+                "sku": f"SKU-{index:06d}",
+                "barcode": barcode_for(index),
+                "min_stock_level": 10,
+                "is_active": True,
+                "category_id": rng.randint(1, args.categories),
+            })
+        conn.execute(Product.__table__.insert(), products)
+        # Everything is stocked at the default store created by the migrations
+        conn.execute(StoreStock.__table__.insert(), [
+            {"store_id": STORE_ID, "product_id": index, "quantity": 1_000_000}
+            for index in range(1, args.products + 1)
+        ])
+
+        conn.execute(Customer.__table__.insert(), [
+            {
+                "id": index,
+                "name": f"Customer {index}",
+                "email": f"customer{index}@example.com",
+                "phone": f"0{rng.randint(200000000, 599999999)}",
+            }
+            for index in range(1, args.customers + 1)
+        ])
+
+        generator = UlidOrderNumberGenerator(prefix="HIST")
+        orders, items = [], []
+        item_id = 1
+        for order_id in range(1, args.orders + 1):
+            subtotal = Decimal(0)
+            for _ in range(rng.randint(1, 8)):
+                product_id = rng.randint(1, args.products)
+                quantity = rng.randint(1, 5)
+                total_price = prices[product_id] * quantity
+                subtotal += total_price
+                items.append({
+                    "id": item_id,
+                    "order_id": order_id,
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "unit_price": prices[product_id],
+                    "total_price": total_price,
+                })
+                item_id += 1
+            tax = (subtotal * Decimal("0.08")).quantize(Decimal("0.01"))
+            orders.append({
+                "id": order_id,
+                "order_number": generator.generate(),
+                "store_id": STORE_ID,
+                "customer_id": rng.randint(1, args.customers) if rng.random() < 0.4 else None,
+                "user_id": rng.randint(1, args.tills),
+                "subtotal": subtotal,
+                "tax_amount": tax,
+                "discount_amount": Decimal(0),
+                "total_amount": subtotal + tax,
+                "payment_method": rng.choice(("cash", "card", "mobile_money")),
+                "status": rng.choices(("completed", "cancelled", "pending"), (0.9, 0.07, 0.03))[0],
+                "created_at": now - timedelta(minutes=rng.randint(1, 365 * 24 * 60)),
+            })
+        for start in range(0, len(orders), 5000):
+            conn.execute(Order.__table__.insert(), orders[start:start + 5000])
+        for start in range(0, len(items), 5000):
+            conn.execute(OrderItem.__table__.insert(), items[start:start + 5000])
+
+    return {
+        "categories": args.categories,
+        "products": args.products,
+        "customers": args.customers,
+        "orders": args.orders,
+        "order_items": len(items),
+        "tills": args.tills,
+        "seed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    use_database(args.database_url)
+    migrate(args.database_url)
+    print(seed(args))
+
+
+if __name__ == "__main__":
+    main()
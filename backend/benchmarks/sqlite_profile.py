@@ -0,0 +1,130 @@
+"""Order throughput on SQLite with and without the tuning profile.
+
+    python -m benchmarks.sqlite_profile --threads 8 --orders 400
+
+Each profile runs in a fresh subprocess against its own database file (the
+journal mode is stored in the file, and settings are read at import). Worker
+threads create orders through OrderService with their own sessions, like
+concurrent tills, and the run reports orders per second, latency
+percentiles and how many orders failed with ``database is locked``.
+"""
+from typing import Any, Dict
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.common import BACKEND_DIR, environment, summarize, use_database, migrate, write_results
+
+PROFILES = {
+    "baseline": {"SQLITE_TUNING_ENABLED": "false"},
+    "tuned": {"SQLITE_TUNING_ENABLED": "true"},
+}
+
+
+def run_profile(args: argparse.Namespace) -> Dict[str, Any]:
+    """Body of one subprocess: seed, then hammer order creation from threads"""
+    use_database(args.database_url)
+    from benchmarks import seed as seeding
+
+    migrate(args.database_url)
+    seeding.seed(argparse.Namespace(
+        categories=10, products=args.products, customers=10, orders=args.history, tills=args.threads, seed=42
+    ))
+
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Store, User
+    from app.schemas import OrderCreate, OrderItemCreate
+    from app.services.order_service import OrderService
+
+    per_thread = args.orders // args.threads
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads + 1)
+
+    def till(index: int) -> None:
+        db = SessionLocal()
+        user = db.query(User).filter(User.username == f"till{index + 1:02d}").one()
+        store = db.get(Store, seeding.STORE_ID)
+        start.wait()
+        for number in range(per_thread):
+            order = OrderCreate(items=[
+                OrderItemCreate(product_id=(index * 7 + number * 3 + line) % args.products + 1, quantity=1, unit_price=0)
+                for line in range(3)
+            ])
+            started = time.perf_counter()
+            try:
+                OrderService.create_order_with_items(db, order, user, store)
+            except OperationalError as exc:
+                db.rollback()
+                with lock:
+                    errors.append(str(exc.orig))
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+        db.close()
+
+    threads = [threading.Thread(target=till, args=(index,)) for index in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - began
+
+    result = summarize(latencies, len(errors), duration)
+    result["orders_per_second"] = result.pop("throughput_rps")
+    result["locked_errors"] = sum("locked" in error for error in errors)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="concurrent tills")
+    parser.add_argument("--orders", type=int, default=400, help="orders per profile, split across threads")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--history", type=int, default=1000, help="historical orders seeded first")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args)))
+        return
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, env in PROFILES.items():
+            database_url = f"sqlite:///{os.path.join(directory, name + '.db')}"
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.sqlite_profile", "--child", "--database-url", database_url,
+                 "--threads", str(args.threads), "--orders", str(args.orders),
+                 "--products", str(args.products), "--history", str(args.history)],
+                cwd=BACKEND_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True
+            )
+            results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    print(f"{'profile':<10}{'orders/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'locked':>8}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['orders_per_second']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['locked_errors']:>8}")
+
+    path = write_results({
+        "benchmark": "sqlite_profile",
+        "environment": environment(),
+        "threads": args.threads,
+        "orders": args.orders,
+        "profiles": results,
+    }, args.output, "sqlite-profile")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
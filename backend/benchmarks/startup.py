@@ -0,0 +1,160 @@
+"""Cold start: time to import the app and to become ready, against a target.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --target-ms 1500
+    python -m benchmarks.startup --importtime --top 30
+
+Every run is a fresh interpreter against a small seeded database, like a
+till that has just booted. ``import`` is importing ``main``; ``ready`` adds
+the startup hooks (shared catalog, cache bus, warm-up) up to the point the
+first request would be served; ``process`` is the whole run as seen from
+outside, interpreter start and exit included. Exits with status 1 when the
+median ready time is over ``--target-ms``. ``--importtime`` instead prints
+the packages and modules that dominate ``python -X importtime``.
+"""
+from typing import Any, Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import BACKEND_DIR, environment, migrate, summarize, use_database, write_results
+
+# Median time to ready on a 1-CPU container; small ARM tills should stay
+# within twice this
+TARGET_MS = 1500
+
+
+def child() -> Dict[str, float]:
+    started = time.perf_counter()
+    from main import app
+
+    imported = time.perf_counter()
+
+    async def start() -> float:
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+
+    ready = asyncio.run(start())
+    return {"import_s": imported - started, "ready_s": ready - started}
+
+
+def prepare(directory: str, products: int) -> Dict[str, str]:
+    """Seed a database in ``directory`` and return the environment runs use"""
+    database_url = f"sqlite:///{os.path.join(directory, 'startup.db')}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "SHARED_CATALOG_PATH": os.path.join(directory, "catalog.mmap"),
+        "CACHE_BUS_PATH": os.path.join(directory, "cache-bus"),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--seed", "--database-url", database_url,
+         "--products", str(products)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Seeding failed:\n{completed.stderr}")
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for each line of ``-X importtime`` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def importtime_report(env: Dict[str, str], top: int) -> None:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = parse_importtime(completed.stderr)
+    total = sum(own for _, own, _ in rows)
+    by_package: Dict[str, int] = {}
+    for name, own, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + own
+
+    print(f"import main: {total / 1000:.1f} ms over {len(rows)} modules\n")
+    print(f"{'package':<40}{'ms':>10}{'share':>8}")
+    for package, own in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<40}{own / 1000:>10.1f}{own / total:>8.1%}")
+    print(f"\n{'module':<56}{'self ms':>10}{'cumulative ms':>15}")
+    for name, own, cumulative in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"{name:<56}{own / 1000:>10.1f}{cumulative / 1000:>15.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="allowed median time to ready")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--importtime", action="store_true", help="print an import time report and exit")
+    parser.add_argument("--top", type=int, default=20, help="rows in the import time report")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/)")
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        use_database(args.database_url)
+        from benchmarks import seed as seeding
+
+        migrate(args.database_url)
+        seeding.seed(argparse.Namespace(
+            categories=10, products=args.products, customers=10, orders=0, tills=1, seed=42
+        ))
+        return
+    if args.child:
+        print(json.dumps(child()))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = prepare(directory, args.products)
+        if args.importtime:
+            importtime_report(env, args.top)
+            return
+
+        timings: Dict[str, List[float]] = {"import": [], "ready": [], "process": []}
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--child"],
+                cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+            )
+            timings["process"].append(time.perf_counter() - started)
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            timings["import"].append(run["import_s"])
+            timings["ready"].append(run["ready_s"])
+
+    phases = {name: summarize(values, 0, 0) for name, values in timings.items()}
+    print(f"{'phase':<10}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, summary in phases.items():
+        print(f"{name:<10}{summary['count']:>6}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['max_ms']:>10}")
+    ready_ms = phases["ready"]["p50_ms"]
+    within = ready_ms <= args.target_ms
+    print(f"\nready p50 {ready_ms} ms, target {args.target_ms:g} ms: {'ok' if within else 'OVER TARGET'}")
+
+    path = write_results({
+        "benchmark": "startup",
+        "environment": environment(),
+        "target_ms": args.target_ms,
+        # Same shape as the load test, so benchmarks.compare can diff runs
+        "endpoints": phases,
+    }, args.output, "startup")
+    print(f"Results written to {path}")
+    sys.exit(0 if within else 1)
+
+
+if __name__ == "__main__":
+    main()
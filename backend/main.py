@@ -1,11 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
-from app.database import engine
+from app.database import SessionLocal, engine, replica_router
 from app.models import Base
-from app.routers import auth, products, orders, customers
+from app.routers import auth, products, orders, carts, customers, pricing, promotions, events, stores, health
 from app.config import settings
+from app.services.pricing_rules import get_pricing_rules
+from app.services.task_queue import task_queue
+from app.passwords import password_hasher
+from app.services.token_revocation import revocation_list
+from app.services.shared_catalog import start_shared_catalog, stop_shared_catalog
+from app.cache import share_events, start_cache, stop_cache
+from app.events import event_broker
+from app.health import readiness
+from app.deferred import import_deferred_in_background
 from app.exceptions import (
     POSException,
     pos_exception_handler,
@@ -23,6 +32,11 @@ app = FastAPI(
     version=settings.api_version
 )
 
+# Added before CORS so shed requests still carry CORS headers
+if settings.admission_control_enabled:
+    from app.admission import AdmissionMiddleware
+    app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +46,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    from app.metrics import MetricsMiddleware, collect_runtime_metrics, registry
+    app.add_middleware(MetricsMiddleware)
+    registry.register_collector(collect_runtime_metrics)
+
+    # Plain def: collectors such as the task queue depth query the database,
+    # so a scrape runs in the threadpool instead of on the event loop
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+if settings.slow_query_threshold_ms is not None or settings.query_profiling_enabled:
+    from app.profiling import QueryProfilerMiddleware
+    app.add_middleware(QueryProfilerMiddleware)
+
 # Add exception handlers
 app.add_exception_handler(POSException, pos_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -42,7 +71,83 @@ app.add_exception_handler(Exception, general_exception_handler)
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
+app.include_router(carts.router, prefix="/api/carts", tags=["Carts"])
 app.include_router(customers.router, prefix="/api/customers", tags=["Customers"])
+app.include_router(pricing.router, prefix="/api/pricing", tags=["Pricing"])
+app.include_router(promotions.router, prefix="/api/promotions", tags=["Promotions"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+app.include_router(stores.router, prefix="/api/stores", tags=["Stores"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+
+@app.on_event("startup")
+async def compile_pricing_rules():
+    # Compile tax and bulk pricing rules once so checkout never loads them
+    get_pricing_rules()
+
+@app.on_event("startup")
+async def open_shared_catalog():
+    # Workers share one memory-mapped copy of prices, stock and barcodes
+    start_shared_catalog(SessionLocal)
+
+@app.on_event("shutdown")
+async def close_shared_catalog():
+    stop_shared_catalog()
+
+@app.on_event("startup")
+async def start_cache_bus():
+    # Committed writes invalidate cached entries in every worker, and order
+    # and stock events reach dashboards connected to any worker
+    start_cache(SessionLocal)
+    share_events(event_broker)
+
+@app.on_event("shutdown")
+async def stop_cache_bus():
+    stop_cache()
+
+@app.on_event("startup")
+async def start_task_queue():
+    if settings.task_queue_enabled:
+        task_queue.start()
+
+@app.on_event("startup")
+async def start_replica_lag_checks():
+    # Requests read the last measured replica lag; this thread keeps it fresh
+    if replica_router is not None:
+        replica_router.start()
+
+@app.on_event("shutdown")
+async def stop_replica_lag_checks():
+    if replica_router is not None:
+        replica_router.stop()
+
+@app.on_event("startup")
+async def load_token_revocations():
+    # Revoked tokens are checked in memory; load them and keep them in sync
+    revocation_list.start()
+
+@app.on_event("startup")
+async def warm_up():
+    # Registered last so the catalog and cache it fills are already open;
+    # a failure leaves the worker not ready and /health/ready retries it
+    if settings.warmup_enabled:
+        readiness.warm_up(SessionLocal)
+
+@app.on_event("startup")
+async def load_deferred_modules():
+    # Token and hashing libraries load after startup instead of delaying it
+    import_deferred_in_background()
+
+@app.on_event("shutdown")
+async def stop_token_revocations():
+    revocation_list.stop()
+
+@app.on_event("shutdown")
+async def stop_task_queue():
+    task_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
 
 @app.get("/")
 async def root():
@@ -50,4 +155,5 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    # Kept for existing probes; see /health/live and /health/ready
     return {"status": "healthy"}
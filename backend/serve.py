@@ -0,0 +1,142 @@
+"""Production server: gunicorn master with preloaded uvicorn workers.
+
+    python serve.py
+    python serve.py --workers 4 --port 8001
+
+``run.py`` stays the development runner (single process, auto-reload).
+Here the app is imported once in the master and workers are forked from
+it, so they share its memory and start without importing anything. Each
+worker runs uvicorn on uvloop with httptools when they are installed. On
+SIGTERM the master stops accepting connections and gives in-flight
+requests ``SERVER_GRACEFUL_TIMEOUT_SECONDS`` to finish before workers are
+killed. Where gunicorn is not available (Windows) it falls back to
+uvicorn's own multi-process mode, without preloading.
+"""
+from importlib.util import find_spec
+import argparse
+import gc
+import logging
+import os
+from app.config import settings
+
+logger = logging.getLogger("serve")
+
+LOOP = "uvloop" if find_spec("uvloop") else "asyncio"
+HTTP = "httptools" if find_spec("httptools") else "h11"
+
+
+def default_workers() -> int:
+    # Handlers are async but run database calls on the event loop, so one
+    # worker per core keeps every core busy without oversubscribing
+    return max(1, os.cpu_count() or 1)
+
+
+def pre_fork(server, worker) -> None:
+    # Runs in the master: give the new worker the lowest index no live
+    # worker holds, so a restarted worker takes over its predecessor's
+    taken = {getattr(other, "index", None) for other in server.WORKERS.values()}
+    worker.index = next(index for index in range(len(taken) + 1) if index not in taken)
+
+
+def post_fork(server, worker) -> None:
+    # Connections must never be shared across processes; drop any the
+    # master opened while importing the app
+    from app import database
+    from app.services.order_numbers import set_worker_index
+
+    database.engine.dispose(close=False)
+    if database.replica_router is not None:
+        database.replica_router.engine.dispose(close=False)
+    # Snowflake order numbers need a node id per worker
+    set_worker_index(worker.index)
+
+
+def serve_gunicorn(args: argparse.Namespace) -> None:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class POSWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": LOOP, "http": HTTP}
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": POSWorker,
+                "preload_app": True,
+                "backlog": settings.server_backlog,
+                "keepalive": settings.server_keepalive_seconds,
+                "graceful_timeout": settings.server_graceful_timeout_seconds,
+                "timeout": settings.server_worker_timeout_seconds,
+                "pre_fork": pre_fork,
+                "post_fork": post_fork,
+                "accesslog": "-" if args.access_log else None,
+                "errorlog": "-",
+                "loglevel": args.log_level,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.deferred import import_deferred
+            from main import app
+
+            # Load what the app defers too, so workers share it instead of
+            # each importing it after the fork
+            import_deferred()
+
+            # Objects created while importing are never freed; keeping them
+            # out of the collector stops it from dirtying the shared pages
+            gc.collect()
+            gc.freeze()
+            return app
+
+    Application().run()
+
+
+def serve_uvicorn(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    if args.workers > 1 and settings.order_number_node_id is not None:
+        # uvicorn workers cannot be told apart, so they would share the node id
+        logger.warning(
+            "ORDER_NUMBER_NODE_ID is ignored with several uvicorn workers; snowflake "
+            "order numbers use each worker's process id instead"
+        )
+        from app.services.order_numbers import NODE_ID_FROM_PID_ENV
+
+        os.environ[NODE_ID_FROM_PID_ENV] = "1"
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=LOOP,
+        http=HTTP,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        access_log=args.access_log,
+        log_level=args.log_level,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers or default_workers())
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if find_spec("gunicorn") and os.name == "posix":
+        serve_gunicorn(args)
+    else:
+        logger.warning("gunicorn is not available; starting uvicorn workers without preloading")
+        serve_uvicorn(args)
+
+
+if __name__ == "__main__":
+    main()
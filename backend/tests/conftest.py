@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+# Settings are read when app.config is first imported, so the tests' database
+# is chosen here, before any test module imports the app
+TEST_DIRECTORY = tempfile.mkdtemp(prefix="pos-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIRECTORY, 'pos.db')}"
+os.environ["CACHE_BACKEND"] = "local"
+os.environ["SHARED_CATALOG_PATH"] = os.path.join(TEST_DIRECTORY, "catalog.mmap")
+
+import pytest  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The test database, migrated to head once per run"""
+    from alembic import command
+    from alembic.config import Config
+    from app.config import settings
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(backend, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend, "alembic"))
+    config.set_main_option("sqlalchemy.url", settings.database_url)
+    command.upgrade(config, "head")
+    return settings.database_url
+
+
+@pytest.fixture
+def db(database):
+    """A session on the test database, emptied afterwards down to the default store"""
+    from app import models  # noqa: F401  registers the tables on Base
+    from app.cache import cache
+    from app.config import settings
+    from app.database import Base, SessionLocal, engine
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            statement = delete(table)
+            if table.name == "stores":
+                # Created by the migrations
+                statement = statement.where(table.c.id != settings.default_store_id)
+            conn.execute(statement)
+    cache.clear()
+
+
+@pytest.fixture
+def store(db):
+    from app.config import settings
+    from app.models import Store
+
+    return db.get(Store, settings.default_store_id)
+
+
+@pytest.fixture
+def user(db, store):
+    from app.models import User
+
+    user = User(username="till", email="till@example.com", hashed_password="-", store_id=store.id)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def make_product(db, store):
+    """Create an active product with ``stock`` on hand at the default store"""
+    from app.models import Product
+    from app.services.stock import set_stock
+
+    def make(name: str, price: float, stock: int = 100, category_id=None) -> Product:
+        product = Product(name=name, price=price, category_id=category_id, is_active=True)
+        db.add(product)
+        db.flush()
+        set_stock(db, store.id, product.id, stock)
+        db.commit()
+        return product
+
+    return make
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from app.admission import (
+    ADMISSION_CLASS,
+    ADMISSION_CONTROLLER,
+    BACKGROUND,
+    CRITICAL,
+    NORMAL,
+    AdmissionController,
+    AdmissionMiddleware,
+    ClassLimits,
+    classify,
+    move_to_background,
+)
+
+
+def scope(method: str, path: str, query: str = "") -> dict:
+    return {"type": "http", "method": method, "path": path, "query_string": query.encode(), "headers": []}
+
+
+def controller(total: int = 1, queue_seconds=None, queue_size: int = 10, background_limit: int = 1):
+    return AdmissionController(total, {
+        CRITICAL: ClassLimits(total, None, queue_size),
+        NORMAL: ClassLimits(total, queue_seconds, queue_size),
+        BACKGROUND: ClassLimits(background_limit, queue_seconds, queue_size),
+    })
+
+
+@pytest.mark.parametrize("method, path, query, expected", [
+    ("POST", "/api/orders/", "", CRITICAL),
+    ("GET", "/api/products/barcode/6001", "", CRITICAL),
+    ("GET", "/api/orders/", "", BACKGROUND),
+    ("GET", "/api/stores/2/low-stock", "", BACKGROUND),
+    ("GET", "/api/products/", "limit=500", BACKGROUND),
+    ("GET", "/api/products/", "limit=50", NORMAL),
+    ("GET", "/api/products/", "limit=lots", NORMAL),
+    ("GET", "/api/orders/12", "", NORMAL),
+    ("GET", "/api/events/stream", "", None),
+    ("GET", "/health/ready", "", None),
+])
+def test_classify(method, path, query, expected):
+    assert classify(scope(method, path, query)) == expected
+
+
+def test_freed_slots_go_to_the_highest_class_first():
+    async def run():
+        gate = controller(total=1)
+        assert await gate.acquire(NORMAL)
+        order = []
+
+        async def wait(name):
+            assert await gate.acquire(name)
+            order.append(name)
+            gate.release(name)
+
+        waiters = [asyncio.ensure_future(wait(name)) for name in (BACKGROUND, NORMAL, CRITICAL)]
+        await asyncio.sleep(0)
+        gate.release(NORMAL)
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(run()) == [CRITICAL, NORMAL, BACKGROUND]
+
+
+def test_requests_past_their_queue_budget_are_shed():
+    async def run():
+        gate = controller(total=1, queue_seconds=0.01)
+        assert await gate.acquire(CRITICAL)
+        shed = not await gate.acquire(NORMAL)
+        return shed, gate.rejected[NORMAL], gate.waiting(NORMAL)
+
+    assert asyncio.run(run()) == (True, 1, 0)
+
+
+def test_full_queues_shed_at_once():
+    async def run():
+        gate = controller(total=1, queue_size=1)
+        assert await gate.acquire(NORMAL)
+        queued = asyncio.ensure_future(gate.acquire(NORMAL))
+        await asyncio.sleep(0)
+        shed = not await gate.acquire(NORMAL)
+        gate.release(NORMAL)
+        return shed, await queued
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_background_is_shed_while_critical_requests_wait():
+    async def run():
+        gate = controller(total=1)
+        assert await gate.acquire(NORMAL)
+        critical = asyncio.ensure_future(gate.acquire(CRITICAL))
+        await asyncio.sleep(0)
+        shed = not await gate.acquire(BACKGROUND)
+        gate.release(NORMAL)
+        return shed, await critical
+
+    assert asyncio.run(run()) == (True, True)
+
+
+async def call(app, request_scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(request_scope, receive, send)
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    return start["status"], dict((key.decode(), value.decode()) for key, value in start["headers"])
+
+
+def test_shed_requests_get_503_with_retry_after():
+    async def run():
+        gate = controller(total=1, background_limit=0, queue_seconds=0.01)
+        app = AdmissionMiddleware(PlainTextResponse("ok"), gate)
+        status, headers = await call(app, scope("GET", "/api/orders/"))
+        ok_status, _ = await call(app, scope("POST", "/api/orders/"))
+        return status, headers.get("retry-after"), ok_status, gate.in_flight
+
+    assert asyncio.run(run()) == (503, "5", 200, 0)
+
+
+def test_handlers_can_move_to_the_background_class():
+    async def run():
+        gate = controller(total=2)
+        held = []
+
+        async def handler(request_scope, receive, send):
+            request = Request(request_scope)
+            await move_to_background(request)
+            held.append((request_scope["state"][ADMISSION_CLASS], dict(gate.running)))
+            await PlainTextResponse("ok")(request_scope, receive, send)
+
+        status, _ = await call(AdmissionMiddleware(handler, gate), scope("GET", "/api/orders/12"))
+        return status, held, gate.in_flight
+
+    status, held, in_flight = asyncio.run(run())
+    assert status == 200
+    assert held == [(BACKGROUND, {CRITICAL: 0, NORMAL: 0, BACKGROUND: 1})]
+    assert in_flight == 0
+
+
+def test_moving_to_a_full_background_class_is_shed():
+    async def run():
+        gate = controller(total=2, background_limit=0, queue_seconds=0.01)
+        request_scope = scope("GET", "/api/orders/12")
+        request_scope["state"] = {}
+        assert await gate.acquire(NORMAL)
+        request_scope["state"].update({ADMISSION_CLASS: NORMAL, ADMISSION_CONTROLLER: gate})
+        with pytest.raises(HTTPException) as raised:
+            await move_to_background(Request(request_scope))
+        return raised.value, gate.in_flight, request_scope["state"][ADMISSION_CLASS]
+
+    error, in_flight, held = asyncio.run(run())
+    assert error.status_code == 503 and error.headers["Retry-After"] == "5"
+    assert (in_flight, held) == (0, None)
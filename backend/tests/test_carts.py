@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+import json
+import pytest
+from sqlalchemy import text
+from app.models import ArchivedOrder, Cart, Category, Order, Product, Promotion
+from app.money import to_minor
+from app.schemas import CartCheckout, CartCreate
+from app.services import carts as carts_module
+from app.services.archive import archive_orders
+from app.services.carts import CartService
+from app.services.order_service import OrderService
+from app.services.pricing_rules import PricingRules
+from app.services.promotions import get_promotion_index
+from app.services.totals import BasketLine, compute_order_totals
+
+
+@pytest.fixture
+def basket(db, make_product, monkeypatch):
+    """Products with a reduced tax category, a bulk tier and a promotion"""
+    reduced = Category(name="Staples")
+    db.add(reduced)
+    db.commit()
+    rice = make_product("Rice", 19.99, category_id=reduced.id)
+    oil = make_product("Oil", 7.45)
+    soap = make_product("Soap", 0.35)
+    db.add(Promotion(name="3 for 2", promotion_type="buy_x_get_y", product_id=oil.id, buy_quantity=2, get_quantity=1))
+    db.commit()
+    rules = PricingRules({
+        "taxes": [
+            {"code": "NHIL", "rate": 0.025},
+            {"code": "VAT", "rate": 0.15, "compound": True},
+        ],
+        "categories": {str(reduced.id): {"taxes": [{"code": "VAT", "rate": 0.03}]}},
+        "bulk_pricing": [{"product_id": soap.id, "min_quantity": 12, "percent_off": 10}],
+    })
+    monkeypatch.setattr(carts_module, "get_pricing_rules", lambda: rules)
+    return rules, {"rice": rice, "oil": oil, "soap": soap}
+
+
+def assert_matches_full_reprice(db, cart, rules):
+    db.refresh(cart)
+    lines = [
+        BasketLine(
+            product_id=item.product_id,
+            category_id=item.category_id,
+            quantity=item.quantity,
+            # Checkout prices lines without a manual price from the product afresh
+            unit_price=to_minor(item.unit_price if item.manual_price else db.get(Product, item.product_id).price),
+            manual_price=item.manual_price,
+        )
+        for item in cart.items
+    ]
+    totals = compute_order_totals(
+        lines, discount=to_minor(cart.discount_amount), rules=rules, promotions=get_promotion_index(db)
+    )
+    assert to_minor(cart.subtotal) == totals.subtotal
+    assert to_minor(cart.promotion_discount) == totals.promotion_discount
+    assert to_minor(cart.tax_amount) == totals.tax_amount
+    assert to_minor(cart.total_amount) == totals.total_amount
+
+
+def test_running_totals_match_a_full_reprice(db, user, store, basket):
+    rules, products = basket
+    cart = CartService.create_cart(db, CartCreate(discount_amount=1.25), user, store)
+
+    CartService.set_line(db, cart, products["rice"].id, 3, add=True)
+    assert_matches_full_reprice(db, cart, rules)
+    CartService.set_line(db, cart, products["oil"].id, 2, add=True)
+    CartService.set_line(db, cart, products["oil"].id, 1, add=True)
+    assert_matches_full_reprice(db, cart, rules)
+    CartService.set_line(db, cart, products["soap"].id, 12, add=True)
+    assert_matches_full_reprice(db, cart, rules)
+
+    CartService.set_line(db, cart, products["soap"].id, 5)
+    CartService.set_line(db, cart, products["rice"].id, 1, unit_price=15.00)
+    assert_matches_full_reprice(db, cart, rules)
+
+    CartService.set_line(db, cart, products["oil"].id, 0)
+    assert_matches_full_reprice(db, cart, rules)
+    CartService.set_line(db, cart, products["rice"].id, 0)
+    CartService.set_line(db, cart, products["soap"].id, 0)
+    db.refresh(cart)
+    assert cart.items == []
+    assert json.loads(cart.tax_bases) == {}
+    assert to_minor(cart.subtotal) == 0
+    assert to_minor(cart.total_amount) == -125
+
+
+def test_archiving_a_checked_out_order_keeps_the_cart(db, user, store, basket):
+    _, products = basket
+    assert db.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    cart = CartService.create_cart(db, CartCreate(), user, store)
+    CartService.set_line(db, cart, products["rice"].id, 2, add=True)
+    order = CartService.checkout(db, cart, CartCheckout(payment_method="cash"), user, store)
+    OrderService.complete_order(db, order)
+    order.created_at = datetime.now(timezone.utc) - timedelta(days=400)
+    db.commit()
+    order_id = order.id
+
+    assert archive_orders(db, datetime.now(timezone.utc), batch_size=10) == 1
+
+    db.expire_all()
+    assert db.get(Order, order_id) is None
+    assert db.query(ArchivedOrder).filter(ArchivedOrder.id == order_id).count() == 1
+    cart = db.get(Cart, cart.id)
+    assert cart.status == "checked_out"
+    assert cart.order_id is None
+    assert len(cart.items) == 1
@@ -0,0 +1,57 @@
+import pytest
+from app import database
+from app.cache import cache, track_writes
+from app.crud.crud_customer import customer as customer_crud
+from app.crud.crud_product import category as category_crud
+from app.database import SessionLocal
+from app.models import Category, Customer
+
+
+@pytest.fixture
+def hook_calls(db, monkeypatch):
+    """(written, deleted) handed to the bulk write hooks, one pair per call"""
+    calls = []
+    monkeypatch.setattr(
+        database, "bulk_write_listeners", [lambda session, written, deleted: calls.append((written, deleted))]
+    )
+    return calls
+
+
+def test_returning_writes_reach_the_hooks(db, hook_calls):
+    assert db.get_bind().dialect.insert_returning
+    created = customer_crud.create(db, obj_in={"name": "Ama", "email": "ama@example.com"}, returning=True)
+    assert hook_calls == [([created], [])]
+    assert isinstance(created, Customer) and created.id is not None
+
+    updated = customer_crud.update(db, db_obj=created, obj_in={"phone": "0244"}, returning=True)
+    assert hook_calls[1] == ([updated], [])
+    assert updated.phone == "0244"
+
+
+def test_bulk_writes_reach_the_hooks(db, hook_calls):
+    categories = category_crud.create_many(db, objs_in=[{"name": "Food"}, {"name": "Soap"}])
+    assert hook_calls == [(categories, [])]
+
+    category_crud.update_many(db, objs_in=[{"id": category.id, "description": "Aisle 3"} for category in categories])
+    written, deleted = hook_calls[1]
+    # Whole rows, as the hooks need them, not just the changed fields
+    assert [(category.name, category.description) for category in written] == [("Food", "Aisle 3"), ("Soap", "Aisle 3")]
+    assert deleted == []
+
+    ids = [category.id for category in categories]
+    assert category_crud.remove_many(db, ids=ids) == 2
+    written, deleted = hook_calls[2]
+    assert written == [] and sorted(category.id for category in deleted) == ids
+    assert db.query(Category).count() == 0
+
+
+def test_bulk_writes_invalidate_the_cache(db):
+    track_writes(SessionLocal)
+    cache.set("categories", (0, 100), ["Food"], tags=("categories",))
+    category_crud.create_many(db, objs_in=[{"name": "Soap"}])
+    assert cache.get("categories", (0, 100)) is None
+
+    customer = customer_crud.create(db, obj_in={"name": "Kofi"}, returning=True)
+    cache.set("customers", customer.id, "Kofi", tags=(f"customer:{customer.id}",))
+    customer_crud.update(db, db_obj=customer, obj_in={"name": "Kofi A."}, returning=True)
+    assert cache.get("customers", customer.id) is None
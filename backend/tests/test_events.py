@@ -0,0 +1,44 @@
+import asyncio
+import json
+import pytest
+from fastapi import HTTPException
+from app.auth import ACCESS_TOKEN, create_access_token, create_stream_token, get_stream_grant
+from app.events import EventBroker
+
+
+def received(subscriber):
+    frames = []
+    while not subscriber.queue.empty():
+        frame = subscriber.queue.get_nowait().decode()
+        frames.append(json.loads(frame.split("data: ", 1)[1]))
+    return frames
+
+
+def test_subscribers_only_get_their_store():
+    async def run():
+        broker = EventBroker()
+        main, branch, everything = broker.subscribe(1), broker.subscribe(2), broker.subscribe()
+        broker.publish("order.created", {"id": 1, "store_id": 1})
+        broker.publish("stock.changed", {"product_id": 5, "store_id": 2})
+        broker.publish("product.deactivated", {"product_id": 5})
+        await asyncio.sleep(0)
+        return received(main), received(branch), received(everything)
+
+    main, branch, everything = asyncio.run(run())
+    assert main == [{"id": 1, "store_id": 1}, {"product_id": 5}]
+    assert branch == [{"product_id": 5, "store_id": 2}, {"product_id": 5}]
+    assert len(everything) == 3
+
+
+def test_stream_token_carries_the_store(user):
+    found, store_id = asyncio.run(get_stream_grant(create_stream_token(user.username, 2)))
+    assert found.id == user.id
+    assert store_id == 2
+    assert asyncio.run(get_stream_grant(create_stream_token(user.username, None)))[1] is None
+
+
+def test_access_tokens_cannot_open_streams(user):
+    token = create_access_token({"sub": user.username, "typ": ACCESS_TOKEN})
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(get_stream_grant(token))
+    assert raised.value.status_code == 401
@@ -0,0 +1,85 @@
+import pytest
+from app.services import order_numbers
+from app.services.order_numbers import (
+    SnowflakeOrderNumberGenerator,
+    UlidOrderNumberGenerator,
+    set_worker_index,
+    snowflake_node_id,
+)
+
+STRATEGIES = {
+    "ulid": lambda: UlidOrderNumberGenerator(prefix="ORD", store_code="S1", till_code="T1"),
+    "snowflake": lambda: SnowflakeOrderNumberGenerator(prefix="ORD", store_code="S1", till_code="T1", node_id=1),
+}
+
+
+@pytest.fixture
+def worker_index():
+    yield set_worker_index
+    set_worker_index(None)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_ten_million_ids_are_unique_and_ordered(strategy):
+    # Strictly increasing ids cannot repeat, so no set of 10M ids is needed
+    generator = STRATEGIES[strategy]()
+    previous = generator.generate()
+    out_of_order = 0
+    for _ in range(10_000_000 - 1):
+        number = generator.generate()
+        if number <= previous:
+            out_of_order += 1
+        previous = number
+    assert out_of_order == 0
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_ids_stay_ordered_within_one_millisecond(strategy, monkeypatch):
+    generator = STRATEGIES[strategy]()
+    monkeypatch.setattr(order_numbers.time, "time_ns", lambda: 1_760_000_000_000_000_000)
+    numbers = [generator.generate() for _ in range(10_000)]
+    assert numbers == sorted(numbers)
+    assert len(set(numbers)) == len(numbers)
+
+
+def test_snowflake_sequence_overflow_keeps_node_id(monkeypatch):
+    generator = SnowflakeOrderNumberGenerator(node_id=7)
+    monkeypatch.setattr(order_numbers.time, "time_ns", lambda: 1_760_000_000_000_000_000)
+    shift = SnowflakeOrderNumberGenerator.SEQUENCE_BITS
+    mask = (1 << SnowflakeOrderNumberGenerator.NODE_BITS) - 1
+    values = [int(generator.next_id()) for _ in range(3 * (1 << shift))]
+    assert all((value >> shift) & mask == 7 for value in values)
+    assert values == sorted(set(values))
+
+
+def test_snowflake_nodes_never_collide():
+    first = SnowflakeOrderNumberGenerator(node_id=1)
+    second = SnowflakeOrderNumberGenerator(node_id=2)
+    numbers = set()
+    for _ in range(100_000):
+        numbers.add(first.next_id())
+        numbers.add(second.next_id())
+    assert len(numbers) == 200_000
+
+
+def test_workers_get_distinct_node_ids(worker_index, monkeypatch):
+    monkeypatch.setattr(order_numbers.settings, "order_number_node_id", 40)
+    node_ids = []
+    for index in range(4):
+        worker_index(index)
+        node_ids.append(snowflake_node_id())
+    assert node_ids == [40, 41, 42, 43]
+
+
+def test_node_id_defaults_to_process_id(worker_index, monkeypatch):
+    monkeypatch.setattr(order_numbers.settings, "order_number_node_id", None)
+    worker_index(3)
+    assert snowflake_node_id() is None
+    generator = SnowflakeOrderNumberGenerator(node_id=snowflake_node_id())
+    assert generator.node_id == order_numbers.os.getpid() & 1023
+
+
+def test_base_generator_is_abstract():
+    with pytest.raises(TypeError):
+        order_numbers.OrderNumberGenerator()
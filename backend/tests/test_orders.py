@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException
+from app.cache import cache
+from app.models import Promotion
+from app.money import to_minor
+from app.schemas import OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+
+
+@pytest.fixture
+def promoted_order(db, user, store, make_product):
+    """A pending order for 3 of a product on a 3-for-2 promotion"""
+    oil = make_product("Oil", 7.45)
+    promotion = Promotion(
+        name="3 for 2", promotion_type="buy_x_get_y", product_id=oil.id, buy_quantity=2, get_quantity=1
+    )
+    db.add(promotion)
+    db.commit()
+    order = OrderService.create_order_with_items(
+        db, OrderCreate(items=[OrderItemCreate(product_id=oil.id, quantity=3, unit_price=0)]), user, store
+    )
+    return order, promotion
+
+
+def test_discount_edit_keeps_an_expired_promotion(db, promoted_order):
+    order, promotion = promoted_order
+    promotion_discount, tax_amount = order.promotion_discount, order.tax_amount
+    assert to_minor(promotion_discount) == 745
+
+    promotion.ends_at = datetime.now(timezone.utc) - timedelta(days=1)
+    db.commit()
+    cache.clear()
+
+    OrderService.apply_manual_discount(order, Decimal("2.50"))
+    db.commit()
+    db.refresh(order)
+
+    assert order.promotion_discount == promotion_discount
+    assert order.tax_amount == tax_amount
+    assert to_minor(order.discount_amount) == 745 + 250
+    assert to_minor(order.total_amount) == to_minor(order.subtotal) + to_minor(tax_amount) - 745 - 250
+
+
+def test_discount_cannot_make_the_total_negative(db, promoted_order):
+    order, _ = promoted_order
+    total_amount = order.total_amount
+    with pytest.raises(HTTPException) as raised:
+        OrderService.apply_manual_discount(order, total_amount + Decimal("0.01"))
+    assert raised.value.status_code == 400
+    assert order.total_amount == total_amount
@@ -0,0 +1,76 @@
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app import database
+from app.config import settings
+from app.database import ReplicaRouter
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A reachable SQLite "replica" wired in as the app's read replica"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(engine)
+    monkeypatch.setattr(database, "replica_router", router)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=engine))
+    yield router
+    router.stop()
+    engine.dispose()
+
+
+def request(token: str = "Bearer till") -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", token.encode())], "client": ("10.0.0.1", 0)})
+
+
+def read_bind(client_request: Request):
+    sessions = database.get_read_db(client_request)
+    session = next(sessions)
+    try:
+        return session.get_bind()
+    finally:
+        sessions.close()
+
+
+def test_reads_go_to_a_replica_that_keeps_up(replica):
+    assert replica.measure_lag() == 0.0
+    assert read_bind(request()) is replica.engine
+
+
+def test_lagging_replica_falls_back_to_primary(replica):
+    replica._measurement = (settings.read_replica_max_lag_seconds + 1, time.monotonic())
+    assert read_bind(request()) is database.engine
+
+
+def test_unmeasured_or_stale_lag_falls_back_to_primary(replica):
+    assert replica.lag() is None
+    stale = time.monotonic() - 4 * settings.read_replica_lag_check_seconds
+    replica._measurement = (0.0, stale)
+    assert read_bind(request()) is database.engine
+
+
+def test_unreachable_replica_falls_back_to_primary(tmp_path):
+    router = ReplicaRouter(create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+    assert router.measure_lag() is None
+    assert not router.use_replica("Bearer till")
+
+
+def test_writer_reads_its_own_writes_from_primary(replica):
+    replica.measure_lag()
+    replica.record_write("Bearer till")
+    assert read_bind(request()) is database.engine
+    assert read_bind(request("Bearer other")) is replica.engine
+
+
+def test_lag_is_measured_in_the_background(replica, monkeypatch):
+    monkeypatch.setattr(settings, "read_replica_lag_check_seconds", 0.01)
+    checks = []
+    measure = replica.measure_lag
+    monkeypatch.setattr(replica, "measure_lag", lambda: checks.append(1) or measure())
+    replica.start()
+    deadline = time.monotonic() + 5
+    while len(checks) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(checks) >= 3
+    assert replica.lag() == 0.0
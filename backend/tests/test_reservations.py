@@ -0,0 +1,93 @@
+from datetime import timedelta
+from app.models import Order, StockReservation, StoreStock
+from app.schemas import OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+from app.services.reservations import release_expired_reservations
+from app.services.stock import set_stock, stock_levels
+from app.services.task_queue import utcnow
+
+
+def place(db, user, store, *lines):
+    order_data = OrderCreate(items=[
+        OrderItemCreate(product_id=product.id, quantity=quantity, unit_price=0) for product, quantity in lines
+    ])
+    return OrderService.create_order_with_items(db, order_data, user, store)
+
+
+def stock_row(db, store, product):
+    db.expire_all()
+    row = db.get(StoreStock, (store.id, product.id))
+    return row.quantity, row.reserved
+
+
+def test_pending_orders_hold_stock_without_taking_it(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    place(db, user, store, (rice, 3), (rice, 1))
+    assert stock_row(db, store, rice) == (10, 4)
+    assert stock_levels(db, store.id, [rice.id]) == {rice.id: 6}
+
+
+def test_completing_an_order_consumes_its_reservation(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    order = place(db, user, store, (rice, 3))
+    OrderService.complete_order(db, order)
+    assert stock_row(db, store, rice) == (7, 0)
+    assert db.query(StockReservation).count() == 0
+    # A later sweep has nothing of this order to give back
+    assert release_expired_reservations(db, now=utcnow() + timedelta(days=1)) == 0
+    assert stock_row(db, store, rice) == (7, 0)
+
+
+def test_cancelling_an_order_returns_its_stock(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    order = place(db, user, store, (rice, 3))
+    OrderService.cancel_order(db, order)
+    assert stock_row(db, store, rice) == (10, 0)
+    assert db.query(StockReservation).count() == 0
+
+
+def test_sweeper_cancels_expired_orders_and_releases_their_stock(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    oil = make_product("Oil", 7.45, stock=5)
+    expired = place(db, user, store, (rice, 3), (oil, 2))
+    fresh = place(db, user, store, (rice, 1))
+    db.query(StockReservation).filter(StockReservation.order_id == expired.id).update(
+        {StockReservation.expires_at: utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    assert release_expired_reservations(db, batch_size=1) == 1
+
+    db.expire_all()
+    assert db.get(Order, expired.id).status == "cancelled"
+    assert db.get(Order, fresh.id).status == "pending"
+    assert stock_row(db, store, rice) == (10, 1)
+    assert stock_row(db, store, oil) == (5, 0)
+    assert [reservation.order_id for reservation in db.query(StockReservation)] == [fresh.id]
+
+
+def test_sweeper_skips_orders_finished_meanwhile(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    order = place(db, user, store, (rice, 3))
+    OrderService.complete_order(db, order)
+    # A hold left behind on a finished order is dropped, not given back again
+    db.add(StockReservation(
+        order_id=order.id, store_id=store.id, product_id=rice.id, quantity=3,
+        expires_at=utcnow() - timedelta(seconds=1)
+    ))
+    db.commit()
+
+    assert release_expired_reservations(db) == 0
+    db.expire_all()
+    assert db.get(Order, order.id).status == "completed"
+    assert stock_row(db, store, rice) == (7, 0)
+    assert db.query(StockReservation).count() == 0
+
+
+def test_setting_stock_keeps_reserved_units_on_hand(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    place(db, user, store, (rice, 4))
+    set_stock(db, store.id, rice.id, 20)
+    db.commit()
+    assert stock_row(db, store, rice) == (24, 4)
+    assert stock_levels(db, store.id, [rice.id]) == {rice.id: 20}
@@ -0,0 +1,111 @@
+import threading
+import pytest
+from app.money import to_minor
+from app.services import shared_catalog as shared_catalog_module
+from app.services.shared_catalog import SharedCatalog
+
+
+@pytest.fixture
+def catalog(db, store, tmp_path):
+    """A catalog of its own, mapped from a file under ``tmp_path``"""
+    catalog = SharedCatalog(str(tmp_path / "catalog.mmap"), 1000, store.id)
+    catalog.open()
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def rice(db, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    rice.barcode = "6001"
+    db.commit()
+    return rice
+
+
+def test_rebuild_loads_prices_stock_and_barcodes(db, store, catalog, rice):
+    assert catalog.get(rice.id) is None  # nothing until the first rebuild
+    assert catalog.rebuild(db) == 1
+    entry = catalog.get(rice.id)
+    assert (entry.price, entry.stock, entry.is_active) == (to_minor(rice.price), 10, True)
+    assert catalog.find_barcode("6001") == rice.id
+    assert catalog.find_barcode("6002") is None
+    assert catalog.stock_levels(store.id, [rice.id]) == {rice.id: 10}
+    assert catalog.stock_levels(store.id, [rice.id, 999]) is None
+    assert catalog.version % 2 == 0
+
+
+def test_reads_give_up_while_a_write_is_in_progress(db, catalog, rice):
+    catalog.rebuild(db)
+    version = catalog._begin()
+    # The caller goes to the database rather than read a half-written row
+    assert catalog.get(rice.id) is None
+    catalog._end(version)
+    assert catalog.get(rice.id).stock == 10
+
+
+def test_reads_retry_until_the_writer_finishes(db, catalog, rice, monkeypatch):
+    catalog.rebuild(db)
+    version = catalog._begin()
+    waits = []
+
+    def sleep(seconds):
+        # The writer finishes while the reader waits a third time
+        waits.append(seconds)
+        if len(waits) == 3:
+            catalog._end(version)
+
+    monkeypatch.setattr(shared_catalog_module.time, "sleep", sleep)
+    assert catalog.get(rice.id).stock == 10
+    assert len(waits) == 3
+
+
+def test_reads_retry_when_a_write_lands_mid_read(db, catalog, rice):
+    catalog.rebuild(db)
+    reads = []
+
+    def reader(buffer):
+        reads.append(catalog._entry(buffer, rice.id).stock)
+        if len(reads) == 1:
+            # A whole write between the reader's two version checks
+            catalog.apply(stock=[(rice.id, 4)])
+        return reads[-1]
+
+    assert catalog._read(reader) == 4
+    assert reads == [10, 4]
+
+
+def test_reads_never_see_a_torn_row(db, catalog, rice):
+    catalog.rebuild(db)
+    catalog.apply(stock=[(rice.id, 0)])
+    price = to_minor(rice.price)
+    done = threading.Event()
+
+    def write():
+        # Stock follows the price one write later, so a reader sees them equal or one step apart
+        for step in range(1, 2000):
+            catalog.apply(products=[(rice.id, {"price": price + step, "barcode": "6001", "is_active": True})])
+            catalog.apply(stock=[(rice.id, step)])
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    seen = 0
+    while not done.is_set():
+        entry = catalog.get(rice.id)
+        if entry is not None:
+            assert entry.price - price - entry.stock in (0, 1)
+            seen += 1
+    writer.join()
+    assert seen > 0
+    assert catalog.get(rice.id).stock == 1999
+
+
+def test_reopening_for_another_store_starts_empty(db, catalog, rice):
+    catalog.rebuild(db)
+    catalog.close()
+    other = SharedCatalog(catalog.path, catalog.capacity, catalog.store_id + 1)
+    other.open()
+    try:
+        assert not other.loaded and other.get(rice.id) is None
+    finally:
+        other.close()
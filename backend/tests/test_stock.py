@@ -0,0 +1,30 @@
+import pytest
+from pydantic import ValidationError
+from app.models import Store
+from app.schemas import OrderCreate, OrderItemCreate, Product as ProductSchema
+from app.services.order_service import OrderService
+from app.services.stock import set_stock, with_stock
+
+
+def test_product_responses_carry_the_stores_available_stock(db, user, store, make_product):
+    rice = make_product("Rice", 19.99, stock=10)
+    branch = Store(code="BR1", name="Branch", is_active=True)
+    db.add(branch)
+    db.flush()
+    set_stock(db, branch.id, rice.id, 4)
+    db.commit()
+    OrderService.create_order_with_items(
+        db, OrderCreate(items=[OrderItemCreate(product_id=rice.id, quantity=3, unit_price=0)]), user, store
+    )
+
+    [main] = with_stock(db, store.id, [rice])
+    [other] = with_stock(db, branch.id, [rice])
+    assert isinstance(main, ProductSchema)
+    assert (main.id, main.name, main.stock_quantity) == (rice.id, "Rice", 7)
+    assert other.stock_quantity == 4
+
+
+def test_product_response_needs_stock(db, make_product):
+    rice = make_product("Rice", 19.99)
+    with pytest.raises(ValidationError):
+        ProductSchema.model_validate(rice)
@@ -0,0 +1,152 @@
+from decimal import Decimal, ROUND_HALF_UP
+import random
+import pytest
+from app.money import from_minor, to_minor
+from app.services.pricing_rules import PricingRules
+from app.services.totals import BasketLine, compute_order_totals
+
+CENT = Decimal("0.01")
+
+GHANA_TAXES = [
+    {"code": "NHIL", "rate": 0.025},
+    {"code": "GETFUND", "rate": 0.025},
+    {"code": "COVID", "rate": 0.01},
+    {"code": "VAT", "rate": 0.15, "compound": True},
+]
+EXEMPT_CATEGORY = 4
+REDUCED_CATEGORY = 5
+RULES = {
+    "taxes": GHANA_TAXES,
+    "categories": {
+        str(EXEMPT_CATEGORY): {"taxes": []},
+        str(REDUCED_CATEGORY): {"taxes": [{"code": "VAT", "rate": 0.03}]},
+    },
+}
+
+
+def cents(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def reference_totals(definition, lines, discount: Decimal):
+    """Straightforward Decimal version: tax rounded once per component per tax profile"""
+    subtotal = Decimal(0)
+    bases = {}
+    for category_id, quantity, unit_price in lines:
+        line_total = unit_price * quantity
+        subtotal += line_total
+        profile = str(category_id) if str(category_id) in definition.get("categories", {}) else None
+        bases[profile] = bases.get(profile, Decimal(0)) + line_total
+
+    taxes = {}
+    for profile, base in bases.items():
+        components = definition["categories"][profile]["taxes"] if profile else definition["taxes"]
+        levies = Decimal(0)
+        for component in sorted(components, key=lambda component: component.get("compound", False)):
+            rate = Decimal(str(component["rate"]))
+            amount = cents((base + levies if component.get("compound") else base) * rate)
+            taxes[component["code"]] = taxes.get(component["code"], Decimal(0)) + amount
+            if not component.get("compound"):
+                levies += amount
+    tax_amount = sum(taxes.values(), Decimal(0))
+    return {
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "discount_amount": discount,
+        "total_amount": subtotal + tax_amount - discount,
+        "taxes": taxes,
+    }
+
+
+def engine_totals(definition, lines, discount: Decimal):
+    basket = [
+        BasketLine(product_id, category_id, quantity, to_minor(unit_price))
+        for product_id, (category_id, quantity, unit_price) in enumerate(lines, start=1)
+    ]
+    totals = compute_order_totals(basket, discount=to_minor(discount), rules=PricingRules(definition))
+    return {
+        "subtotal": from_minor(totals.subtotal),
+        "tax_amount": from_minor(totals.tax_amount),
+        "discount_amount": from_minor(totals.discount_amount),
+        "total_amount": from_minor(totals.total_amount),
+        "taxes": {code: from_minor(amount) for code, amount in totals.taxes.items()},
+    }
+
+
+def random_basket(rng: random.Random):
+    lines = [
+        (
+            rng.choice([None, 1, 2, EXEMPT_CATEGORY, REDUCED_CATEGORY]),
+            rng.randint(1, 50),
+            Decimal(rng.randint(1, 500_000)) * CENT,
+        )
+        for _ in range(rng.randint(1, 30))
+    ]
+    discount = Decimal(rng.choice([0, 0, rng.randint(1, 10_000)])) * CENT
+    return lines, discount
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_baskets_match_reference(seed):
+    rng = random.Random(seed)
+    lines, discount = random_basket(rng)
+    assert engine_totals(RULES, lines, discount) == reference_totals(RULES, lines, discount)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_flat_rate_baskets_match_reference(seed):
+    rng = random.Random(seed)
+    definition = {"taxes": [{"code": "TAX", "rate": rng.choice([0.08, 0.125, 0.175, 0.0333])}]}
+    lines, discount = random_basket(rng)
+    assert engine_totals(definition, lines, discount) == reference_totals(definition, lines, discount)
+
+
+@pytest.mark.parametrize("unit_price, rate, tax", [
+    ("0.05", 0.1, "0.01"),  # 0.005 rounds half up
+    ("0.04", 0.1, "0.00"),  # 0.004 rounds down
+    ("0.15", 0.1, "0.02"),  # 0.015, a binary float would round this down
+    ("2.50", 0.175, "0.44"),  # 0.4375
+    ("19.99", 0.08, "1.60"),  # 1.5992
+])
+def test_tax_rounds_half_up_to_the_cent(unit_price, rate, tax):
+    definition = {"taxes": [{"code": "TAX", "rate": rate}]}
+    totals = engine_totals(definition, [(None, 1, Decimal(unit_price))], Decimal(0))
+    assert totals["tax_amount"] == Decimal(tax)
+
+
+def test_tax_is_rounded_once_per_basket_not_per_line():
+    # Three lines at 0.05 and 10%: per-line rounding would charge 0.03
+    definition = {"taxes": [{"code": "TAX", "rate": 0.1}]}
+    lines = [(None, 1, Decimal("0.05"))] * 3
+    assert engine_totals(definition, lines, Decimal(0))["tax_amount"] == Decimal("0.02")
+
+
+def test_compound_vat_is_levied_on_base_plus_levies():
+    totals = engine_totals(RULES, [(None, 1, Decimal("100.00"))], Decimal(0))
+    assert totals["taxes"] == {
+        "NHIL": Decimal("2.50"),
+        "GETFUND": Decimal("2.50"),
+        "COVID": Decimal("1.00"),
+        "VAT": Decimal("15.90"),
+    }
+    assert totals["total_amount"] == Decimal("121.90")
+
+
+def test_category_profiles_are_taxed_separately():
+    lines = [(None, 1, Decimal("100.00")), (EXEMPT_CATEGORY, 2, Decimal("10.00")), (REDUCED_CATEGORY, 1, Decimal("50.00"))]
+    totals = engine_totals(RULES, lines, Decimal(0))
+    assert totals["subtotal"] == Decimal("170.00")
+    assert totals["taxes"]["VAT"] == Decimal("15.90") + Decimal("1.50")
+    assert totals["tax_amount"] == Decimal("21.90") + Decimal("1.50")
+
+
+def test_discount_comes_off_after_tax():
+    definition = {"taxes": [{"code": "TAX", "rate": 0.1}]}
+    totals = engine_totals(definition, [(None, 2, Decimal("25.00"))], Decimal("5.00"))
+    assert totals["tax_amount"] == Decimal("5.00")
+    assert totals["total_amount"] == Decimal("50.00")
+
+
+@pytest.mark.parametrize("amount", [0.1, 0.2, 0.3, 19.99, 1.005, 123456.78, "0.105", Decimal("7.125")])
+def test_minor_units_round_trip(amount):
+    assert from_minor(to_minor(amount)) == cents(Decimal(str(amount)))